@@ -0,0 +1,32 @@
+"""Add token refresh timestamps to users
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '003'
+down_revision: Union[str, None] = '002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # When the access token was obtained and when it is expected to expire.
+    # Both stay NULL for existing users until their next token refresh.
+    op.add_column('users', sa.Column('token_refreshed_at', sa.DateTime(), nullable=True))
+    op.add_column('users', sa.Column('token_expires_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_users_token_expires_at'), 'users', ['token_expires_at'])
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_users_token_expires_at'), table_name='users')
+    op.drop_column('users', 'token_expires_at')
+    op.drop_column('users', 'token_refreshed_at')
@@ -0,0 +1,31 @@
+"""Add token refresh backoff to users
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '004'
+down_revision: Union[str, None] = '003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Consecutive failed token renewals and when the next one may be tried,
+    # so users whose refresh keeps failing do not hold back the others.
+    op.add_column('users', sa.Column('token_refresh_failures', sa.Integer(),
+                                     nullable=False, server_default='0'))
+    op.add_column('users', sa.Column('next_refresh_attempt_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'next_refresh_attempt_at')
+    op.drop_column('users', 'token_refresh_failures')
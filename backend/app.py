@@ -1,12 +1,18 @@
 import asyncio
 import os
+import shutil
+import tempfile
+import time
 from pathlib import Path
+from typing import Optional
+import requests
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 import sys
 import traceback
+import functools
 from functools import wraps
 import logging
 
@@ -19,13 +25,31 @@ src_path = Path(__file__).parent / "src"
 sys.path.insert(0, str(src_path))
 
 from Notes2Notion.notes_builder import NotesCreator, DraftEnhancer
-from Notes2Notion.tooling import ImageTextExtractor, McpNotionConnector
+from Notes2Notion.tooling import ImageTextExtractor
 from Notes2Notion.mock_components import (MockImageTextExtractor, MockDraftEnhancer,
                                           MockNotesCreator)
+from Notes2Notion.cache import LlmResponseCache, OcrCache
+from Notes2Notion.llm_clients import llm_clients
+from Notes2Notion.mcp_pool import McpSessionPool
+from Notes2Notion.notion_blocks import PAGE_UNAVAILABLE_MESSAGE, is_page_unavailable
+from Notes2Notion.settings import LLM_CACHE_PATH, OCR_CACHE_PATH
+from Notes2Notion.timing import StageTimer
+
+import async_runtime
+from auth_cache import auth_cache
+from jobs import JobQueue
 
 # Import OAuth and database modules
-from oauth import require_oauth, handle_oauth_callback
-from models import run_migrations, update_user_notion_page, validate_license_key
+from oauth import (require_oauth, handle_oauth_callback, get_refresh_stats,
+                   is_token_fresh)
+from token_refresher import TokenRefresher
+from token_validity import token_validity
+from notion_http import notion_http, notion_headers
+from notion_search import SEARCH_PAGE_SIZE_MAX, SearchError, search_cache
+from notion_tree import tree_cache
+from page_index import CURSOR_PREFIX as INDEX_CURSOR_PREFIX, PageIndex
+from models import (run_migrations, update_user_notion_page, validate_license_key,
+                    get_user_by_bot_id, get_pool_stats)
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -44,11 +68,63 @@ app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
+# Persistent caches shared by every upload (OCR results, ...)
+CACHE_FOLDER = Path(os.getenv('CACHE_FOLDER', Path(__file__).parent / "cache"))
+ocr_cache = OcrCache(OCR_CACHE_PATH or str(CACHE_FOLDER / "ocr_cache.sqlite3"))
+llm_cache = LlmResponseCache(LLM_CACHE_PATH or str(CACHE_FOLDER / "llm_cache.sqlite3"))
+
+# Local title index of each user's Notion pages, for the page picker
+page_index = PageIndex(
+    str(CACHE_FOLDER / "page_index.sqlite3"),
+    max_age=float(os.getenv('PAGE_INDEX_MAX_AGE', 600)),
+    full_crawl_interval=float(os.getenv('PAGE_INDEX_FULL_CRAWL_INTERVAL', 6 * 3600))
+)
+
+# Warm Notion MCP sessions, owned by the background event loop
+mcp_pool = McpSessionPool()
+async_runtime.register_shutdown(mcp_pool.close_all)
+
+# Open the shared OpenAI/Azure connections before the first upload needs them
+if os.getenv('LLM_WARMUP', 'true').lower() == 'true':
+    async_runtime.submit(llm_clients.awarm_up())
+
+# Renew Notion tokens before they expire
+token_refresher = TokenRefresher(
+    interval=float(os.getenv('TOKEN_REFRESH_INTERVAL', 60))
+)
+if os.getenv('TOKEN_REFRESHER_ENABLED', 'true').lower() == 'true':
+    token_refresher.start()
+
+# Uploads are processed in the background, a few at a time
+job_queue = JobQueue(
+    max_concurrency=int(os.getenv('JOB_MAX_CONCURRENCY', 2)),
+    timeout=float(os.getenv('JOB_TIMEOUT', 300)),
+    retention=float(os.getenv('JOB_RETENTION_SECONDS', 3600))
+)
+
+# One stateless enhancer per worker: its LLM clients and compiled workflow
+# are shared by every upload (created on first use, once credentials are set)
+_draft_enhancers = {}
+
+
+def get_draft_enhancer(test_mode: bool):
+    """Return the worker's shared (mock) draft enhancer."""
+    if test_mode not in _draft_enhancers:
+        _draft_enhancers[test_mode] = (MockDraftEnhancer() if test_mode
+                                        else DraftEnhancer(cache=llm_cache))
+    return _draft_enhancers[test_mode]
+
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def prewarm_notion_session(access_token):
+    """Start a Notion MCP session in the background for an upcoming upload."""
+    if access_token:
+        async_runtime.submit(mcp_pool.prewarm(access_token))
+
+
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
@@ -60,6 +136,27 @@ def health_check():
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Expose cache and pipeline counters for monitoring."""
+    return jsonify({
+        'ocr_cache': ocr_cache.stats(),
+        'llm_cache': llm_cache.stats(),
+        'llm_clients': llm_clients.stats(),
+        'mcp_pool': mcp_pool.stats(),
+        'jobs': job_queue.stats(),
+        'database': get_pool_stats(),
+        'auth_cache': auth_cache.stats(),
+        'token_refresh': {**get_refresh_stats(),
+                          'background': token_refresher.stats()},
+        'token_validity': token_validity.stats(),
+        'notion_http': notion_http.stats(),
+        'notion_search': search_cache.stats(),
+        'page_index': page_index.stats(),
+        'notion_tree': tree_cache.stats()
+    })
+
+
 @app.route('/api/license/validate', methods=['POST'])
 def validate_license():
     """
@@ -128,6 +225,15 @@ def oauth_callback():
         # Pass license_key to activate it for the new/existing user
         result = handle_oauth_callback(code, license_key)
 
+        # The user is about to upload: get a Notion session ready
+        user = get_user_by_bot_id(result['bot_id'])
+        if user and user.notion_page_id:
+            prewarm_notion_session(user.access_token)
+
+        # Index the user's pages before they open the page picker
+        if user:
+            page_index.schedule_crawl(user.bot_id, notion_search_fetcher(user))
+
         return jsonify(result), 200
 
     except Exception as e:
@@ -163,6 +269,7 @@ def set_page_id(current_user):
 
         # Update user's default page ID
         update_user_notion_page(current_user.bot_id, page_id)
+        prewarm_notion_session(current_user.access_token)
 
         return jsonify({
             'success': True,
@@ -190,179 +297,128 @@ def get_user_info(current_user):
     - has_page_id: Whether user has configured a default page
     - bot_id: User identifier
     """
-    # Force a fresh query to avoid detached session issues
-    from models import get_session, User
-    session = get_session()
-    try:
-        fresh_user = session.query(User).filter_by(bot_id=current_user.bot_id).first()
-        if fresh_user:
-            result = {
-                'workspace_name': fresh_user.workspace_name,
-                'has_page_id': fresh_user.notion_page_id is not None,
-                'bot_id': fresh_user.bot_id
-            }
-        else:
-            # Fallback to current_user if fresh query fails
-            result = {
-                'workspace_name': current_user.workspace_name,
-                'has_page_id': current_user.notion_page_id is not None,
-                'bot_id': current_user.bot_id
-            }
-        return jsonify(result), 200
-    finally:
-        session.close()
+    # current_user is a snapshot kept in sync by the auth cache invalidations
+    return jsonify({
+        'workspace_name': current_user.workspace_name,
+        'has_page_id': current_user.notion_page_id is not None,
+        'bot_id': current_user.bot_id
+    }), 200
 
 
-@app.route('/api/notion/search', methods=['POST'])
-@require_oauth
-def search_notion_pages(current_user):
+def notion_search_fetcher(user):
     """
-    Search Notion pages accessible to the user.
+    Build a function sending Notion search requests on behalf of a user.
 
-    Expects JSON body with:
-    - query: Search term (optional, returns all pages if empty)
+    The token is refreshed once on a 401; failures raise SearchError.
+
+    Args:
+        user: Authenticated user (or auth snapshot)
 
     Returns:
-    - pages: List of pages with id, title, and icon
+        Callable: Takes a search request body, returns the JSON response
     """
-    try:
-        import requests
-        from oauth import refresh_notion_token
-
-        data = request.get_json()
-        query = data.get('query', '')
-
-        # Prepare request body
-        body = {
-            'filter': {
-                'property': 'object',
-                'value': 'page'
-            }
-        }
+    from oauth import refresh_notion_token
 
-        if query:
-            body['query'] = query
-
-        # Try with current token first
-        access_token = current_user.access_token
-        max_retries = 1
+    # Try with current token first
+    access_token = user.access_token
+    max_retries = 1
 
+    def fetch(body):
+        nonlocal access_token
         for attempt in range(max_retries + 1):
-            # Prepare request to Notion API
-            headers = {
-                'Authorization': f'Bearer {access_token}',
-                'Notion-Version': '2022-06-28',
-                'Content-Type': 'application/json'
-            }
-
             # Call Notion Search API
-            response = requests.post(
-                'https://api.notion.com/v1/search',
-                headers=headers,
+            response = notion_http.post(
+                'search',
+                endpoint='search',
+                headers=notion_headers(access_token),
                 json=body
             )
 
-            # If successful, break the loop
             if response.ok:
-                break
+                token_validity.mark_valid(access_token)
+                return response.json()
+
+            if response.status_code == 401:
+                token_validity.invalidate(access_token)
 
             # If 401 Unauthorized and we haven't retried yet, refresh token
             if response.status_code == 401 and attempt < max_retries:
-                logger.warning(f"⚠️  Token expired for user {current_user.bot_id}, attempting refresh...")
+                logger.warning(f"⚠️  Token expired for user {user.bot_id}, attempting refresh...")
                 try:
-                    token_data = refresh_notion_token(current_user)
+                    token_data = refresh_notion_token(user)
                     access_token = token_data['access_token']
                     logger.info(f"✅ Token refreshed, retrying request...")
                     continue
                 except Exception as refresh_error:
                     logger.error(f"❌ Token refresh failed: {refresh_error}")
-                    return jsonify({
+                    raise SearchError({
                         'error': 'Authentication failed',
                         'message': 'Votre session Notion a expiré et n\'a pas pu être renouvelée. Veuillez vous reconnecter.'
-                    }), 401
+                    }, 401)
 
             # If we get here, the request failed and we can't retry
             logger.error(f"❌ Notion API error: {response.status_code} - {response.text}")
-            return jsonify({
+            raise SearchError({
                 'error': 'Failed to search Notion pages',
                 'message': response.text
-            }), response.status_code
+            }, response.status_code)
 
-        results = response.json()
+    return fetch
 
-        # Helper function to normalize Notion IDs (remove dashes for comparison)
-        def normalize_id(notion_id):
-            if not notion_id:
-                return None
-            return notion_id.replace('-', '')
-
-        # Format results to return only necessary information
-        pages = []
-        page_map = {}  # Map of page_id -> page data for parent lookup
-
-        for result in results.get('results', []):
-            if result.get('object') == 'page':
-                # Extract page title
-                title = 'Untitled'
-                properties = result.get('properties', {})
-
-                # Try to get title from various possible properties
-                for prop_name, prop_value in properties.items():
-                    if prop_value.get('type') == 'title':
-                        title_array = prop_value.get('title', [])
-                        if title_array and len(title_array) > 0:
-                            title = title_array[0].get('plain_text', 'Untitled')
-                            break
-
-                # Extract icon if present
-                icon = None
-                if result.get('icon'):
-                    if result['icon'].get('type') == 'emoji':
-                        icon = result['icon'].get('emoji')
-                    elif result['icon'].get('type') == 'external':
-                        icon = result['icon'].get('external', {}).get('url')
-                    elif result['icon'].get('type') == 'file':
-                        icon = result['icon'].get('file', {}).get('url')
-
-                # Extract parent information
-                parent_info = result.get('parent', {})
-                parent_type = parent_info.get('type')
-                parent_id = None
-
-                if parent_type == 'page_id':
-                    parent_id = parent_info.get('page_id')
-                elif parent_type == 'database_id':
-                    parent_id = parent_info.get('database_id')
-
-                page_data = {
-                    'id': result.get('id'),
-                    'title': title,
-                    'icon': icon,
-                    'parent_type': parent_type,
-                    'parent_id': parent_id
-                }
-
-                pages.append(page_data)
-                # Store in map with normalized ID for reliable lookup
-                page_map[normalize_id(result.get('id'))] = page_data
-
-        # Second pass: resolve parent titles for pages whose parent is in the results
-        for page in pages:
-            if page['parent_id']:
-                # Try to find parent using normalized IDs
-                normalized_parent_id = normalize_id(page['parent_id'])
-                if normalized_parent_id in page_map:
-                    page['parent_title'] = page_map[normalized_parent_id]['title']
-                else:
-                    page['parent_title'] = None
-            else:
-                page['parent_title'] = None
 
-        return jsonify({
-            'pages': pages,
-            'has_more': results.get('has_more', False)
-        }), 200
+@app.route('/api/notion/search', methods=['POST'])
+@require_oauth
+def search_notion_pages(current_user):
+    """
+    Search Notion pages accessible to the user.
 
+    Once the user's pages are indexed (see page_index.py) titles are searched
+    locally; until then, and for Notion cursors, results come from Notion
+    through a short-lived cache (see notion_search.py).
+
+    Expects JSON body with:
+    - query: Search term (optional, returns all pages if empty)
+    - start_cursor: next_cursor of the previous response (optional)
+    - page_size: Number of pages per response, at most 100 (optional)
+
+    Returns:
+    - pages: List of pages with id, title, and icon
+    - has_more: Whether more pages are available
+    - next_cursor: Cursor to pass as start_cursor to get them
+    - source: 'index' or 'notion'
+    """
+    try:
+        data = request.get_json() or {}
+        query = data.get('query', '')
+        start_cursor = data.get('start_cursor')
+        page_size = max(1, min(SEARCH_PAGE_SIZE_MAX,
+                               int(data.get('page_size', SEARCH_PAGE_SIZE_MAX))))
+
+        index_cursor = start_cursor is None or start_cursor.startswith(INDEX_CURSOR_PREFIX)
+        if index_cursor and page_index.is_ready(current_user.bot_id):
+            if page_index.is_stale(current_user.bot_id):
+                page_index.schedule_crawl(current_user.bot_id,
+                                          notion_search_fetcher(current_user))
+            result = page_index.search(current_user.bot_id, query,
+                                       start_cursor=start_cursor, page_size=page_size)
+            return jsonify({**result, 'source': 'index'}), 200
+
+        # Not indexed yet: build the index while Notion answers this search
+        page_index.schedule_crawl(current_user.bot_id, notion_search_fetcher(current_user))
+        if start_cursor and start_cursor.startswith(INDEX_CURSOR_PREFIX):
+            start_cursor = None
+
+        result = search_cache.search(
+            current_user.bot_id,
+            query,
+            notion_search_fetcher(current_user),
+            start_cursor=start_cursor,
+            page_size=page_size
+        )
+        return jsonify({**result, 'source': 'notion'}), 200
+
+    except SearchError as e:
+        return jsonify(e.payload), e.status_code
     except Exception as e:
         error_trace = traceback.format_exc()
         logger.error(f"\n❌ Error searching Notion pages:")
@@ -373,6 +429,92 @@ def search_notion_pages(current_user):
         }), 500
 
 
+@app.route('/api/notion/tree', methods=['GET'])
+@require_oauth
+def get_notion_tree(current_user):
+    """
+    Get the hierarchy of the Notion pages accessible to the user.
+
+    Built from the page index; parents missing from it are fetched from
+    Notion. The tree is cached per user; see notion_tree.py.
+
+    Query parameters:
+    - refresh: 'true' to rebuild the cached tree (optional)
+
+    Returns:
+    - tree: Root nodes with id, title, type, icon and nested children
+    - pages: Number of pages in the index
+    - built_at: Build timestamp
+    - cached: Whether the tree came from the cache
+    """
+    try:
+        bot_id = current_user.bot_id
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+
+        def list_pages():
+            if refresh or not page_index.is_ready(bot_id):
+                page_index.crawl(bot_id, notion_search_fetcher(current_user))
+            return page_index.pages(bot_id)
+
+        def fetch_object(kind, object_id):
+            response = notion_http.get(
+                f'{kind}s/{object_id}',
+                endpoint=f'{kind}s',
+                headers=notion_headers(current_user.access_token)
+            )
+            if not response.ok:
+                logger.warning(f"⚠️  Notion {kind} {object_id} unavailable: {response.status_code}")
+                return None
+            return response.json()
+
+        tree = tree_cache.get(bot_id, list_pages, fetch_object, refresh=refresh)
+        return jsonify(tree), 200
+
+    except SearchError as e:
+        return jsonify(e.payload), e.status_code
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        logger.error(f"\n❌ Error building page tree for {current_user.bot_id}:")
+        logger.error(error_trace)
+        return jsonify({
+            'error': 'Failed to build page tree',
+            'message': str(e)
+        }), 500
+
+
+@app.route('/api/notion/index/refresh', methods=['POST'])
+@require_oauth
+def refresh_page_index(current_user):
+    """
+    Update the user's page index now.
+
+    Expects JSON body with:
+    - full: Re-read every page instead of the recently edited ones (optional)
+
+    Returns:
+    - pages, last_crawl_at, age_seconds, ...: Index status of the user
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        status = page_index.crawl(current_user.bot_id,
+                                  notion_search_fetcher(current_user),
+                                  full=bool(data.get('full', False)))
+        search_cache.invalidate(current_user.bot_id)
+        tree_cache.invalidate(current_user.bot_id)
+        return jsonify(status), 200
+
+    except SearchError as e:
+        return jsonify(e.payload), e.status_code
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        logger.error(f"\n❌ Error refreshing page index for {current_user.bot_id}:")
+        logger.error(error_trace)
+        return jsonify({
+            'error': 'Failed to refresh page index',
+            'message': str(e)
+        }), 500
+
+
 @app.route('/api/upload', methods=['POST'])
 @require_oauth
 def upload_file(current_user):
@@ -381,12 +523,15 @@ def upload_file(current_user):
 
     Requires OAuth authentication.
     The authenticated user's Notion token will be used to create the page.
+    The file is processed in the background: the response is 202 with a job
+    id to poll on /api/jobs/<job_id>.
 
     Form data:
     - photo: The image file
     - test_mode: 'true' or 'false' (optional, default: false)
+    - no_cache: 'true' to get fresh LLM answers instead of cached ones
+      (optional, default: false)
     """
-    import requests
     from oauth import refresh_notion_token
 
     # Check if user has configured a default page ID
@@ -407,132 +552,254 @@ def upload_file(current_user):
 
     # Get test_mode parameter
     test_mode = request.form.get('test_mode', 'false').lower() == 'true'
+    llm_cache_bypass = request.form.get('no_cache', 'false').lower() == 'true'
 
     if file and allowed_file(file.filename):
-        # Create user-specific upload folder to handle concurrency
-        user_upload_folder = UPLOAD_FOLDER / current_user.bot_id
-        user_upload_folder.mkdir(exist_ok=True)
+        access_token = current_user.access_token
+
+        if is_token_fresh(current_user):
+            # Renewed recently (background refresher or login): skip the
+            # /users/me round trip
+            token_refresher.record_preflight(avoided=True)
+            token_validity.record_avoided()
+            logger.info(f"✅ Token is fresh, skipping validation")
+        elif token_validity.is_valid(access_token):
+            # A Notion call with this token succeeded moments ago
+            token_refresher.record_preflight(avoided=True)
+            logger.info(f"✅ Token validated recently, skipping validation")
+        else:
+            token_refresher.record_preflight(avoided=False)
+
+            # VALIDATE TOKEN BEFORE PROCESSING
+            # Make a simple API call to verify the token is valid
+            logger.info(f"\n🔐 Validating Notion token...")
+
+            # Simple validation call to Notion API (get user info)
+            preflight_start = time.perf_counter()
+            try:
+                validation_response = notion_http.get(
+                    'users/me',
+                    endpoint='users_me',
+                    headers=notion_headers(access_token)
+                )
+            except requests.RequestException as e:
+                logger.error(f"❌ Token validation request failed: {e}")
+                return jsonify({
+                    'success': False,
+                    'error': 'Notion unavailable',
+                    'message': 'Notion ne répond pas pour le moment. Veuillez réessayer dans quelques instants.'
+                }), 502
+            token_validity.record_preflight(time.perf_counter() - preflight_start)
+
+            # If token is invalid, try to refresh it
+            if validation_response.status_code == 401:
+                logger.warning(f"⚠️  Token expired for user {current_user.bot_id}, attempting refresh...")
+                try:
+                    token_data = refresh_notion_token(current_user)
+                    access_token = token_data['access_token']
+                    logger.info(f"✅ Token refreshed successfully")
+                except Exception as refresh_error:
+                    logger.error(f"❌ Token refresh failed: {refresh_error}")
+                    return jsonify({
+                        'success': False,
+                        'error': 'Authentication failed',
+                        'message': 'Votre session Notion a expiré et n\'a pas pu être renouvelée. Veuillez vous reconnecter.'
+                    }), 401
+            elif not validation_response.ok:
+                logger.error(f"❌ Token validation failed with status {validation_response.status_code}")
+                return jsonify({
+                    'success': False,
+                    'error': 'Token validation failed',
+                    'message': f'Erreur de validation du token Notion: {validation_response.text}'
+                }), 500
 
-        # Clean user's upload folder
-        for old_file in user_upload_folder.glob('*'):
-            if old_file.is_file():
-                old_file.unlink()
+            token_validity.mark_valid(access_token)
+            logger.info(f"✅ Token is valid")
+
+        # Each job gets its own folder so concurrent uploads of one user
+        # don't mix. The folder name is used as the page title, hence the
+        # bot_id leaf.
+        job_folder = Path(tempfile.mkdtemp(dir=UPLOAD_FOLDER))
+        user_upload_folder = job_folder / current_user.bot_id
+        user_upload_folder.mkdir()
 
-        # Save new file
         filename = secure_filename(file.filename)
         filepath = user_upload_folder / filename
         file.save(filepath)
 
-        # VALIDATE TOKEN BEFORE PROCESSING
-        # Make a simple API call to verify the token is valid
-        logger.info(f"\n🔐 Validating Notion token...")
-        access_token = current_user.access_token
-
-        validation_headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Notion-Version': '2022-06-28',
-            'Content-Type': 'application/json'
-        }
+        logger.info(f"\n{'='*60}")
+        logger.info(f"👤 User: {current_user.workspace_name} (bot_id: {current_user.bot_id})")
+        logger.info(f"📸 Queuing file: {filepath}")
+        logger.info(f"🧪 Test mode: {test_mode}")
+        logger.info(f"📄 Target page: {current_user.notion_page_id}")
+        logger.info(f"{'='*60}\n")
 
-        # Simple validation call to Notion API (get user info)
-        validation_response = requests.get(
-            'https://api.notion.com/v1/users/me',
-            headers=validation_headers
-        )
+        bot_id = current_user.bot_id
+        page_id = current_user.notion_page_id
 
-        # If token is invalid, try to refresh it
-        if validation_response.status_code == 401:
-            logger.warning(f"⚠️  Token expired for user {current_user.bot_id}, attempting refresh...")
+        async def runner(job):
             try:
-                token_data = refresh_notion_token(current_user)
-                access_token = token_data['access_token']
-                logger.info(f"✅ Token refreshed successfully")
-            except Exception as refresh_error:
-                logger.error(f"❌ Token refresh failed: {refresh_error}")
-                return jsonify({
-                    'success': False,
-                    'error': 'Authentication failed',
-                    'message': 'Votre session Notion a expiré et n\'a pas pu être renouvelée. Veuillez vous reconnecter.'
-                }), 401
-        elif not validation_response.ok:
-            logger.error(f"❌ Token validation failed with status {validation_response.status_code}")
-            return jsonify({
-                'success': False,
-                'error': 'Token validation failed',
-                'message': f'Erreur de validation du token Notion: {validation_response.text}'
-            }), 500
+                return await run_upload_job(job, str(user_upload_folder),
+                                            test_mode, access_token,
+                                            page_id, bot_id,
+                                            llm_cache_bypass=llm_cache_bypass)
+            finally:
+                shutil.rmtree(job_folder, ignore_errors=True)
 
-        logger.info(f"✅ Token is valid")
+        job = job_queue.submit(bot_id, runner)
 
-        # Process the image and upload to Notion
-        try:
-            logger.info(f"\n{'='*60}")
-            logger.info(f"👤 User: {current_user.workspace_name} (bot_id: {current_user.bot_id})")
-            logger.info(f"📸 Processing file: {filepath}")
-            logger.info(f"🧪 Test mode: {test_mode}")
-            logger.info(f"📄 Target page: {current_user.notion_page_id}")
-            logger.info(f"{'='*60}\n")
-
-            result = asyncio.run(
-                process_and_upload(
-                    str(user_upload_folder),
-                    test_mode,
-                    access_token,  # Use validated/refreshed token
-                    current_user.notion_page_id
-                )
-            )
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'state': job.state,
+            'status_url': f'/api/jobs/{job.id}',
+            'test_mode': test_mode
+        }), 202
 
-            logger.info(f"\n✅ Processing completed successfully!")
+    return jsonify({'error': 'Invalid file type. Allowed: PNG, JPG, JPEG, GIF'}), 400
 
-            return jsonify({
-                'success': True,
-                'message': 'Photo uploaded and processed successfully!',
-                'details': result,
-                'test_mode': test_mode
-            })
-        except ValueError as e:
-            error_message = str(e)
-            error_trace = traceback.format_exc()
-            logger.error(f"\n❌ ValueError during processing:")
-            logger.error(error_trace)
-
-            # Check if this is an "invalid page" error
-            if "n'existe plus" in error_message or "plus accessible" in error_message:
-                # Clear the invalid page_id from database
-                from models import clear_user_notion_page
-                clear_user_notion_page(current_user.bot_id)
-
-                # Return 410 Gone to indicate the resource no longer exists
-                return jsonify({
-                    'success': False,
-                    'error': 'page_deleted',
-                    'message': error_message,
-                    'needs_page_setup': True
-                }), 410
 
-            # Other ValueError - return 400
-            return jsonify({
-                'success': False,
-                'error': str(e)
-            }), 400
-        except Exception as e:
-            error_trace = traceback.format_exc()
-            logger.error(f"\n❌ ERROR during processing:")
-            logger.error(error_trace)
-            return jsonify({
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@require_oauth
+def get_job(current_user, job_id):
+    """
+    Get the state of an upload job of the authenticated user.
+
+    Returns:
+    - state: queued, running, succeeded or failed
+    - stage: Pipeline stage currently running
+    - stages: Start offset and duration of each stage
+    - status_code / result: Outcome of the upload once finished
+    """
+    job = job_queue.get(job_id)
+    if job is None or job.owner != current_user.bot_id:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job.to_dict()), 200
+
+
+@app.route('/api/jobs', methods=['GET'])
+@require_oauth
+def list_jobs(current_user):
+    """List the recent upload jobs of the authenticated user."""
+    return jsonify({
+        'jobs': [job.to_dict() for job in job_queue.list(current_user.bot_id)]
+    }), 200
+
+
+class NotionAuthError(Exception):
+    """Notion rejected the user's access token during a job."""
+
+
+async def run_upload_job(job, folder_path, test_mode, user_notion_token,
+                         user_notion_page_id, bot_id, llm_cache_bypass=False):
+    """
+    Run one queued upload and map its outcome to the former HTTP responses.
+
+    Returns:
+        tuple: Status code and JSON body, as /api/upload used to return them
+    """
+    try:
+        result = await process_and_upload(folder_path, test_mode,
+                                          user_notion_token,
+                                          user_notion_page_id,
+                                          timer=job.timer,
+                                          llm_cache_bypass=llm_cache_bypass)
+
+        # The pipeline talked to Notion with this token: no preflight needed
+        # for the next upload
+        token_validity.mark_valid(user_notion_token)
+        logger.info(f"\n✅ Processing completed successfully!")
+
+        return 200, {
+            'success': True,
+            'message': 'Photo uploaded and processed successfully!',
+            'details': result,
+            'test_mode': test_mode
+        }
+    except ValueError as e:
+        error_message = str(e)
+        error_trace = traceback.format_exc()
+        logger.error(f"\n❌ ValueError during processing:")
+        logger.error(error_trace)
+
+        # Check if this is an "invalid page" error
+        if "n'existe plus" in error_message or "plus accessible" in error_message:
+            # Clear the invalid page_id from database
+            from models import clear_user_notion_page
+            await asyncio.to_thread(clear_user_notion_page, bot_id)
+
+            # 410 Gone indicates the resource no longer exists
+            return 410, {
                 'success': False,
-                'error': str(e),
-                'trace': error_trace
-            }), 500
+                'error': 'page_deleted',
+                'message': error_message,
+                'needs_page_setup': True
+            }
+
+        # Other ValueError - return 400
+        return 400, {
+            'success': False,
+            'error': str(e)
+        }
+    except NotionAuthError:
+        # The next upload validates the token again and refreshes it
+        return 401, {
+            'success': False,
+            'error': 'Notion token rejected',
+            'message': 'Votre session Notion a expiré. Veuillez réessayer l\'envoi.'
+        }
+    except Exception as e:
+        error_trace = traceback.format_exc()
+        logger.error(f"\n❌ ERROR during processing:")
+        logger.error(error_trace)
+        return 500, {
+            'success': False,
+            'error': str(e),
+            'trace': error_trace
+        }
 
-    return jsonify({'error': 'Invalid file type. Allowed: PNG, JPG, JPEG, GIF'}), 400
+
+async def check_target_page(user_notion_token: str, page_id: str):
+    """
+    Check with GET /v1/pages/{id} that the target page can receive notes.
+
+    Runs while the notes are read, so a deleted or archived page is detected
+    before the enhancement LLM calls are paid for.
+
+    Raises:
+        ValueError: If the page was deleted, archived or is no longer shared
+        NotionAuthError: If Notion rejects the token; it is no longer trusted
+            without a preflight call
+    """
+    response = await asyncio.to_thread(
+        notion_http.get,
+        f'pages/{page_id}',
+        endpoint='pages',
+        headers=notion_headers(user_notion_token)
+    )
+    if response.status_code == 401:
+        logger.warning(f"⚠️  Notion token rejected while checking page {page_id}")
+        token_validity.invalidate(user_notion_token)
+        raise NotionAuthError("Notion token rejected")
+    if response.status_code in (403, 404):
+        logger.warning(f"⚠️  Target page {page_id} unavailable: {response.status_code}")
+        raise ValueError(PAGE_UNAVAILABLE_MESSAGE)
+    if not response.ok:
+        # Not conclusive: the write itself will report a real problem
+        logger.warning(f"⚠️  Target page check inconclusive: {response.status_code}")
+        return
+    if is_page_unavailable(response.json()):
+        logger.warning(f"⚠️  Target page {page_id} is archived")
+        raise ValueError(PAGE_UNAVAILABLE_MESSAGE)
 
 
 async def process_and_upload(
     folder_path: str,
     test_mode: bool,
     user_notion_token: str,
-    user_notion_page_id: str
+    user_notion_page_id: str,
+    timer: Optional[StageTimer] = None,
+    llm_cache_bypass: bool = False
 ):
     """
     Process the uploaded image and create Notion page.
@@ -542,42 +809,64 @@ async def process_and_upload(
         test_mode: If True, uses mock components (no LLM calls)
         user_notion_token: User's Notion OAuth access token
         user_notion_page_id: User's default Notion page ID for notes
+        timer: Records the duration of each pipeline stage
+        llm_cache_bypass: Ask for fresh LLM answers instead of cached ones
 
     Returns:
         Success message string
     """
-    notion_connector = McpNotionConnector()
+    timer = timer or StageTimer()
+    notes_creator = None
+    reusable = False
 
     try:
         if test_mode:
             logger.info("🧪 TEST MODE - Using mock components (zero LLM calls)")
-            image_text_extractor = MockImageTextExtractor(folder_path)
-            draft_enhancer = MockDraftEnhancer()
+            image_text_extractor = MockImageTextExtractor(folder_path,
+                                                          cache=ocr_cache)
+            draft_enhancer = get_draft_enhancer(test_mode=True)
             notes_creator = MockNotesCreator(
-                notion_connector,
+                None,
                 draft_enhancer,
-                image_text_extractor
+                image_text_extractor,
+                timer=timer,
+                connect=mcp_pool.acquire,
+                page_check=functools.partial(check_target_page, user_notion_token)
             )
         else:
             logger.info("🚀 PRODUCTION MODE - Using real LLM components")
-            image_text_extractor = ImageTextExtractor(folder_path)
-            draft_enhancer = DraftEnhancer()
+            image_text_extractor = ImageTextExtractor(folder_path,
+                                                      cache=ocr_cache)
+            draft_enhancer = get_draft_enhancer(test_mode=False)
+            # The MCP session is acquired inside the pipeline, concurrently
+            # with OCR and enhancement
             notes_creator = NotesCreator(
-                notion_connector,
+                None,
                 draft_enhancer,
-                image_text_extractor
+                image_text_extractor,
+                timer=timer,
+                connect=mcp_pool.acquire,
+                page_check=functools.partial(check_target_page, user_notion_token),
+                cache_bypass=llm_cache_bypass
             )
 
-        await notes_creator.notes_creation(
-            user_notion_token=user_notion_token,
-            user_notion_page_id=user_notion_page_id
-        )
+        try:
+            await notes_creator.notes_creation(
+                user_notion_token=user_notion_token,
+                user_notion_page_id=user_notion_page_id
+            )
+        except ValueError:
+            # Invalid target page: the Notion session itself is still healthy
+            reusable = True
+            raise
+        reusable = True
 
         mode_label = "TEST MODE" if test_mode else "PRODUCTION MODE"
         return f"Successfully created Notion page! ({mode_label})"
 
     finally:
-        await notion_connector.cleanup()
+        if notes_creator is not None and notes_creator.notion_connector is not None:
+            await mcp_pool.release(notes_creator.notion_connector, reusable=reusable)
 
 
 if __name__ == '__main__':
@@ -606,11 +895,16 @@ if __name__ == '__main__':
     print(f"{'='*60}")
     print(f"\nAPI Endpoints:")
     print(f"  - GET  http://localhost:{port}/api/health")
+    print(f"  - GET  http://localhost:{port}/api/metrics")
     print(f"  - POST http://localhost:{port}/api/oauth/callback")
     print(f"  - GET  http://localhost:{port}/api/user/info")
     print(f"  - POST http://localhost:{port}/api/user/page-id")
     print(f"  - POST http://localhost:{port}/api/notion/search")
+    print(f"  - GET  http://localhost:{port}/api/notion/tree")
+    print(f"  - POST http://localhost:{port}/api/notion/index/refresh")
     print(f"  - POST http://localhost:{port}/api/upload")
+    print(f"  - GET  http://localhost:{port}/api/jobs")
+    print(f"  - GET  http://localhost:{port}/api/jobs/<job_id>")
     print(f"\nAuthentication:")
     print(f"  - Method: OAuth 2.0 (Notion)")
     print(f"  - Client ID: {os.getenv('NOTION_CLIENT_ID')}")
@@ -0,0 +1,71 @@
+"""
+Long-lived asyncio event loop for the Flask backend.
+
+Flask views are synchronous. Instead of creating and tearing down an event
+loop per request with ``asyncio.run``, coroutines are submitted to a single
+loop running in a daemon thread. Objects bound to that loop (warm MCP
+sessions, HTTP connection pools) therefore survive across requests.
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the background event loop, starting it on first use.
+
+    The loop is started lazily and per process, so it is created after
+    gunicorn forks its workers.
+    """
+    global _loop, _loop_pid
+    with _lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            _loop_pid = os.getpid()
+            thread = threading.Thread(target=_loop.run_forever,
+                                      name="async-runtime", daemon=True)
+            thread.start()
+            logger.info("🔁 Background event loop started")
+        return _loop
+
+
+def submit(coro: Coroutine) -> Future:
+    """Schedule a coroutine on the background loop without waiting for it."""
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro: Coroutine, timeout: Optional[float] = None) -> Any:
+    """Run a coroutine on the background loop and wait for its result."""
+    return submit(coro).result(timeout)
+
+
+def shutdown(coro: Optional[Coroutine] = None, timeout: float = 10):
+    """Run a last cleanup coroutine (if any) and stop the loop."""
+    if _loop is None or _loop_pid != os.getpid() or not _loop.is_running():
+        if coro is not None:
+            coro.close()
+        return
+    if coro is not None:
+        try:
+            run(coro, timeout)
+        except Exception as e:
+            logger.warning(f"⚠️  Error during async shutdown: {e}")
+    _loop.call_soon_threadsafe(_loop.stop)
+
+
+def register_shutdown(coro_factory):
+    """Run ``coro_factory()`` on the background loop when the process exits."""
+    atexit.register(lambda: shutdown(coro_factory()))
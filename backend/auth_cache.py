@@ -0,0 +1,132 @@
+"""
+In-process cache of the authentication context of protected requests.
+
+``require_oauth`` needs the user and whether they hold an active license on
+every protected request. Both are cached per bot_id for a short TTL, and
+decoded session tokens are cached until they expire. Every write to a user
+or license in ``models.py`` invalidates the entry explicitly; the TTL only
+bounds staleness for changes made by other processes (e.g. license revoked
+with ``admin_tools/license_manager.py``).
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+
+@dataclass(frozen=True)
+class AuthSnapshot:
+    """
+    Compact, immutable copy of the fields protected routes read from a user.
+
+    It replaces the detached ORM User previously passed as ``current_user``.
+    """
+    id: int
+    bot_id: str
+    workspace_id: str
+    workspace_name: Optional[str]
+    access_token: str
+    refresh_token: Optional[str]
+    notion_page_id: Optional[str]
+    has_license: bool
+    token_expires_at: Optional[datetime] = None
+
+
+class AuthCache:
+    """TTL cache of AuthSnapshot by bot_id, plus decoded session tokens."""
+
+    def __init__(self, ttl: float = 60, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._users: OrderedDict[str, tuple[float, AuthSnapshot]] = OrderedDict()
+        self._tokens: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.token_hits = 0
+        self.token_misses = 0
+
+    def get(self, bot_id: str) -> Optional[AuthSnapshot]:
+        with self._lock:
+            entry = self._users.get(bot_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._users.pop(bot_id, None)
+                self.misses += 1
+                return None
+            self._users.move_to_end(bot_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, snapshot: AuthSnapshot):
+        with self._lock:
+            self._users[snapshot.bot_id] = (time.monotonic() + self.ttl, snapshot)
+            self._users.move_to_end(snapshot.bot_id)
+            while len(self._users) > self.max_entries:
+                self._users.popitem(last=False)
+
+    def invalidate(self, bot_id: Optional[str] = None, user_id: Optional[int] = None):
+        """Drop the snapshot of a user, by bot_id or database id."""
+        with self._lock:
+            if bot_id is None and user_id is not None:
+                bot_id = next((key for key, (_, snapshot) in self._users.items()
+                               if snapshot.id == user_id), None)
+            if bot_id is not None and self._users.pop(bot_id, None) is not None:
+                self.invalidations += 1
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get_token(self, token: str) -> Optional[str]:
+        """Return the bot_id of an already verified, unexpired session token."""
+        key = self._token_key(token)
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is None or entry[0] <= time.time():
+                self._tokens.pop(key, None)
+                self.token_misses += 1
+                return None
+            self._tokens.move_to_end(key)
+            self.token_hits += 1
+            return entry[1]
+
+    def put_token(self, token: str, bot_id: str, expires_at: float):
+        """Remember a verified session token until its ``exp`` timestamp."""
+        key = self._token_key(token)
+        with self._lock:
+            self._tokens[key] = (expires_at, bot_id)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_entries:
+                self._tokens.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+            self._tokens.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        token_lookups = self.token_hits + self.token_misses
+        return {
+            'entries': len(self._users),
+            'ttl_seconds': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'token_entries': len(self._tokens),
+            'token_hits': self.token_hits,
+            'token_misses': self.token_misses,
+            'token_hit_rate': self.token_hits / token_lookups if token_lookups else 0.0,
+        }
+
+
+auth_cache = AuthCache(ttl=float(os.getenv('AUTH_CACHE_TTL', 60)))
@@ -0,0 +1,186 @@
+"""
+In-memory queue of background upload jobs.
+
+``/api/upload`` only validates the request and queues a job; the pipeline
+runs on the background event loop (see ``async_runtime``) while the client
+polls ``/api/jobs/<id>``. Jobs live in the memory of the gunicorn worker
+that accepted them, which is why the backend runs a single worker.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+import async_runtime
+from Notes2Notion.timing import StageTimer
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """A queued pipeline run and, once finished, its HTTP-style outcome."""
+    owner: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    state: str = QUEUED
+    timer: StageTimer = field(default_factory=StageTimer)
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    status_code: Optional[int] = None
+    result: Optional[dict] = None
+
+    @property
+    def done(self) -> bool:
+        return self.state in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> dict:
+        return {
+            'job_id': self.id,
+            'state': self.state,
+            'stage': self.timer.current,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'queued_seconds': (round(self.started_at - self.created_at, 3)
+                               if self.started_at else None),
+            'stages': self.timer.as_dict(),
+            'status_code': self.status_code,
+            'result': self.result,
+        }
+
+
+# A job runner returns the status code and JSON body of the finished upload
+JobRunner = Callable[[Job], Awaitable[tuple[int, dict]]]
+
+
+class JobQueue:
+    """
+    Run jobs on the background event loop, ``max_concurrency`` at a time.
+
+    Finished jobs are kept ``retention`` seconds so clients can fetch their
+    result, then forgotten.
+    """
+
+    def __init__(self, max_concurrency: int = 2, timeout: float = 300,
+                 retention: float = 3600):
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.retention = retention
+
+        self._jobs: dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.timed_out = 0
+        # Seconds from submission until the first blocks reached Notion
+        self.first_block_count = 0
+        self.first_block_seconds_total = 0.0
+
+    def submit(self, owner: str, runner: JobRunner) -> Job:
+        """
+        Queue ``runner`` and return its job immediately.
+
+        Args:
+            owner: bot_id of the user allowed to read the job
+            runner: Coroutine function running the pipeline for this job
+
+        Returns:
+            Job: The queued job
+        """
+        job = Job(owner=owner)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+            self.submitted += 1
+        async_runtime.submit(self._run(job, runner))
+        logger.info(f"📥 Job {job.id} queued for {owner}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, owner: str) -> list[Job]:
+        """Jobs of one user, most recent first."""
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            states = [job.state for job in self._jobs.values()]
+        return {
+            'max_concurrency': self.max_concurrency,
+            'queued': states.count(QUEUED),
+            'running': states.count(RUNNING),
+            'submitted': self.submitted,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'timed_out': self.timed_out,
+            'avg_time_to_first_block_seconds': (
+                self.first_block_seconds_total / self.first_block_count
+                if self.first_block_count else None),
+        }
+
+    async def _run(self, job: Job, runner: JobRunner):
+        if self._semaphore is None:
+            # Created here so it belongs to the background loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async with self._semaphore:
+            job.state = RUNNING
+            job.started_at = time.time()
+            logger.info(f"▶️  Job {job.id} started")
+            try:
+                status_code, result = await asyncio.wait_for(runner(job),
+                                                             self.timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                logger.error(f"❌ Job {job.id} timed out after {self.timeout}s")
+                status_code, result = 504, {
+                    'success': False,
+                    'error': 'timeout',
+                    'message': 'Le traitement a pris trop de temps. Veuillez réessayer.'
+                }
+            except Exception as e:
+                logger.exception(f"❌ Job {job.id} crashed")
+                status_code, result = 500, {'success': False, 'error': str(e)}
+
+        job.status_code = status_code
+        job.result = result
+        job.finished_at = time.time()
+        first_block = job.timer.as_dict().get('first_block')
+        if first_block is not None:
+            self.first_block_count += 1
+            self.first_block_seconds_total += first_block['start']
+        if status_code < 400:
+            job.state = SUCCEEDED
+            self.succeeded += 1
+        else:
+            job.state = FAILED
+            self.failed += 1
+        logger.info(f"🏁 Job {job.id} {job.state} in "
+                    f"{job.finished_at - job.started_at:.2f}s")
+
+    def _prune(self):
+        # Called with the lock held
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.done and now - job.finished_at > self.retention]
+        for job_id in expired:
+            del self._jobs[job_id]
+
@@ -6,13 +6,19 @@ and workspace information for Notion integration.
 """
 
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import (create_engine, Column, Integer, String, DateTime, Boolean, ForeignKey,
+                        or_)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import QueuePool
 from typing import Dict, Any, List
 import os
+import threading
+import time
 import logging
 
+from auth_cache import AuthSnapshot, auth_cache
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
@@ -38,6 +44,13 @@ class User(Base):
     access_token = Column(String(1000), nullable=False)
     refresh_token = Column(String(1000))
 
+    # Age of the access token, used to renew it before it expires
+    token_refreshed_at = Column(DateTime)
+    token_expires_at = Column(DateTime, index=True)
+    # Failed background renewals in a row, and when to try again
+    token_refresh_failures = Column(Integer, default=0, nullable=False)
+    next_refresh_attempt_at = Column(DateTime)
+
     # User's preferred Notion page for notes
     # This is where the user's handwritten notes will be created
     notion_page_id = Column(String(255))
@@ -108,21 +121,99 @@ def get_database_url():
     return url
 
 
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a free connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _record_pool_wait(time.perf_counter() - start)
+
+
+# One engine and session factory per process, created on first use
+_engine = None
+_engine_pid = None
+_session_factory = None
+_engine_lock = threading.Lock()
+
+_pool_waits = {'checkouts': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0}
+_pool_waits_lock = threading.Lock()
+
+
+def _record_pool_wait(seconds: float):
+    with _pool_waits_lock:
+        _pool_waits['checkouts'] += 1
+        _pool_waits['wait_seconds_total'] += seconds
+        _pool_waits['wait_seconds_max'] = max(_pool_waits['wait_seconds_max'], seconds)
+
+
+def get_engine():
+    """
+    Return the process-wide engine, creating it on first use.
+
+    The engine is bound to the process that created it: a forked child (e.g.
+    a gunicorn worker started with --preload) drops the inherited pool
+    without closing the parent's connections and builds its own.
+
+    Returns:
+        Engine: SQLAlchemy engine with connection pooling configured
+    """
+    global _engine, _engine_pid, _session_factory
+    with _engine_lock:
+        if _engine is not None and _engine_pid != os.getpid():
+            _engine.dispose(close=False)
+            _engine = None
+
+        if _engine is None:
+            _engine = create_engine(
+                get_database_url(),
+                echo=False,
+                poolclass=TimedQueuePool,
+                pool_pre_ping=True,      # Verify connections before using
+                pool_recycle=3600,       # Recycle connections after 1 hour
+                pool_size=5,             # Connection pool size
+                max_overflow=10          # Maximum overflow connections
+            )
+            _engine_pid = os.getpid()
+            _session_factory = sessionmaker(bind=_engine)
+        return _engine
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Return connection pool statistics of this process.
+
+    Returns:
+        dict: Pool size, checked out and overflow connections, checkout wait times
+    """
+    with _pool_waits_lock:
+        waits = dict(_pool_waits)
+    waits['avg_wait_seconds'] = (waits['wait_seconds_total'] / waits['checkouts']
+                                 if waits['checkouts'] else None)
+
+    if _engine is None or _engine_pid != os.getpid():
+        return {'initialized': False, **waits}
+
+    pool = _engine.pool
+    return {
+        'initialized': True,
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'checked_in': pool.checkedin(),
+        'overflow': pool.overflow(),
+        **waits
+    }
+
+
 def init_db():
     """
     Initialize the database by creating all tables.
 
     This function should be called when the application starts.
-    Includes connection pooling configuration for MySQL production use.
-    """
-    engine = create_engine(
-        get_database_url(),
-        echo=False,
-        pool_pre_ping=True,      # Verify connections before using
-        pool_recycle=3600,       # Recycle connections after 1 hour
-        pool_size=5,             # Connection pool size
-        max_overflow=10          # Maximum overflow connections
-    )
+    """
+    engine = get_engine()
     Base.metadata.create_all(engine)
     return engine
 
@@ -158,19 +249,15 @@ def get_session():
     """
     Create and return a new database session.
 
+    Sessions are cheap: they all share the process-wide engine and its
+    connection pool. Callers close them when done, in the thread that
+    opened them.
+
     Returns:
         Session: SQLAlchemy session object
     """
-    engine = create_engine(
-        get_database_url(),
-        echo=False,
-        pool_pre_ping=True,      # Verify connections before using
-        pool_recycle=3600,       # Recycle connections after 1 hour
-        pool_size=5,             # Connection pool size
-        max_overflow=10          # Maximum overflow connections
-    )
-    Session = sessionmaker(bind=engine)
-    return Session()
+    get_engine()
+    return _session_factory()
 
 
 def get_user_by_bot_id(bot_id: str):
@@ -191,13 +278,49 @@ def get_user_by_bot_id(bot_id: str):
         session.close()
 
 
+def load_auth_snapshot(bot_id: str):
+    """
+    Load a user and whether they hold an active license, in one query.
+
+    Args:
+        bot_id: Notion bot identifier from the session token
+
+    Returns:
+        AuthSnapshot: Snapshot of the user, or None if the user does not exist
+    """
+    session = get_session()
+    try:
+        row = (session.query(User, LicenseKey.id)
+               .outerjoin(LicenseKey, (LicenseKey.used_by_user_id == User.id)
+                          & (LicenseKey.is_active.is_(True)))
+               .filter(User.bot_id == bot_id)
+               .first())
+        if row is None:
+            return None
+        user, license_id = row
+        return AuthSnapshot(
+            id=user.id,
+            bot_id=user.bot_id,
+            workspace_id=user.workspace_id,
+            workspace_name=user.workspace_name,
+            access_token=user.access_token,
+            refresh_token=user.refresh_token,
+            notion_page_id=user.notion_page_id,
+            has_license=license_id is not None,
+            token_expires_at=user.token_expires_at
+        )
+    finally:
+        session.close()
+
+
 def create_or_update_user(
     bot_id: str,
     workspace_id: str,
     access_token: str,
     workspace_name: str = None,
     refresh_token: str = None,
-    notion_page_id: str = None
+    notion_page_id: str = None,
+    token_expires_at: datetime = None
 ):
     """
     Create a new user or update existing user with OAuth tokens.
@@ -209,10 +332,12 @@ def create_or_update_user(
         workspace_name: Human-readable workspace name (optional)
         refresh_token: OAuth refresh token (optional)
         notion_page_id: Default page ID for creating notes (optional)
+        token_expires_at: Expected expiry of the access token (optional)
 
     Returns:
         User: Created or updated user object
     """
+    now = datetime.utcnow()
     session = get_session()
     try:
         user = session.query(User).filter_by(bot_id=bot_id).first()
@@ -227,7 +352,9 @@ def create_or_update_user(
                 user.refresh_token = refresh_token
             if notion_page_id:
                 user.notion_page_id = notion_page_id
-            user.updated_at = datetime.utcnow()
+            user.token_refreshed_at = now
+            user.token_expires_at = token_expires_at
+            user.updated_at = now
         else:
             # Create new user
             user = User(
@@ -236,12 +363,15 @@ def create_or_update_user(
                 workspace_name=workspace_name,
                 access_token=access_token,
                 refresh_token=refresh_token,
-                notion_page_id=notion_page_id
+                notion_page_id=notion_page_id,
+                token_refreshed_at=now,
+                token_expires_at=token_expires_at
             )
             session.add(user)
 
         session.commit()
         session.refresh(user)
+        auth_cache.invalidate(bot_id)
         return user
     except Exception as e:
         session.rollback()
@@ -250,6 +380,36 @@ def create_or_update_user(
         session.close()
 
 
+def get_users_with_expiring_tokens(before: datetime, limit: int = 50):
+    """
+    Retrieve users whose access token expires before a given time.
+
+    Users whose last renewal failed are skipped until their next attempt is
+    due, so they cannot fill every batch.
+
+    Args:
+        before: Expiry threshold (UTC)
+        limit: Maximum number of users returned, soonest expiry first
+
+    Returns:
+        List[User]: Users with a refresh token and a known, close expiry
+    """
+    now = datetime.utcnow()
+    session = get_session()
+    try:
+        return (session.query(User)
+                .filter(User.refresh_token.isnot(None),
+                        User.token_expires_at.isnot(None),
+                        User.token_expires_at < before,
+                        or_(User.next_refresh_attempt_at.is_(None),
+                            User.next_refresh_attempt_at <= now))
+                .order_by(User.token_expires_at)
+                .limit(limit)
+                .all())
+    finally:
+        session.close()
+
+
 def update_user_notion_page(bot_id: str, notion_page_id: str):
     """
     Update the default Notion page ID for a user.
@@ -269,6 +429,7 @@ def update_user_notion_page(bot_id: str, notion_page_id: str):
             user.updated_at = datetime.utcnow()
             session.commit()
             session.refresh(user)
+        auth_cache.invalidate(bot_id)
         return user
     except Exception as e:
         session.rollback()
@@ -297,6 +458,7 @@ def clear_user_notion_page(bot_id: str):
             session.commit()
             session.refresh(user)
             logger.info(f"✅ Cleared notion_page_id for user {bot_id}")
+        auth_cache.invalidate(bot_id)
         return user
     except Exception as e:
         session.rollback()
@@ -370,6 +532,7 @@ def activate_license_key(license_key: str, user_id: int) -> bool:
         license_obj.activated_at = datetime.utcnow()
 
         session.commit()
+        auth_cache.invalidate(user_id=user_id)
         return True
     except Exception as e:
         session.rollback()
@@ -440,6 +603,8 @@ def revoke_license_key(license_key: str) -> bool:
         license_obj.is_active = False
         license_obj.revoked_at = datetime.utcnow()
         session.commit()
+        if license_obj.used_by_user_id is not None:
+            auth_cache.invalidate(user_id=license_obj.used_by_user_id)
         return True
     except Exception as e:
         session.rollback()
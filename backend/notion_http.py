@@ -0,0 +1,171 @@
+"""
+Shared HTTP client for the backend's direct calls to the Notion API.
+
+One ``requests.Session`` keeps TLS connections to api.notion.com alive
+between requests. Every call goes through ``NotionHttpClient.request`` which
+applies a per-endpoint timeout, retries rate limits and server errors with
+backoff, and records per-endpoint latency histograms.
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+NOTION_API_URL = "https://api.notion.com/v1"
+NOTION_VERSION = "2022-06-28"
+
+# (connect, read) timeouts in seconds per logical endpoint
+ENDPOINT_TIMEOUTS = {
+    "search": (3.05, 15),
+    "users_me": (3.05, 10),
+    "pages": (3.05, 10),
+    "databases": (3.05, 10),
+    "oauth_token": (3.05, 10),
+}
+DEFAULT_TIMEOUT = (3.05, 30)
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, float("inf"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def notion_headers(access_token: str) -> Dict[str, str]:
+    """Headers of an authenticated Notion API call."""
+    return {
+        'Authorization': f'Bearer {access_token}',
+        'Notion-Version': NOTION_VERSION,
+        'Content-Type': 'application/json'
+    }
+
+
+class NotionHttpClient:
+    """
+    Pooled, instrumented HTTP client for Notion.
+
+    Args:
+        max_retries: Retries after a 429 or 5xx response
+        backoff_base: First backoff delay in seconds, doubled on each retry
+        max_backoff: Upper bound of a single wait, including Retry-After
+        pool_maxsize: Keep-alive connections kept per host
+    """
+
+    def __init__(self, max_retries: int = 2, backoff_base: float = 0.5,
+                 max_backoff: float = 10, pool_maxsize: int = 16):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+
+    def request(self, method: str, url: str, endpoint: str,
+                retry_server_errors: bool = True, **kwargs) -> requests.Response:
+        """
+        Send a request, retrying rate limits and transient server errors.
+
+        Args:
+            method: HTTP method
+            url: Absolute URL, or a path relative to NOTION_API_URL
+            endpoint: Logical endpoint name, selects the timeout and metrics
+            retry_server_errors: False for calls that must not be replayed
+                after the server may have processed them (e.g. a refresh
+                token exchange); 429 responses are still retried
+            **kwargs: Passed to requests (json, headers, ...)
+
+        Returns:
+            requests.Response: The last response received
+        """
+        if not url.startswith("http"):
+            url = f"{NOTION_API_URL}/{url.lstrip('/')}"
+        kwargs.setdefault("timeout", ENDPOINT_TIMEOUTS.get(endpoint, DEFAULT_TIMEOUT))
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException:
+                self._record(endpoint, time.perf_counter() - start, "error")
+                raise
+            self._record(endpoint, time.perf_counter() - start, response.status_code)
+
+            retryable = (response.status_code == 429
+                         or (retry_server_errors and response.status_code in RETRY_STATUSES))
+            if not retryable or attempt >= self.max_retries:
+                return response
+
+            delay = self._backoff(response, attempt)
+            attempt += 1
+            with self._lock:
+                self._metrics[endpoint]["retries"] += 1
+            logger.warning(f"⚠️  Notion {endpoint} returned {response.status_code}, "
+                           f"retry {attempt}/{self.max_retries} in {delay:.1f}s")
+            time.sleep(delay)
+
+    def get(self, url: str, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, endpoint, **kwargs)
+
+    def post(self, url: str, endpoint: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, endpoint, **kwargs)
+
+    def _backoff(self, response: requests.Response, attempt: int) -> float:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(self.max_backoff, max(0.0, float(retry_after)))
+            except ValueError:
+                pass  # HTTP-date form, fall back to exponential backoff
+        delay = self.backoff_base * (2 ** attempt)
+        return min(self.max_backoff, delay + random.uniform(0, delay / 2))
+
+    def _record(self, endpoint: str, seconds: float, status):
+        with self._lock:
+            metrics = self._metrics.setdefault(endpoint, {
+                "count": 0,
+                "seconds_total": 0.0,
+                "retries": 0,
+                "statuses": {},
+                "buckets": [0] * len(LATENCY_BUCKETS),
+            })
+            metrics["count"] += 1
+            metrics["seconds_total"] += seconds
+            metrics["statuses"][str(status)] = metrics["statuses"].get(str(status), 0) + 1
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    metrics["buckets"][index] += 1
+                    break
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-endpoint call counts, statuses, retries and latency histogram."""
+        with self._lock:
+            result = {}
+            for endpoint, metrics in self._metrics.items():
+                result[endpoint] = {
+                    "count": metrics["count"],
+                    "avg_seconds": metrics["seconds_total"] / metrics["count"],
+                    "retries": metrics["retries"],
+                    "statuses": dict(metrics["statuses"]),
+                    "latency_histogram": {
+                        ("+Inf" if bound == float("inf") else f"le_{bound}"): count
+                        for bound, count in zip(LATENCY_BUCKETS, metrics["buckets"])
+                    },
+                }
+            return result
+
+
+notion_http = NotionHttpClient(max_retries=int(os.getenv('NOTION_HTTP_MAX_RETRIES', 2)))
@@ -0,0 +1,261 @@
+"""
+Paginated, cached Notion page search for the page picker.
+
+Results are cached per user for a short TTL. A result set that is complete
+(first page, no ``has_more``) also answers any longer query starting with
+the same text by filtering titles locally, so typing in the picker does not
+go back to Notion on every keystroke. Identical searches running at the same
+time share one Notion call.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SEARCH_PAGE_SIZE_MAX = 100
+
+
+class SearchError(Exception):
+    """A Notion search failed; carries the JSON body and status to return."""
+
+    def __init__(self, payload: Dict[str, Any], status_code: int):
+        super().__init__(payload.get('message') or payload.get('error'))
+        self.payload = payload
+        self.status_code = status_code
+
+
+def normalize_id(notion_id: Optional[str]) -> Optional[str]:
+    """Remove dashes from a Notion ID so both forms compare equal."""
+    if not notion_id:
+        return None
+    return notion_id.replace('-', '')
+
+
+def page_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Extract the fields the page picker needs from a Notion page object.
+
+    Returns:
+        dict: id, title, icon, parent_type and parent_id
+    """
+    # Extract page title
+    title = 'Untitled'
+    properties = result.get('properties', {})
+
+    # Try to get title from various possible properties
+    for prop_value in properties.values():
+        if prop_value.get('type') == 'title':
+            title_array = prop_value.get('title', [])
+            if title_array:
+                title = title_array[0].get('plain_text', 'Untitled')
+                break
+
+    # Extract icon if present
+    icon = None
+    if result.get('icon'):
+        if result['icon'].get('type') == 'emoji':
+            icon = result['icon'].get('emoji')
+        elif result['icon'].get('type') == 'external':
+            icon = result['icon'].get('external', {}).get('url')
+        elif result['icon'].get('type') == 'file':
+            icon = result['icon'].get('file', {}).get('url')
+
+    # Extract parent information
+    parent_info = result.get('parent', {})
+    parent_type = parent_info.get('type')
+    parent_id = None
+
+    if parent_type == 'page_id':
+        parent_id = parent_info.get('page_id')
+    elif parent_type == 'database_id':
+        parent_id = parent_info.get('database_id')
+
+    return {
+        'id': result.get('id'),
+        'title': title,
+        'icon': icon,
+        'parent_type': parent_type,
+        'parent_id': parent_id
+    }
+
+
+def resolve_parent_titles(pages: List[Dict[str, Any]]):
+    """Set parent_title on pages whose parent is part of the same list."""
+    titles = {normalize_id(page['id']): page['title'] for page in pages}
+    for page in pages:
+        page['parent_title'] = titles.get(normalize_id(page['parent_id']))
+
+
+class NotionSearchCache:
+    """
+    Per-user cache of Notion search responses.
+
+    Args:
+        ttl: Seconds a response is reused
+        max_entries: Cached responses kept per user
+    """
+
+    def __init__(self, ttl: float = 30, max_entries: int = 32):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # bot_id -> {(query, cursor, page_size): (expires_at, response)}
+        self._entries: Dict[str, Dict[Tuple, Tuple[float, Dict]]] = {}
+        self._inflight: Dict[Tuple, Future] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.prefix_hits = 0
+        self.misses = 0
+        self.merged = 0
+
+    def search(self, bot_id: str, query: str,
+               fetch: Callable[[Dict[str, Any]], Dict[str, Any]],
+               start_cursor: Optional[str] = None,
+               page_size: int = SEARCH_PAGE_SIZE_MAX) -> Dict[str, Any]:
+        """
+        Return one page of search results, from the cache when possible.
+
+        Args:
+            bot_id: User the results belong to
+            query: Search text, empty to list every page
+            fetch: Sends a Notion search request body and returns the JSON
+                response; raises SearchError on failure
+            start_cursor: Cursor from a previous response's next_cursor
+            page_size: Results per page (at most 100)
+
+        Returns:
+            dict: pages, has_more and next_cursor
+        """
+        page_size = max(1, min(SEARCH_PAGE_SIZE_MAX, int(page_size)))
+        normalized = query.strip().lower()
+        key = (normalized, start_cursor, page_size)
+
+        with self._lock:
+            cached = self._lookup(bot_id, key)
+            if cached is not None:
+                self.hits += 1
+                return cached
+
+            if start_cursor is None:
+                cached = self._filter_superset(bot_id, normalized)
+                if cached is not None:
+                    self.prefix_hits += 1
+                    return cached
+
+            inflight_key = (bot_id,) + key
+            future = self._inflight.get(inflight_key)
+            if future is None:
+                self.misses += 1
+                future = Future()
+                self._inflight[inflight_key] = future
+                leader = True
+            else:
+                self.merged += 1
+                leader = False
+
+        if not leader:
+            # Same search already sent by another request: share its result
+            return future.result()
+
+        try:
+            response = self._fetch(query.strip(), start_cursor, page_size, fetch)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(response)
+            with self._lock:
+                self._store(bot_id, key, response)
+            return response
+        finally:
+            with self._lock:
+                self._inflight.pop(inflight_key, None)
+
+    def invalidate(self, bot_id: str):
+        with self._lock:
+            self._entries.pop(bot_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.prefix_hits + self.misses + self.merged
+            return {
+                'ttl_seconds': self.ttl,
+                'users': len(self._entries),
+                'entries': sum(len(entries) for entries in self._entries.values()),
+                'hits': self.hits,
+                'prefix_hits': self.prefix_hits,
+                'misses': self.misses,
+                'merged': self.merged,
+                'hit_rate': ((self.hits + self.prefix_hits + self.merged) / lookups
+                             if lookups else 0.0),
+            }
+
+    @staticmethod
+    def _fetch(query, start_cursor, page_size, fetch) -> Dict[str, Any]:
+        body = {
+            'filter': {
+                'property': 'object',
+                'value': 'page'
+            },
+            'page_size': page_size
+        }
+        if query:
+            body['query'] = query
+        if start_cursor:
+            body['start_cursor'] = start_cursor
+
+        results = fetch(body)
+
+        pages = [page_summary(result) for result in results.get('results', [])
+                 if result.get('object') == 'page']
+        resolve_parent_titles(pages)
+
+        return {
+            'pages': pages,
+            'has_more': results.get('has_more', False),
+            'next_cursor': results.get('next_cursor')
+        }
+
+    def _lookup(self, bot_id, key) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(bot_id, {}).get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def _filter_superset(self, bot_id, normalized) -> Optional[Dict[str, Any]]:
+        # A complete result set for a prefix of the query contains every page
+        # the longer query can match
+        now = time.monotonic()
+        best = None
+        for (cached_query, cursor, _), (expires_at, response) in self._entries.get(bot_id, {}).items():
+            if (cursor is None and expires_at >= now and not response['has_more']
+                    and normalized.startswith(cached_query)
+                    and (best is None or len(cached_query) > len(best[0]))):
+                best = (cached_query, response)
+        if best is None:
+            return None
+
+        # Parent titles resolved on the superset are kept
+        pages = [page for page in best[1]['pages']
+                 if normalized in page['title'].lower()]
+        return {'pages': pages, 'has_more': False, 'next_cursor': None}
+
+    def _store(self, bot_id, key, response):
+        entries = self._entries.setdefault(bot_id, {})
+        entries[key] = (time.monotonic() + self.ttl, response)
+        if len(entries) > self.max_entries:
+            now = time.monotonic()
+            for stale in [k for k, (expires_at, _) in entries.items() if expires_at < now]:
+                del entries[stale]
+            while len(entries) > self.max_entries:
+                entries.pop(next(iter(entries)))
+
+
+search_cache = NotionSearchCache(ttl=float(os.getenv('NOTION_SEARCH_CACHE_TTL', 30)))
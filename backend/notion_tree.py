@@ -0,0 +1,197 @@
+"""
+Hierarchy of the Notion pages a user can access, for the page picker.
+
+Search results only name a page's parent by ID. The tree endpoint builds the
+whole hierarchy once: pages come from the local page index, parents missing
+from it are fetched from Notion concurrently (a bounded number at a time, one
+level of ancestors per round), and the nested result is cached per user.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from notion_search import normalize_id, page_summary
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Parent types that point to an object the API can return
+FETCHABLE_PARENTS = {'page_id': 'page', 'database_id': 'database'}
+
+# Returns the pages of a user as page_summary dicts
+ListPages = Callable[[], List[Dict[str, Any]]]
+# Returns a Notion page or database object ('page' or 'database', id), or None
+FetchObject = Callable[[str, str], Optional[Dict[str, Any]]]
+
+
+def object_summary(result: Dict[str, Any]) -> Dict[str, Any]:
+    """page_summary that also reads the title of a database object."""
+    summary = page_summary(result)
+    if result.get('object') == 'database':
+        title = ''.join(part.get('plain_text', '') for part in result.get('title', []))
+        summary['title'] = title or 'Untitled'
+    summary['type'] = result.get('object', 'page')
+    return summary
+
+
+class NotionTreeCache:
+    """
+    Per-user cache of the nested page hierarchy.
+
+    Args:
+        ttl: Seconds a tree is reused
+        max_concurrency: Ancestors fetched from Notion at the same time
+        max_depth: Rounds of missing ancestors fetched before giving up
+    """
+
+    def __init__(self, ttl: float = 300, max_concurrency: int = 8, max_depth: int = 10):
+        self.ttl = ttl
+        self.max_depth = max_depth
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix="notion-tree")
+        # bot_id -> (expires_at, tree)
+        self._trees: Dict[str, tuple] = {}
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.builds = 0
+        self.ancestors_fetched = 0
+        self.build_seconds_total = 0.0
+
+    def get(self, bot_id: str, list_pages: ListPages, fetch_object: FetchObject,
+            refresh: bool = False) -> Dict[str, Any]:
+        """
+        Return the user's page tree, building it if needed.
+
+        Concurrent requests of the same user wait for a single build.
+
+        Args:
+            bot_id: User the tree belongs to
+            list_pages: Lists the user's pages
+            fetch_object: Fetches a missing ancestor from Notion
+            refresh: Rebuild even if a cached tree is still fresh
+
+        Returns:
+            dict: tree (nested nodes), pages, built_at and cached
+        """
+        with self._lock:
+            build_lock = self._build_locks.setdefault(bot_id, threading.Lock())
+
+        with build_lock:
+            with self._lock:
+                entry = self._trees.get(bot_id)
+                if not refresh and entry is not None and entry[0] >= time.monotonic():
+                    self.hits += 1
+                    return {**entry[1], 'cached': True}
+
+            tree = self._build(list_pages(), fetch_object)
+            with self._lock:
+                self._trees[bot_id] = (time.monotonic() + self.ttl, tree)
+            logger.info(f"🌳 Built page tree for {bot_id}: {tree['pages']} pages, "
+                        f"{tree['ancestors_fetched']} ancestors fetched in "
+                        f"{tree['build_seconds']:.2f}s")
+            return {**tree, 'cached': False}
+
+    def invalidate(self, bot_id: str):
+        with self._lock:
+            self._trees.pop(bot_id, None)
+
+    def _build(self, pages: List[Dict[str, Any]], fetch_object: FetchObject) -> Dict[str, Any]:
+        start = time.perf_counter()
+        nodes = {normalize_id(page['id']): {'type': 'page', **page} for page in pages}
+
+        # Fetch the missing ancestors one level per round
+        attempted = set()
+        fetched = 0
+        for _ in range(self.max_depth):
+            missing = {}
+            for node in nodes.values():
+                parent_id = normalize_id(node.get('parent_id'))
+                kind = FETCHABLE_PARENTS.get(node.get('parent_type'))
+                if kind and parent_id not in nodes and parent_id not in attempted:
+                    missing[parent_id] = (kind, node['parent_id'])
+            if not missing:
+                break
+            attempted.update(missing)
+
+            results = self._executor.map(lambda item: self._fetch(fetch_object, *item),
+                                         missing.values())
+            for summary in results:
+                if summary is not None:
+                    nodes[normalize_id(summary['id'])] = summary
+                    fetched += 1
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.builds += 1
+            self.ancestors_fetched += fetched
+            self.build_seconds_total += elapsed
+
+        return {
+            'tree': self._nest(nodes),
+            'pages': len(pages),
+            'ancestors_fetched': fetched,
+            'build_seconds': elapsed,
+            'built_at': time.time(),
+        }
+
+    @staticmethod
+    def _fetch(fetch_object: FetchObject, kind: str, object_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            result = fetch_object(kind, object_id)
+        except Exception as e:
+            logger.warning(f"⚠️  Could not fetch {kind} {object_id}: {e}")
+            return None
+        if not result or result.get('archived') or result.get('in_trash'):
+            return None
+        return object_summary(result)
+
+    @staticmethod
+    def _nest(nodes: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Compact nodes: icon and children only when present
+        compact = {}
+        for key, node in nodes.items():
+            item = {'id': node['id'], 'title': node['title'], 'type': node['type']}
+            if node.get('icon'):
+                item['icon'] = node['icon']
+            compact[key] = item
+
+        roots = []
+        for key, node in nodes.items():
+            parent = compact.get(normalize_id(node.get('parent_id')))
+            if parent is not None and parent is not compact[key]:
+                parent.setdefault('children', []).append(compact[key])
+            else:
+                roots.append(compact[key])
+
+        def sort(items):
+            items.sort(key=lambda item: item['title'].lower())
+            for item in items:
+                if 'children' in item:
+                    sort(item['children'])
+        sort(roots)
+        return roots
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'ttl_seconds': self.ttl,
+                'users': len(self._trees),
+                'hits': self.hits,
+                'builds': self.builds,
+                'ancestors_fetched': self.ancestors_fetched,
+                'avg_build_seconds': (self.build_seconds_total / self.builds
+                                      if self.builds else None),
+            }
+
+
+tree_cache = NotionTreeCache(
+    ttl=float(os.getenv('NOTION_TREE_CACHE_TTL', 300)),
+    max_concurrency=int(os.getenv('NOTION_TREE_MAX_CONCURRENCY', 8))
+)
@@ -7,15 +7,17 @@ for the Notes2Notion application.
 
 import os
 import base64
-import requests
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify
 from typing import Optional, Dict, Any
 import logging
+import threading
 
-from models import get_user_by_bot_id, create_or_update_user
+from models import get_user_by_bot_id, create_or_update_user, load_auth_snapshot
+from auth_cache import auth_cache
+from notion_http import notion_http
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -32,6 +34,13 @@ JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24 * 7  # 1 week
 
+# Tokens closer than this to their expiry are renewed and no longer trusted
+# without a preflight call
+NOTION_TOKEN_REFRESH_MARGIN = int(os.getenv("NOTION_TOKEN_REFRESH_MARGIN", 600))
+# Wait before retrying a failed renewal, doubled after each failure in a row
+TOKEN_REFRESH_RETRY_BACKOFF = int(os.getenv("TOKEN_REFRESH_RETRY_BACKOFF", 300))
+TOKEN_REFRESH_RETRY_MAX_BACKOFF = int(os.getenv("TOKEN_REFRESH_RETRY_MAX_BACKOFF", 6 * 3600))
+
 
 def exchange_code_for_token(code: str) -> Dict[str, Any]:
     """
@@ -76,12 +85,14 @@ def exchange_code_for_token(code: str) -> Dict[str, Any]:
         "redirect_uri": NOTION_REDIRECT_URI
     }
 
-    # Make request to Notion OAuth endpoint
-    response = requests.post(
+    # Make request to Notion OAuth endpoint. Authorization codes are single
+    # use, so server errors are not replayed.
+    response = notion_http.post(
         NOTION_OAUTH_TOKEN_URL,
+        endpoint="oauth_token",
+        retry_server_errors=False,
         json=payload,
-        headers=headers,
-        timeout=10
+        headers=headers
     )
 
     if response.status_code != 200:
@@ -91,6 +102,42 @@ def exchange_code_for_token(code: str) -> Dict[str, Any]:
     return response.json()
 
 
+def token_expiry(token_data: Dict[str, Any], now: datetime = None) -> Optional[datetime]:
+    """
+    Compute when a freshly issued Notion access token expires.
+
+    Args:
+        token_data: Notion token response
+        now: Issue time, defaults to the current UTC time
+
+    Returns:
+        datetime: Expiry (UTC), or None when Notion gives no expires_in. Such
+        tokens are neither renewed in the background nor trusted without a
+        preflight call.
+    """
+    lifetime = token_data.get('expires_in')
+    if not lifetime:
+        return None
+    now = now or datetime.utcnow()
+    return now + timedelta(seconds=int(lifetime))
+
+
+def is_token_fresh(user) -> bool:
+    """
+    Tell whether the user's access token is known to be valid for a while.
+
+    Args:
+        user: User object or AuthSnapshot with token_expires_at
+
+    Returns:
+        bool: True if the token expires more than the refresh margin from now
+    """
+    expires_at = getattr(user, 'token_expires_at', None)
+    if expires_at is None:
+        return False
+    return datetime.utcnow() < expires_at - timedelta(seconds=NOTION_TOKEN_REFRESH_MARGIN)
+
+
 def create_session_token(bot_id: str) -> str:
     """
     Create a JWT session token for authenticated users.
@@ -124,9 +171,16 @@ def verify_session_token(token: str) -> Optional[str]:
     Returns:
         str: bot_id if token is valid, None otherwise
     """
+    bot_id = auth_cache.get_token(token)
+    if bot_id:
+        return bot_id
+
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload.get("bot_id")
+        bot_id = payload.get("bot_id")
+        if bot_id and payload.get("exp"):
+            auth_cache.put_token(token, bot_id, payload["exp"])
+        return bot_id
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
@@ -167,7 +221,7 @@ def require_oauth(f):
             return jsonify({'user': current_user.workspace_name})
 
     The decorated function receives a 'current_user' parameter containing
-    the User object from the database.
+    an AuthSnapshot of the user (see auth_cache.py).
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -179,28 +233,24 @@ def require_oauth(f):
 
         token = auth_header[7:]  # Remove "Bearer " prefix
 
-        # Verify token and get user
-        current_user = get_current_user_from_token(token)
+        # Verify token and get user with their license status, served from
+        # the auth cache when possible
+        bot_id = verify_session_token(token)
+        current_user = auth_cache.get(bot_id) if bot_id else None
+        if bot_id and current_user is None:
+            current_user = load_auth_snapshot(bot_id)
+            if current_user:
+                auth_cache.put(current_user)
 
         if not current_user:
             return jsonify({'error': 'Invalid or expired token'}), 401
 
         # NEW: Check user has valid license
-        from models import get_session, LicenseKey
-        session = get_session()
-        try:
-            license_obj = session.query(LicenseKey).filter_by(
-                used_by_user_id=current_user.id,
-                is_active=True
-            ).first()
-
-            if not license_obj:
-                return jsonify({
-                    'error': 'No valid license',
-                    'message': 'Votre licence est invalide ou a été révoquée'
-                }), 403  # 403 Forbidden (authenticated but not authorized)
-        finally:
-            session.close()
+        if not current_user.has_license:
+            return jsonify({
+                'error': 'No valid license',
+                'message': 'Votre licence est invalide ou a été révoquée'
+            }), 403  # 403 Forbidden (authenticated but not authorized)
 
         # Inject current_user into the route function
         kwargs['current_user'] = current_user
@@ -250,7 +300,8 @@ def handle_oauth_callback(code: str, license_key: str = None) -> Dict[str, Any]:
         workspace_id=workspace_id,
         access_token=access_token,
         workspace_name=workspace_name,
-        refresh_token=refresh_token
+        refresh_token=refresh_token,
+        token_expires_at=token_expiry(oauth_response)
     )
 
     # NEW: Activate license key if provided
@@ -330,29 +381,52 @@ def ensure_valid_token(user) -> str:
     return user.access_token
 
 
-def refresh_notion_token(user) -> Dict[str, str]:
-    """
-    Refresh a Notion access token using the refresh token.
+# Per-user locks so concurrent refreshes in this process wait for each other
+_refresh_locks: Dict[str, threading.Lock] = {}
+_refresh_locks_guard = threading.Lock()
 
-    This function implements the OAuth 2.0 refresh token flow with Notion.
-    It sends a POST request to Notion's token endpoint with the refresh_token
-    and receives a new access_token.
+# Refresh counters of this process
+_refresh_stats = {'refreshes': 0, 'coalesced': 0, 'failures': 0, 'revoked': 0}
+_refresh_stats_lock = threading.Lock()
+
+
+class TokenRefreshError(Exception):
+    """Notion refused a token refresh; ``error`` is its OAuth error code."""
+
+    def __init__(self, error: str):
+        super().__init__(f"Notion token refresh failed: {error}")
+        self.error = error
+
+
+def _count_refresh(outcome: str):
+    with _refresh_stats_lock:
+        _refresh_stats[outcome] += 1
+
+
+def _get_refresh_lock(bot_id: str) -> threading.Lock:
+    with _refresh_locks_guard:
+        return _refresh_locks.setdefault(bot_id, threading.Lock())
+
+
+def get_refresh_stats() -> Dict[str, int]:
+    """Return token refresh counters (performed, coalesced, failed, revoked)."""
+    with _refresh_stats_lock:
+        return dict(_refresh_stats)
+
+
+def request_token_refresh(refresh_token: str) -> Dict[str, Any]:
+    """
+    Call Notion's token endpoint with a refresh token.
 
     Args:
-        user: User object with refresh_token
+        refresh_token: Current refresh token of the user
 
     Returns:
-        dict: Token response containing:
-            - access_token: New Notion API access token
-            - refresh_token: New refresh token (may be the same or rotated)
+        dict: Notion token response (access_token, possibly a rotated refresh_token)
 
     Raises:
-        Exception: If token refresh fails or user has no refresh token
+        Exception: If Notion rejects the refresh
     """
-    # Validate refresh token exists
-    if not user.refresh_token:
-        raise ValueError(f"User {user.bot_id} has no refresh token stored")
-
     # Validate configuration
     if not NOTION_CLIENT_ID or not NOTION_CLIENT_SECRET:
         raise ValueError("NOTION_CLIENT_ID and NOTION_CLIENT_SECRET must be set")
@@ -369,46 +443,134 @@ def refresh_notion_token(user) -> Dict[str, str]:
 
     payload = {
         "grant_type": "refresh_token",
-        "refresh_token": user.refresh_token
+        "refresh_token": refresh_token
     }
 
-    # Make request to Notion OAuth endpoint
-    response = requests.post(
+    # Make request to Notion OAuth endpoint. A 5xx may hide a refresh that
+    # went through and rotated the refresh token, so it is not replayed.
+    response = notion_http.post(
         NOTION_OAUTH_TOKEN_URL,
+        endpoint="oauth_token",
+        retry_server_errors=False,
         json=payload,
-        headers=headers,
-        timeout=10
+        headers=headers
     )
 
     if response.status_code != 200:
         error_data = response.json()
         error_msg = error_data.get('error', 'Unknown error')
-        raise Exception(f"Notion token refresh failed: {error_msg}")
+        raise TokenRefreshError(error_msg)
 
-    token_data = response.json()
+    return response.json()
 
-    # Update user's tokens in database
-    from models import get_session
-    session = get_session()
-    try:
-        user.access_token = token_data['access_token']
-        # Notion may rotate the refresh token, so update it if present
-        if 'refresh_token' in token_data:
-            user.refresh_token = token_data['refresh_token']
-        user.updated_at = datetime.utcnow()
 
-        session.add(user)
-        session.commit()
-        session.refresh(user)
+def refresh_notion_token(user) -> Dict[str, str]:
+    """
+    Refresh a Notion access token using the refresh token.
+
+    This function implements the OAuth 2.0 refresh token flow with Notion.
+    It sends a POST request to Notion's token endpoint with the refresh_token
+    and receives a new access_token.
 
-        logger.info(f"✅ Successfully refreshed token for user {user.bot_id}")
+    Refreshes are single-flight per user: a process-wide lock serializes
+    callers of this worker and a row lock (SELECT ... FOR UPDATE) serializes
+    gunicorn workers. A caller that gets the lock after another one has
+    already replaced the expired access token reuses the new tokens instead
+    of spending the (possibly rotated) refresh token again.
+
+    Args:
+        user: User object or AuthSnapshot with bot_id and the access_token
+              that was rejected
 
-        return {
-            'access_token': token_data['access_token'],
-            'refresh_token': token_data.get('refresh_token', user.refresh_token)
-        }
+    Returns:
+        dict: Token response containing:
+            - access_token: New Notion API access token
+            - refresh_token: New refresh token (may be the same or rotated)
+
+    A failed refresh postpones the next background attempt with exponential
+    backoff; a refresh token Notion reports as ``invalid_grant`` is dropped,
+    the user has to reconnect.
+
+    Raises:
+        Exception: If token refresh fails or user has no refresh token
+    """
+    from models import get_session, User
+
+    with _get_refresh_lock(user.bot_id):
+        session = get_session()
+        db_user = None
+        try:
+            # Reload and lock the row: the caller may hold a cached snapshot,
+            # and another worker may be refreshing the same user
+            db_user = (session.query(User)
+                       .filter_by(bot_id=user.bot_id)
+                       .with_for_update()
+                       .first())
+            if not db_user:
+                raise ValueError(f"User {user.bot_id} no longer exists")
+
+            if db_user.access_token != user.access_token:
+                # Somebody refreshed while we were waiting for the lock
+                session.commit()
+                _count_refresh('coalesced')
+                logger.info(f"🔁 Token already refreshed for user {user.bot_id}, reusing it")
+                return {
+                    'access_token': db_user.access_token,
+                    'refresh_token': db_user.refresh_token
+                }
+
+            # Validate refresh token exists
+            if not db_user.refresh_token:
+                raise ValueError(f"User {user.bot_id} has no refresh token stored")
+
+            token_data = request_token_refresh(db_user.refresh_token)
+            now = datetime.utcnow()
+
+            db_user.access_token = token_data['access_token']
+            # Notion may rotate the refresh token, so update it if present
+            if 'refresh_token' in token_data:
+                db_user.refresh_token = token_data['refresh_token']
+            db_user.token_refreshed_at = now
+            db_user.token_expires_at = token_expiry(token_data, now)
+            db_user.token_refresh_failures = 0
+            db_user.next_refresh_attempt_at = None
+            db_user.updated_at = now
+
+            session.commit()
+            auth_cache.invalidate(user.bot_id)
+            _count_refresh('refreshes')
+
+            logger.info(f"✅ Successfully refreshed token for user {user.bot_id}")
+
+            return {
+                'access_token': token_data['access_token'],
+                'refresh_token': token_data.get('refresh_token', db_user.refresh_token)
+            }
+        except Exception as e:
+            session.rollback()
+            _count_refresh('failures')
+            if db_user is not None:
+                _postpone_refresh(session, db_user, e)
+            raise e
+        finally:
+            session.close()
+
+
+def _postpone_refresh(session, db_user, error: Exception):
+    """Record a failed refresh: back off, and forget a revoked refresh token."""
+    try:
+        failures = (db_user.token_refresh_failures or 0) + 1
+        delay = min(TOKEN_REFRESH_RETRY_MAX_BACKOFF,
+                    TOKEN_REFRESH_RETRY_BACKOFF * 2 ** min(failures - 1, 16))
+        db_user.token_refresh_failures = failures
+        db_user.next_refresh_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+        if isinstance(error, TokenRefreshError) and error.error == 'invalid_grant':
+            db_user.refresh_token = None
+            _count_refresh('revoked')
+            logger.warning(f"🚫 Refresh token of user {db_user.bot_id} was revoked, "
+                           f"the user has to reconnect")
+        session.commit()
+        auth_cache.invalidate(db_user.bot_id)
     except Exception as e:
         session.rollback()
-        raise e
-    finally:
-        session.close()
+        logger.error(f"❌ Could not record the failed refresh of {db_user.bot_id}: {e}")
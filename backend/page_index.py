@@ -0,0 +1,423 @@
+"""
+Local full-text index of the Notion pages each user can access.
+
+The page picker searches titles as the user types. Instead of proxying every
+keystroke to Notion's search API, the pages of each user are crawled into a
+SQLite FTS5 table (trigram tokenizer, so any 3+ character substring matches)
+and searched locally; close misspellings are caught with a difflib pass.
+
+Crawls are incremental: Notion search results are read newest first by
+``last_edited_time`` and the crawl stops at the checkpoint of the previous
+one. Deleted pages do not show up in incremental crawls, so a full crawl
+replaces the user's pages every ``full_crawl_interval`` seconds.
+"""
+
+import difflib
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from notion_search import normalize_id, page_summary
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CURSOR_PREFIX = "idx:"
+
+# Sends a Notion search request body and returns the JSON response
+SearchFetch = Callable[[Dict[str, Any]], Dict[str, Any]]
+
+
+class PageIndex:
+    """
+    Per-user index of page id, title, icon and parent.
+
+    Args:
+        path: SQLite file holding the index
+        max_age: Seconds after which a search triggers a background crawl
+        full_crawl_interval: Seconds between two full crawls of a user
+        max_workers: Background crawls running at the same time
+        fuzzy_cutoff: Minimum difflib ratio of a typo-tolerant match
+    """
+
+    def __init__(self, path: str, max_age: float = 600,
+                 full_crawl_interval: float = 6 * 3600, max_workers: int = 2,
+                 fuzzy_cutoff: float = 0.7):
+        self.path = str(path)
+        self.max_age = max_age
+        self.full_crawl_interval = full_crawl_interval
+        self.fuzzy_cutoff = fuzzy_cutoff
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="page-index")
+        self._crawling: set[str] = set()
+        self._lock = threading.Lock()
+
+        self.crawls = 0
+        self.full_crawls = 0
+        self.crawl_failures = 0
+        self.crawl_seconds_total = 0.0
+        self.queries = 0
+        self.query_seconds_total = 0.0
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self.fts = self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _init_schema(self) -> bool:
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                " id INTEGER PRIMARY KEY,"
+                " bot_id TEXT NOT NULL,"
+                " page_id TEXT NOT NULL,"
+                " norm_id TEXT NOT NULL,"
+                " title TEXT NOT NULL,"
+                " icon TEXT,"
+                " parent_type TEXT,"
+                " parent_id TEXT,"
+                " last_edited_time TEXT,"
+                " UNIQUE (bot_id, page_id))")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_pages_bot_norm ON pages (bot_id, norm_id)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS crawl_state ("
+                " bot_id TEXT PRIMARY KEY,"
+                " checkpoint TEXT,"
+                " last_crawl_at REAL,"
+                " last_full_crawl_at REAL,"
+                " last_crawl_seconds REAL,"
+                " last_error TEXT)")
+            try:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS pages_fts "
+                    "USING fts5(title, tokenize='trigram')")
+                return True
+            except sqlite3.OperationalError as e:
+                # SQLite without FTS5 or the trigram tokenizer (< 3.34)
+                logger.warning(f"⚠️  Page index without FTS5, using LIKE: {e}")
+                return False
+
+    # Crawling
+
+    def crawl(self, bot_id: str, fetch: SearchFetch, full: bool = False) -> Dict[str, Any]:
+        """
+        Bring the index of one user up to date.
+
+        Args:
+            bot_id: User whose pages are crawled
+            fetch: Notion search function authenticated as this user
+            full: Re-read every page and drop the ones that disappeared
+
+        Returns:
+            dict: Index status of the user
+        """
+        start = time.perf_counter()
+        state = self._state(bot_id)
+        full = (full or state is None or not state['checkpoint']
+                or time.time() - (state['last_full_crawl_at'] or 0) > self.full_crawl_interval)
+        checkpoint = None if full else state['checkpoint']
+
+        try:
+            pages, removed, newest = self._read_pages(fetch, checkpoint)
+        except Exception as e:
+            with self._lock:
+                self.crawl_failures += 1
+            self._save_state(bot_id, error=str(e))
+            raise
+
+        with closing(self._connect()) as conn, conn:
+            for page, edited in pages:
+                self._upsert(conn, bot_id, page, edited)
+            for page_id in removed:
+                self._delete(conn, bot_id, page_id)
+            if full:
+                seen = {page['id'] for page, _ in pages}
+                stale = [row['page_id'] for row in conn.execute(
+                    "SELECT page_id FROM pages WHERE bot_id = ?", (bot_id,))
+                    if row['page_id'] not in seen]
+                for page_id in stale:
+                    self._delete(conn, bot_id, page_id)
+
+        elapsed = time.perf_counter() - start
+        self._save_state(bot_id, checkpoint=max(filter(None, [newest, checkpoint]), default=None),
+                         full=full, seconds=elapsed)
+        with self._lock:
+            self.crawls += 1
+            self.full_crawls += int(full)
+            self.crawl_seconds_total += elapsed
+        logger.info(f"📇 {'Full' if full else 'Incremental'} page index crawl for "
+                    f"{bot_id}: {len(pages)} updated, {len(removed)} removed in {elapsed:.2f}s")
+        return self.status(bot_id)
+
+    def schedule_crawl(self, bot_id: str, fetch: SearchFetch, full: bool = False) -> bool:
+        """
+        Crawl in the background unless a crawl of this user is running.
+
+        Returns:
+            bool: True if a crawl was scheduled
+        """
+        with self._lock:
+            if bot_id in self._crawling:
+                return False
+            self._crawling.add(bot_id)
+
+        def run():
+            try:
+                self.crawl(bot_id, fetch, full=full)
+            except Exception as e:
+                logger.warning(f"⚠️  Page index crawl failed for {bot_id}: {e}")
+            finally:
+                with self._lock:
+                    self._crawling.discard(bot_id)
+
+        self._executor.submit(run)
+        return True
+
+    @staticmethod
+    def _read_pages(fetch: SearchFetch, checkpoint: Optional[str]):
+        pages, removed, newest = [], [], None
+        cursor = None
+        while True:
+            body = {
+                'filter': {'property': 'object', 'value': 'page'},
+                'sort': {'direction': 'descending', 'timestamp': 'last_edited_time'},
+                'page_size': 100
+            }
+            if cursor:
+                body['start_cursor'] = cursor
+            results = fetch(body)
+
+            reached_checkpoint = False
+            for result in results.get('results', []):
+                if result.get('object') != 'page':
+                    continue
+                edited = result.get('last_edited_time')
+                if checkpoint and edited and edited < checkpoint:
+                    # Everything older was indexed by a previous crawl
+                    reached_checkpoint = True
+                    break
+                if edited and (newest is None or edited > newest):
+                    newest = edited
+                if result.get('archived') or result.get('in_trash'):
+                    removed.append(result.get('id'))
+                else:
+                    pages.append((page_summary(result), edited))
+
+            if reached_checkpoint or not results.get('has_more') or not results.get('next_cursor'):
+                return pages, removed, newest
+            cursor = results['next_cursor']
+
+    def _upsert(self, conn, bot_id, page, edited):
+        conn.execute(
+            "INSERT INTO pages (bot_id, page_id, norm_id, title, icon, parent_type,"
+            " parent_id, last_edited_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (bot_id, page_id) DO UPDATE SET title = excluded.title,"
+            " icon = excluded.icon, parent_type = excluded.parent_type,"
+            " parent_id = excluded.parent_id, last_edited_time = excluded.last_edited_time",
+            (bot_id, page['id'], normalize_id(page['id']), page['title'], page['icon'],
+             page['parent_type'], page['parent_id'], edited))
+        if self.fts:
+            rowid = conn.execute("SELECT id FROM pages WHERE bot_id = ? AND page_id = ?",
+                                 (bot_id, page['id'])).fetchone()['id']
+            conn.execute("DELETE FROM pages_fts WHERE rowid = ?", (rowid,))
+            conn.execute("INSERT INTO pages_fts (rowid, title) VALUES (?, ?)",
+                         (rowid, page['title']))
+
+    def _delete(self, conn, bot_id, page_id):
+        row = conn.execute("SELECT id FROM pages WHERE bot_id = ? AND page_id = ?",
+                           (bot_id, page_id)).fetchone()
+        if row is None:
+            return
+        if self.fts:
+            conn.execute("DELETE FROM pages_fts WHERE rowid = ?", (row['id'],))
+        conn.execute("DELETE FROM pages WHERE id = ?", (row['id'],))
+
+    # State
+
+    def _state(self, bot_id: str) -> Optional[sqlite3.Row]:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT * FROM crawl_state WHERE bot_id = ?",
+                                (bot_id,)).fetchone()
+
+    def _save_state(self, bot_id, checkpoint=None, full=False, seconds=None, error=None):
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR IGNORE INTO crawl_state (bot_id) VALUES (?)", (bot_id,))
+            if error is not None:
+                conn.execute("UPDATE crawl_state SET last_error = ? WHERE bot_id = ?",
+                             (error, bot_id))
+                return
+            conn.execute(
+                "UPDATE crawl_state SET checkpoint = ?, last_crawl_at = ?,"
+                " last_crawl_seconds = ?, last_error = NULL,"
+                " last_full_crawl_at = CASE WHEN ? THEN ? ELSE last_full_crawl_at END"
+                " WHERE bot_id = ?",
+                (checkpoint, now, seconds, full, now, bot_id))
+
+    def is_ready(self, bot_id: str) -> bool:
+        """True once a crawl of this user has completed."""
+        state = self._state(bot_id)
+        return state is not None and state['last_crawl_at'] is not None
+
+    def is_stale(self, bot_id: str) -> bool:
+        state = self._state(bot_id)
+        return (state is None or state['last_crawl_at'] is None
+                or time.time() - state['last_crawl_at'] > self.max_age)
+
+    def status(self, bot_id: str) -> Dict[str, Any]:
+        """Freshness of one user's index."""
+        state = self._state(bot_id)
+        with closing(self._connect()) as conn:
+            count = conn.execute("SELECT COUNT(*) FROM pages WHERE bot_id = ?",
+                                 (bot_id,)).fetchone()[0]
+        last_crawl_at = state['last_crawl_at'] if state else None
+        return {
+            'pages': count,
+            'checkpoint': state['checkpoint'] if state else None,
+            'last_crawl_at': last_crawl_at,
+            'age_seconds': time.time() - last_crawl_at if last_crawl_at else None,
+            'last_full_crawl_at': state['last_full_crawl_at'] if state else None,
+            'last_crawl_seconds': state['last_crawl_seconds'] if state else None,
+            'last_error': state['last_error'] if state else None,
+            'crawling': bot_id in self._crawling,
+        }
+
+    def pages(self, bot_id: str) -> List[Dict[str, Any]]:
+        """Every indexed page of one user."""
+        with closing(self._connect()) as conn:
+            return [self._to_page(row) for row in conn.execute(
+                "SELECT * FROM pages WHERE bot_id = ?", (bot_id,))]
+
+    # Search
+
+    def search(self, bot_id: str, query: str, start_cursor: Optional[str] = None,
+               page_size: int = 100) -> Dict[str, Any]:
+        """
+        Search the titles of one user's pages.
+
+        Args:
+            bot_id: User whose pages are searched
+            query: Search text, empty to list every page
+            start_cursor: next_cursor of a previous index response
+            page_size: Results per response
+
+        Returns:
+            dict: pages, has_more and next_cursor, like /api/notion/search
+        """
+        start = time.perf_counter()
+        offset = 0
+        if start_cursor and start_cursor.startswith(CURSOR_PREFIX):
+            offset = int(start_cursor[len(CURSOR_PREFIX):] or 0)
+
+        with closing(self._connect()) as conn:
+            # One extra row tells whether another page of results follows
+            rows = self._match(conn, bot_id, query.strip(), page_size + 1, offset)
+            pages = [self._to_page(row) for row in rows[:page_size]]
+            self._resolve_parents(conn, bot_id, pages)
+
+        has_more = len(rows) > page_size
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.queries += 1
+            self.query_seconds_total += elapsed
+        return {
+            'pages': pages,
+            'has_more': has_more,
+            'next_cursor': f"{CURSOR_PREFIX}{offset + page_size}" if has_more else None
+        }
+
+    def _match(self, conn, bot_id, query, limit, offset=0) -> List[sqlite3.Row]:
+        if not query:
+            return conn.execute(
+                "SELECT * FROM pages WHERE bot_id = ? ORDER BY title COLLATE NOCASE"
+                " LIMIT ? OFFSET ?", (bot_id, limit, offset)).fetchall()
+
+        if self.fts and len(query) >= 3:
+            phrase = '"' + query.replace('"', '""') + '"'
+            sql = ("SELECT p.* FROM pages_fts f JOIN pages p ON p.id = f.rowid"
+                   " WHERE pages_fts MATCH ? AND p.bot_id = ? ORDER BY f.rank")
+            params = (phrase, bot_id)
+        else:
+            escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            sql = ("SELECT * FROM pages WHERE bot_id = ? AND title LIKE ? ESCAPE '\\'"
+                   " ORDER BY title COLLATE NOCASE")
+            params = (bot_id, f"%{escaped}%")
+
+        rows = conn.execute(f"{sql} LIMIT ? OFFSET ?", (*params, limit, offset)).fetchall()
+        if rows or len(query) < 3:
+            return rows
+        # Typo tolerance, only when no title contains the query at all
+        if offset and conn.execute(f"{sql} LIMIT 1", params).fetchone() is not None:
+            return rows
+        return self._fuzzy(conn, bot_id, query)[offset:offset + limit]
+
+    def _fuzzy(self, conn, bot_id, query) -> List[sqlite3.Row]:
+        # Compare the query with every word of every title
+        query = query.lower()
+        scored = []
+        for row in conn.execute("SELECT * FROM pages WHERE bot_id = ?", (bot_id,)):
+            words = row['title'].lower().split() or ['']
+            score = max(difflib.SequenceMatcher(None, query, word).ratio() for word in words)
+            if score >= self.fuzzy_cutoff:
+                scored.append((score, row))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [row for _, row in scored]
+
+    @staticmethod
+    def _to_page(row) -> Dict[str, Any]:
+        return {
+            'id': row['page_id'],
+            'title': row['title'],
+            'icon': row['icon'],
+            'parent_type': row['parent_type'],
+            'parent_id': row['parent_id'],
+        }
+
+    @staticmethod
+    def _resolve_parents(conn, bot_id, pages):
+        parent_ids = {normalize_id(page['parent_id']) for page in pages if page['parent_id']}
+        titles = {}
+        if parent_ids:
+            placeholders = ",".join("?" * len(parent_ids))
+            titles = {row['norm_id']: row['title'] for row in conn.execute(
+                f"SELECT norm_id, title FROM pages WHERE bot_id = ? AND norm_id IN ({placeholders})",
+                (bot_id, *parent_ids))}
+        for page in pages:
+            page['parent_title'] = titles.get(normalize_id(page['parent_id']))
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size, crawl activity and freshness across users."""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            pages = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            ages = [now - row[0] for row in conn.execute(
+                "SELECT last_crawl_at FROM crawl_state WHERE last_crawl_at IS NOT NULL")]
+        with self._lock:
+            return {
+                'fts': self.fts,
+                'users': len(ages),
+                'pages': pages,
+                'max_age_seconds': self.max_age,
+                'oldest_crawl_age_seconds': max(ages) if ages else None,
+                'avg_crawl_age_seconds': sum(ages) / len(ages) if ages else None,
+                'crawling': len(self._crawling),
+                'crawls': self.crawls,
+                'full_crawls': self.full_crawls,
+                'crawl_failures': self.crawl_failures,
+                'avg_crawl_seconds': (self.crawl_seconds_total / self.crawls
+                                      if self.crawls else None),
+                'queries': self.queries,
+                'avg_query_ms': (1000 * self.query_seconds_total / self.queries
+                                 if self.queries else None),
+            }
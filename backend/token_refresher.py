@@ -0,0 +1,118 @@
+"""
+Background renewal of Notion access tokens before they expire.
+
+A daemon thread periodically looks for users whose token expires within the
+refresh margin and renews it with ``refresh_notion_token``. Refreshes are
+single-flight per user, so several gunicorn workers running their own
+refresher never spend the same refresh token twice.
+
+Tokens renewed this way are known to be fresh, which lets ``/api/upload``
+skip its ``GET /v1/users/me`` preflight call.
+"""
+
+import logging
+import threading
+from datetime import datetime, timedelta
+
+from models import get_users_with_expiring_tokens
+from oauth import NOTION_TOKEN_REFRESH_MARGIN, refresh_notion_token
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class TokenRefresher:
+    """
+    Renew the tokens expiring within ``margin`` seconds every ``interval``.
+
+    Args:
+        interval: Seconds between two sweeps
+        margin: Renew tokens expiring sooner than this many seconds
+        batch_size: Maximum number of tokens renewed per sweep
+    """
+
+    def __init__(self, interval: float = 60,
+                 margin: float = NOTION_TOKEN_REFRESH_MARGIN,
+                 batch_size: int = 50):
+        self.interval = interval
+        self.margin = margin
+        self.batch_size = batch_size
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+        self.sweeps = 0
+        self.refreshed = 0
+        self.failed = 0
+        self.preflights = 0
+        self.preflights_avoided = 0
+
+    def start(self):
+        """Start the background thread (once per process)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="token-refresher",
+                                        daemon=True)
+        self._thread.start()
+        logger.info(f"🔄 Token refresher started (every {self.interval}s)")
+
+    def stop(self):
+        self._stop.set()
+
+    def sweep(self) -> int:
+        """
+        Renew every token due for renewal now.
+
+        Returns:
+            int: Number of tokens renewed
+        """
+        due_before = datetime.utcnow() + timedelta(seconds=self.margin)
+        users = get_users_with_expiring_tokens(due_before, limit=self.batch_size)
+
+        renewed = 0
+        for user in users:
+            try:
+                refresh_notion_token(user)
+                renewed += 1
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                logger.warning(f"⚠️  Background token refresh failed for {user.bot_id}: {e}")
+
+        with self._lock:
+            self.sweeps += 1
+            self.refreshed += renewed
+        if renewed:
+            logger.info(f"✅ Renewed {renewed} Notion token(s) ahead of expiry")
+        return renewed
+
+    def record_preflight(self, avoided: bool):
+        """Count an upload token check, performed or skipped."""
+        with self._lock:
+            if avoided:
+                self.preflights_avoided += 1
+            else:
+                self.preflights += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            checks = self.preflights + self.preflights_avoided
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'sweeps': self.sweeps,
+                'refreshed': self.refreshed,
+                'failed': self.failed,
+                'preflights': self.preflights,
+                'preflights_avoided': self.preflights_avoided,
+                'preflight_avoided_rate': (self.preflights_avoided / checks
+                                           if checks else 0.0),
+            }
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"❌ Token refresher sweep failed: {e}")
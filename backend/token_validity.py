@@ -0,0 +1,101 @@
+"""
+Short-lived memory of Notion access tokens known to be valid.
+
+Any successful Notion call made with a token (search, upload pipeline,
+preflight) proves it valid. For the next ``window`` seconds ``/api/upload``
+trusts it and skips its ``GET /v1/users/me`` preflight.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from typing import Optional
+
+
+class TokenValidityCache:
+    """
+    Remember when each access token last succeeded against Notion.
+
+    Tokens are stored as SHA-256 digests. A refreshed token is a new key,
+    so entries of replaced tokens simply age out.
+    """
+
+    def __init__(self, window: float = 300, max_entries: int = 4096):
+        self.window = window
+        self.max_entries = max_entries
+
+        self._validated_at: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.preflights = 0
+        self.preflights_avoided = 0
+        self.preflight_seconds_total = 0.0
+
+    @staticmethod
+    def _key(access_token: str) -> str:
+        return hashlib.sha256(access_token.encode()).hexdigest()
+
+    def is_valid(self, access_token: str) -> bool:
+        """True if the token succeeded against Notion within the window."""
+        key = self._key(access_token)
+        with self._lock:
+            validated_at = self._validated_at.get(key)
+            if validated_at is not None and time.monotonic() - validated_at <= self.window:
+                self.hits += 1
+                return True
+            self._validated_at.pop(key, None)
+            self.misses += 1
+            return False
+
+    def mark_valid(self, access_token: Optional[str]):
+        """Record a successful Notion call made with this token."""
+        if not access_token:
+            return
+        key = self._key(access_token)
+        now = time.monotonic()
+        with self._lock:
+            self._validated_at[key] = now
+            if len(self._validated_at) > self.max_entries:
+                self._validated_at = {k: t for k, t in self._validated_at.items()
+                                      if now - t <= self.window}
+
+    def invalidate(self, access_token: str):
+        with self._lock:
+            self._validated_at.pop(self._key(access_token), None)
+
+    def record_preflight(self, seconds: float):
+        """Record the duration of a preflight call that could not be skipped."""
+        with self._lock:
+            self.preflights += 1
+            self.preflight_seconds_total += seconds
+
+    def record_avoided(self):
+        """Record a preflight skipped because the token is known to be fresh."""
+        with self._lock:
+            self.preflights_avoided += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_preflight = (self.preflight_seconds_total / self.preflights
+                             if self.preflights else None)
+            return {
+                'window_seconds': self.window,
+                'entries': len(self._validated_at),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'preflights': self.preflights,
+                'preflights_avoided': self.preflights_avoided,
+                'avg_preflight_seconds': avg_preflight,
+                # Each hit or fresh token saved one preflight round trip
+                'estimated_seconds_saved': ((self.hits + self.preflights_avoided)
+                                            * avg_preflight
+                                            if avg_preflight is not None else None),
+            }
+
+
+token_validity = TokenValidityCache(window=float(os.getenv('TOKEN_VALIDITY_WINDOW', 300)))
@@ -0,0 +1,42 @@
+import { NextRequest, NextResponse } from 'next/server';
+
+const API_URL = process.env.INTERNAL_API_URL;
+
+// IMPORTANT: Disable Next.js caching for this route (the job state changes)
+export const dynamic = 'force-dynamic';
+export const revalidate = 0;
+
+export async function GET(
+  request: NextRequest,
+  { params }: { params: { id: string } }
+) {
+  try {
+    const authHeader = request.headers.get('authorization');
+
+    if (!authHeader) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
+    }
+
+    const response = await fetch(`${API_URL}/api/jobs/${encodeURIComponent(params.id)}`, {
+      headers: {
+        'Authorization': authHeader,
+      },
+      cache: 'no-store', // Disable fetch caching
+    });
+
+    const data = await response.json();
+
+    return NextResponse.json(data, {
+      status: response.status,
+      headers: {
+        'Cache-Control': 'no-store, no-cache, must-revalidate, proxy-revalidate',
+      },
+    });
+  } catch (error) {
+    console.error('Job status proxy error:', error);
+    return NextResponse.json(
+      { error: 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
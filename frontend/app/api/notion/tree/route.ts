@@ -0,0 +1,43 @@
+import { NextRequest, NextResponse } from 'next/server';
+
+const API_URL = process.env.INTERNAL_API_URL;
+
+// The backend caches the tree; Next.js must not
+export const dynamic = 'force-dynamic';
+export const revalidate = 0;
+
+export async function GET(request: NextRequest) {
+  try {
+    const authHeader = request.headers.get('authorization');
+
+    if (!authHeader) {
+      return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
+    }
+
+    const refresh = request.nextUrl.searchParams.get('refresh');
+    const query = refresh ? `?refresh=${encodeURIComponent(refresh)}` : '';
+
+    const response = await fetch(`${API_URL}/api/notion/tree${query}`, {
+      headers: {
+        'Authorization': authHeader,
+      },
+      cache: 'no-store',
+    });
+
+    if (!response.ok) {
+      return NextResponse.json(
+        { error: 'Failed to fetch Notion page tree' },
+        { status: response.status }
+      );
+    }
+
+    const data = await response.json();
+    return NextResponse.json(data);
+  } catch (error) {
+    console.error('Notion tree proxy error:', error);
+    return NextResponse.json(
+      { error: 'Internal server error' },
+      { status: 500 }
+    );
+  }
+}
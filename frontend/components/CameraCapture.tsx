@@ -9,6 +9,16 @@ interface CameraCaptureProps {
 
 type StatusType = "success" | "error" | "info" | null;
 
+const JOB_POLL_INTERVAL_MS = 1500;
+
+// Progress messages for the pipeline stages reported by /api/jobs/<id>
+const STAGE_LABELS: Record<string, string> = {
+  notion_connect: "Connexion à Notion...",
+  ocr: "Lecture de la photo...",
+  enhance: "Mise en forme des notes...",
+  notion_write: "Écriture dans Notion...",
+};
+
 export default function CameraCapture({ testMode }: CameraCaptureProps) {
   const [isCameraActive, setIsCameraActive] = useState(false);
   const [capturedImage, setCapturedImage] = useState<string | null>(null);
@@ -179,6 +189,30 @@ export default function CameraCapture({ testMode }: CameraCaptureProps) {
     }, 50);
   };
 
+  // Poll the job status until the backend has finished processing the upload
+  const waitForJob = async (
+    jobId: string,
+    headers: HeadersInit
+  ): Promise<{ statusCode: number; result: any }> => {
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+
+      const response = await fetch(`/api/jobs/${jobId}`, { headers, cache: "no-store" });
+      const job = await response.json();
+
+      if (!response.ok) {
+        return { statusCode: response.status, result: job };
+      }
+
+      if (job.state === "succeeded" || job.state === "failed") {
+        return { statusCode: job.status_code, result: job.result };
+      }
+
+      const stageLabel = job.stage ? STAGE_LABELS[job.stage] : null;
+      showStatus(stageLabel || "Traitement en attente...", "info");
+    }
+  };
+
   const uploadToNotion = async () => {
     if (!capturedBlob) return;
 
@@ -205,9 +239,17 @@ export default function CameraCapture({ testMode }: CameraCaptureProps) {
         body: formData,
       });
 
-      const result = await response.json();
+      let result = await response.json();
+      let statusCode = response.status;
+
+      // The upload was queued: wait for the background job to finish
+      if (statusCode === 202 && result.job_id) {
+        const job = await waitForJob(result.job_id, headers);
+        statusCode = job.statusCode;
+        result = job.result;
+      }
 
-      if (response.status === 401) {
+      if (statusCode === 401) {
         // Unauthorized - could be expired session or failed token refresh
         // The backend message will tell us which one
         const errorMessage = result.message || "Session expirée. Rechargez la page pour vous reconnecter.";
@@ -224,7 +266,7 @@ export default function CameraCapture({ testMode }: CameraCaptureProps) {
         return;
       }
 
-      if (response.status === 400 && result.error === 'No default page configured') {
+      if (statusCode === 400 && result.error === 'No default page configured') {
         // User hasn't configured page ID
         showStatus(`❌ Aucune page Notion configurée. Configurez votre page par défaut.`, "error");
         // Trigger page setup - the parent component will handle this
@@ -232,7 +274,7 @@ export default function CameraCapture({ testMode }: CameraCaptureProps) {
         return;
       }
 
-      if (response.status === 410 && result.error === 'page_deleted') {
+      if (statusCode === 410 && result.error === 'page_deleted') {
         // Page was deleted - backend has already cleared the page_id
         // Show message and refresh user state from backend
         showStatus(`❌ ${result.message}`, "error");
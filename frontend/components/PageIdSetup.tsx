@@ -22,6 +22,9 @@ interface NotionPageWithDepth extends NotionPage {
   depth?: number;
 }
 
+// Upper bound of paginated search requests (100 pages each) when loading pages
+const MAX_SEARCH_REQUESTS = 20;
+
 // Helper function to normalize Notion IDs (remove dashes for comparison)
 const normalizeId = (notionId: string | undefined): string | null => {
   if (!notionId) return null;
@@ -118,21 +121,32 @@ export default function PageIdSetup({ workspaceName, onComplete }: PageIdSetupPr
         return;
       }
 
-      const response = await fetch('/api/notion/search', {
-        method: 'POST',
-        headers: {
-          'Authorization': `Bearer ${token}`,
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ query: '' }),
-      });
-
-      if (!response.ok) {
-        throw new Error('Échec du chargement des pages');
+      // Follow the pagination cursor so large workspaces are listed entirely
+      const allPages: NotionPage[] = [];
+      let cursor: string | null = null;
+
+      for (let request = 0; request < MAX_SEARCH_REQUESTS; request++) {
+        const response = await fetch('/api/notion/search', {
+          method: 'POST',
+          headers: {
+            'Authorization': `Bearer ${token}`,
+            'Content-Type': 'application/json',
+          },
+          body: JSON.stringify({ query: '', start_cursor: cursor }),
+        });
+
+        if (!response.ok) {
+          throw new Error('Échec du chargement des pages');
+        }
+
+        const data = await response.json();
+        allPages.push(...(data.pages || []));
+
+        if (!data.has_more || !data.next_cursor) break;
+        cursor = data.next_cursor;
       }
 
-      const data = await response.json();
-      const sortedPages = sortPagesByHierarchy(data.pages || []);
+      const sortedPages = sortPagesByHierarchy(allPages);
       setPages(sortedPages);
       setFilteredPages(sortedPages);
     } catch (err) {
@@ -0,0 +1,226 @@
+"""
+Persistent caches shared by the pipeline stages.
+
+The caches are backed by a single SQLite file so they survive restarts and
+can be shared by every worker process of the backend.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+from .settings import (OCR_CACHE_MAX_AGE, OCR_CACHE_MAX_BYTES, LLM_CACHE_MAX_AGE,
+                       LLM_CACHE_MAX_BYTES)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+class SqliteLruCache:
+    """
+    Key/value store on SQLite with least-recently-used eviction.
+
+    Entries older than ``max_age`` seconds are treated as misses and purged.
+    When the total size of the stored values exceeds ``max_bytes`` the least
+    recently read entries are evicted first.
+    """
+
+    def __init__(self, path: str, max_bytes: int, max_age: float,
+                 table: str = "entries"):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)")
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.table}_accessed_at "
+                f"ON {self.table} (accessed_at)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per operation keeps the cache safe to
+        # use from several threads and across forked workers.
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                f"SELECT value, created_at FROM {self.table} WHERE key = ?",
+                (key,)).fetchone()
+            if row is not None and now - row[1] > self.max_age:
+                conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                row = None
+            if row is not None:
+                conn.execute(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                    (now, key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if row is None else row[0]
+
+    def set(self, key: str, value: str):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now))
+            self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        evicted = conn.execute(
+            f"DELETE FROM {self.table} WHERE created_at < ?",
+            (now - self.max_age,)).rowcount
+
+        total = conn.execute(
+            f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total > self.max_bytes:
+            rows = conn.execute(
+                f"SELECT key, size FROM {self.table} "
+                "ORDER BY accessed_at ASC").fetchall()
+            stale_keys = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                stale_keys.append((key,))
+                total -= size
+            conn.executemany(
+                f"DELETE FROM {self.table} WHERE key = ?", stale_keys)
+            evicted += len(stale_keys)
+
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+            logger.debug("Evicted %s entries from %s", evicted, self.table)
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute(f"DELETE FROM {self.table}")
+
+    def stats(self) -> dict:
+        with closing(self._connect()) as conn, conn:
+            entries, size = conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) "
+                f"FROM {self.table}").fetchone()
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": entries,
+                "size_bytes": size,
+            }
+
+
+class OcrCache(SqliteLruCache):
+    """
+    OCR results keyed by the content of the image.
+
+    The key is the SHA-256 of the image bytes, the prompt and the model, so
+    re-uploading the same photo skips the vision call entirely while a prompt
+    or model change naturally invalidates old transcriptions.
+    """
+
+    def __init__(self, path: str, max_bytes: int = OCR_CACHE_MAX_BYTES,
+                 max_age: float = OCR_CACHE_MAX_AGE):
+        super().__init__(path, max_bytes, max_age, table="ocr_results")
+
+    @staticmethod
+    def make_key(image_bytes: bytes, prompt: str, model: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(hashlib.sha256(image_bytes).digest())
+        digest.update(prompt.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(model.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_text(self, image_bytes: bytes, prompt: str,
+                 model: str) -> Optional[str]:
+        return self.get(self.make_key(image_bytes, prompt, model))
+
+    def put_text(self, image_bytes: bytes, prompt: str, model: str,
+                 text: str):
+        self.set(self.make_key(image_bytes, prompt, model), text)
+
+
+class LlmResponseCache(SqliteLruCache):
+    """
+    Responses of deterministic (temperature 0) LLM calls.
+
+    The key is the SHA-256 of the model, the call parameters and the type and
+    content of every message, so re-processing the same OCR text after a
+    Notion-side failure costs no LLM call. Hits and misses are also counted
+    per pipeline stage.
+    """
+
+    def __init__(self, path: str, max_bytes: int = LLM_CACHE_MAX_BYTES,
+                 max_age: float = LLM_CACHE_MAX_AGE):
+        super().__init__(path, max_bytes, max_age, table="llm_responses")
+        self._stage_counts: dict[str, dict[str, int]] = {}
+
+    @staticmethod
+    def make_key(model: str, messages: list, params: dict) -> str:
+        payload = json.dumps({
+            "model": model,
+            "params": params,
+            "messages": [[message.type, message.content] for message in messages],
+        }, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _count(self, stage: str, outcome: str):
+        with self._lock:
+            counts = self._stage_counts.setdefault(stage, {"hits": 0, "misses": 0,
+                                                           "bypassed": 0})
+            counts[outcome] += 1
+
+    def get_response(self, stage: str, model: str, messages: list,
+                     params: dict) -> Optional[str]:
+        response = self.get(self.make_key(model, messages, params))
+        self._count(stage, "misses" if response is None else "hits")
+        return response
+
+    def put_response(self, model: str, messages: list, params: dict, response: str):
+        self.set(self.make_key(model, messages, params), response)
+
+    def record_bypass(self, stage: str):
+        """Count a call that skipped the cache on request."""
+        self._count(stage, "bypassed")
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._lock:
+            stats["stages"] = {
+                stage: {**counts,
+                        "hit_rate": (counts["hits"] / (counts["hits"] + counts["misses"])
+                                     if counts["hits"] + counts["misses"] else 0.0)}
+                for stage, counts in self._stage_counts.items()
+            }
+        return stats
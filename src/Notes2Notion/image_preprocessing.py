@@ -0,0 +1,148 @@
+"""
+Image preprocessing applied before photos are sent to the vision model.
+
+Phone photos are large, often rotated through EXIF metadata only, and far
+above the resolution the model actually looks at. Preparing them locally
+shrinks request bodies and upload time without losing legibility.
+"""
+
+import io
+import logging
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+from .settings import (IMAGE_JPEG_QUALITY, IMAGE_MAX_LONG_SIDE,
+                       IMAGE_MAX_SHORT_SIDE)
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional, images are then sent untouched
+    Image = None
+    ImageOps = None
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+@dataclass
+class PreparedImage:
+    """Image bytes ready to be embedded in a vision request."""
+    data: bytes
+    mime_type: str
+    original_size: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    token_estimate: Optional[int] = None
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_size - len(self.data)
+
+
+def sniff_mime_type(image_bytes: bytes) -> str:
+    """Guess the MIME type from the file signature, defaulting to PNG."""
+    for signature, mime_type in _SIGNATURES:
+        if image_bytes.startswith(signature):
+            return mime_type
+    if image_bytes[:4] == b"RIFF" and image_bytes[8:12] == b"WEBP":
+        return "image/webp"
+    return "image/png"
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """
+    Estimate the input tokens of an image with OpenAI's high detail formula.
+
+    The image is fitted in a 2048x2048 square, its short side is scaled down
+    to 768px, then each 512px tile costs 170 tokens on top of a base of 85.
+    """
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    tiles = math.ceil(width / 512) * math.ceil(height / 512)
+    return 85 + 170 * tiles
+
+
+def _target_size(width: int, height: int, max_long_side: int,
+                 max_short_side: int) -> tuple[int, int]:
+    scale = min(1.0,
+                max_long_side / max(width, height),
+                max_short_side / min(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def prepare_image(image_bytes: bytes,
+                  max_long_side: int = IMAGE_MAX_LONG_SIDE,
+                  max_short_side: int = IMAGE_MAX_SHORT_SIDE,
+                  jpeg_quality: int = IMAGE_JPEG_QUALITY) -> PreparedImage:
+    """
+    Apply EXIF orientation, downscale and re-encode an uploaded image.
+
+    The default limits match the resolution the vision model downsamples to
+    anyway, so handwriting stays as readable as with the original photo.
+    The original bytes are kept whenever re-encoding would not make them
+    smaller and no rotation or resize was needed.
+
+    Args:
+        image_bytes: Raw content of the uploaded file
+        max_long_side: Maximum size of the longest side in pixels
+        max_short_side: Maximum size of the shortest side in pixels
+        jpeg_quality: Quality used when re-encoding to JPEG
+
+    Returns:
+        PreparedImage: Encoded image with its MIME type and statistics
+    """
+    original = PreparedImage(data=image_bytes,
+                             mime_type=sniff_mime_type(image_bytes),
+                             original_size=len(image_bytes))
+    if Image is None:
+        return original
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as image:
+            image.load()
+            original.width, original.height = image.size
+            original.token_estimate = estimate_image_tokens(*image.size)
+
+            # EXIF orientation tag, 1 means the pixels are already upright
+            rotated = image.getexif().get(0x0112, 1) != 1
+            oriented = ImageOps.exif_transpose(image)
+            size = _target_size(*oriented.size, max_long_side, max_short_side)
+            resized = size != oriented.size
+            if resized:
+                oriented = oriented.resize(size, Image.Resampling.LANCZOS)
+
+            if oriented.mode in ("RGBA", "LA", "P"):
+                # Flatten transparency on white, like paper
+                oriented = oriented.convert("RGBA")
+                background = Image.new("RGB", oriented.size, "white")
+                background.paste(oriented, mask=oriented.getchannel("A"))
+                oriented = background
+            elif oriented.mode not in ("RGB", "L"):
+                oriented = oriented.convert("RGB")
+
+            buffer = io.BytesIO()
+            oriented.save(buffer, format="JPEG", quality=jpeg_quality,
+                          optimize=True)
+    except Exception as e:
+        logger.warning("Image preprocessing skipped: %s", e)
+        return original
+
+    if not (rotated or resized) and buffer.tell() >= len(image_bytes):
+        return original
+
+    return PreparedImage(data=buffer.getvalue(),
+                         mime_type="image/jpeg",
+                         original_size=len(image_bytes),
+                         width=oriented.width,
+                         height=oriented.height,
+                         token_estimate=estimate_image_tokens(*oriented.size))
@@ -0,0 +1,234 @@
+"""
+Process-wide registry of the LLM clients.
+
+Building a ``ChatOpenAI`` or an ``OpenAI`` client per upload also builds a
+new HTTP connection pool, so every job paid for TCP and TLS setup again. The
+registry hands out one client per model (chat) or per endpoint (raw SDK), all
+sharing one keep-alive ``httpx`` pool per endpoint, for OpenAI or Azure
+OpenAI. Each pool counts the requests it sends and the connections it has to
+open, which gives its connection reuse rate.
+
+Async clients belong to the event loop that first uses them: the backend's
+background loop (see backend/async_runtime.py) or the single ``asyncio.run``
+of the CLI.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+import httpx
+from langchain_openai import AzureChatOpenAI, ChatOpenAI
+from openai import AsyncAzureOpenAI, AsyncOpenAI, AzureOpenAI, OpenAI
+
+from .settings import (LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE,
+                       LLM_HTTP_KEEPALIVE_EXPIRY, AZURE_OPENAI_API_VERSION)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+PROVIDER_OPENAI = "openai"
+PROVIDER_AZURE = "azure"
+
+# httpcore trace events of a new connection
+CONNECT_EVENT = "connection.connect_tcp.complete"
+TLS_EVENT = "connection.start_tls.complete"
+
+
+def current_endpoint() -> tuple:
+    """
+    Return the configured ``(provider, base URL)``.
+
+    OpenAI is used when OPENAI_API_KEY is set, Azure OpenAI when only
+    AZURE_OPENAI_API_KEY and AZURE_OPENAI_ENDPOINT are.
+    """
+    if (not os.getenv("OPENAI_API_KEY") and os.getenv("AZURE_OPENAI_API_KEY")
+            and os.getenv("AZURE_OPENAI_ENDPOINT")):
+        return PROVIDER_AZURE, os.getenv("AZURE_OPENAI_ENDPOINT")
+    return PROVIDER_OPENAI, os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+
+
+class _ConnectionPool:
+    """Sync and async keep-alive HTTP clients of one endpoint, instrumented."""
+
+    def __init__(self, limits: httpx.Limits):
+        self.requests = 0
+        self.connections = 0
+        self.tls_handshakes = 0
+        self._lock = threading.Lock()
+        self.http_client = httpx.Client(
+            limits=limits, event_hooks={"request": [self._on_request]})
+        self.http_async_client = httpx.AsyncClient(
+            limits=limits, event_hooks={"request": [self._on_async_request]})
+
+    def _count(self, event: str):
+        with self._lock:
+            if event == CONNECT_EVENT:
+                self.connections += 1
+            elif event == TLS_EVENT:
+                self.tls_handshakes += 1
+
+    def _trace(self, event: str, info: dict):
+        self._count(event)
+
+    async def _atrace(self, event: str, info: dict):
+        self._count(event)
+
+    def _on_request(self, request: httpx.Request):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def _on_async_request(self, request: httpx.Request):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._atrace
+
+    def stats(self) -> dict:
+        with self._lock:
+            reused = max(0, self.requests - self.connections)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections,
+                "tls_handshakes": self.tls_handshakes,
+                "reused_requests": reused,
+                "reuse_rate": reused / self.requests if self.requests else 0.0,
+            }
+
+
+class LlmClientRegistry:
+    """
+    Shared LLM clients, keyed by endpoint and model.
+
+    Args:
+        max_connections: Connections open at once per endpoint
+        max_keepalive: Idle connections kept alive per endpoint
+        keepalive_expiry: Seconds an idle connection is kept
+    """
+
+    def __init__(self, max_connections: int = LLM_HTTP_MAX_CONNECTIONS,
+                 max_keepalive: int = LLM_HTTP_MAX_KEEPALIVE,
+                 keepalive_expiry: float = LLM_HTTP_KEEPALIVE_EXPIRY):
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive,
+                                   keepalive_expiry=keepalive_expiry)
+        self._pools = {}
+        self._chat = {}
+        self._sdk = {}
+        self._lock = threading.Lock()
+        self.warm_ups = 0
+        self.warm_up_failures = 0
+        self.last_warm_up_seconds: Optional[float] = None
+
+    def _pool(self, endpoint: tuple) -> _ConnectionPool:
+        # Called with the lock held
+        if endpoint not in self._pools:
+            self._pools[endpoint] = _ConnectionPool(self.limits)
+            logger.info(f"🔌 New LLM connection pool for {endpoint[0]} ({endpoint[1]})")
+        return self._pools[endpoint]
+
+    def chat(self, model: str, temperature: float = 0):
+        """
+        Return the shared LangChain chat model of ``model``.
+
+        Args:
+            model: Model name (the deployment name on Azure)
+            temperature: Sampling temperature
+
+        Returns:
+            ChatOpenAI or AzureChatOpenAI bound to the endpoint's pool
+        """
+        endpoint = current_endpoint()
+        key = (endpoint, model, temperature)
+        with self._lock:
+            if key not in self._chat:
+                pool = self._pool(endpoint)
+                if endpoint[0] == PROVIDER_AZURE:
+                    self._chat[key] = AzureChatOpenAI(
+                        azure_deployment=model, model=model, temperature=temperature,
+                        api_version=AZURE_OPENAI_API_VERSION,
+                        http_client=pool.http_client,
+                        http_async_client=pool.http_async_client)
+                else:
+                    self._chat[key] = ChatOpenAI(
+                        model=model, temperature=temperature,
+                        http_client=pool.http_client,
+                        http_async_client=pool.http_async_client)
+            return self._chat[key]
+
+    def _sdk_client(self, asynchronous: bool):
+        endpoint = current_endpoint()
+        key = (endpoint, asynchronous)
+        with self._lock:
+            if key not in self._sdk:
+                pool = self._pool(endpoint)
+                http_client = pool.http_async_client if asynchronous else pool.http_client
+                if endpoint[0] == PROVIDER_AZURE:
+                    client_class = AsyncAzureOpenAI if asynchronous else AzureOpenAI
+                    self._sdk[key] = client_class(api_version=AZURE_OPENAI_API_VERSION,
+                                                  http_client=http_client)
+                else:
+                    client_class = AsyncOpenAI if asynchronous else OpenAI
+                    self._sdk[key] = client_class(http_client=http_client)
+            return self._sdk[key]
+
+    def openai(self):
+        """Return the shared synchronous OpenAI (or AzureOpenAI) SDK client."""
+        return self._sdk_client(asynchronous=False)
+
+    def async_openai(self):
+        """Return the shared asynchronous OpenAI (or AsyncAzureOpenAI) SDK client."""
+        return self._sdk_client(asynchronous=True)
+
+    async def awarm_up(self, timeout: float = 10) -> bool:
+        """
+        Open a connection to the endpoint before the first job needs it.
+
+        Lists the models, which costs no tokens. Failures are only logged:
+        the first job then opens the connection itself.
+
+        Returns:
+            bool: True if the endpoint answered
+        """
+        start = time.perf_counter()
+        try:
+            client = self.async_openai().with_options(timeout=timeout, max_retries=0)
+            await client.models.list()
+        except Exception as e:
+            self.warm_up_failures += 1
+            logger.warning(f"⚠️  LLM connection warm-up failed: {e}")
+            return False
+        self.warm_ups += 1
+        self.last_warm_up_seconds = time.perf_counter() - start
+        logger.info(f"🔥 LLM connection warmed up in {self.last_warm_up_seconds:.2f}s")
+        return True
+
+    async def aclose(self):
+        """Close every pool and forget the clients built on them."""
+        with self._lock:
+            pools = list(self._pools.values())
+            self._pools.clear()
+            self._chat.clear()
+            self._sdk.clear()
+        for pool in pools:
+            pool.http_client.close()
+            await pool.http_async_client.aclose()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pools = {f"{provider}:{url}": pool.stats()
+                     for (provider, url), pool in self._pools.items()}
+            return {
+                "pools": pools,
+                "chat_clients": len(self._chat),
+                "sdk_clients": len(self._sdk),
+                "warm_ups": self.warm_ups,
+                "warm_up_failures": self.warm_up_failures,
+                "last_warm_up_seconds": self.last_warm_up_seconds,
+            }
+
+
+# Shared by every job of the process
+llm_clients = LlmClientRegistry()
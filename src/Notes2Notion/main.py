@@ -4,6 +4,8 @@ from pathlib import Path
 
 from Notes2Notion.notes_builder import NotesCreator, DraftEnhancer
 from Notes2Notion.tooling import ImageTextExtractor, McpNotionConnector
+from Notes2Notion.cache import OcrCache
+from Notes2Notion.settings import OCR_CACHE_PATH
 from Notes2Notion.mock_components import (MockImageTextExtractor, MockDraftEnhancer,
                                           MockNotesCreator)
 
@@ -22,12 +24,14 @@ async def main(test_mode: bool = False):
     notes_pictures_path = current_file.parent / "notes_pictures"
 
     notion_connexion = McpNotionConnector()
+    ocr_cache = OcrCache(OCR_CACHE_PATH) if OCR_CACHE_PATH else None
 
     if test_mode:
         print("\n" + "="*60)
         print("🧪 TEST MODE ENABLED - ZERO LLM calls will be made")
         print("="*60 + "\n")
-        image_text_extractor = MockImageTextExtractor(str(notes_pictures_path))
+        image_text_extractor = MockImageTextExtractor(str(notes_pictures_path),
+                                                      cache=ocr_cache)
         draft_enhancer = MockDraftEnhancer()
         notes_creator = MockNotesCreator(notion_connexion, draft_enhancer,
                                         image_text_extractor)
@@ -35,7 +39,8 @@ async def main(test_mode: bool = False):
         print("\n" + "="*60)
         print("🚀 PRODUCTION MODE - LLM calls will be made")
         print("="*60 + "\n")
-        image_text_extractor = ImageTextExtractor(str(notes_pictures_path))
+        image_text_extractor = ImageTextExtractor(str(notes_pictures_path),
+                                                  cache=ocr_cache)
         draft_enhancer = DraftEnhancer()
         notes_creator = NotesCreator(notion_connexion, draft_enhancer,
                                      image_text_extractor)
@@ -0,0 +1,249 @@
+"""
+Pool of warm Notion MCP server sessions.
+
+Spawning the ``mcp/notion`` container and running the MCP handshake costs
+more than writing a short note. The pool keeps connected sessions alive per
+user for an idle TTL so later uploads can reuse them.
+
+A pool belongs to a single, long-lived event loop: sessions are bound to the
+loop that opened them.
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from .settings import (MCP_POOL_HEALTH_CHECK_TIMEOUT, MCP_POOL_IDLE_TTL,
+                       MCP_POOL_MAX_SESSIONS)
+from .tooling import McpNotionConnector
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _IdleSession:
+    connector: McpNotionConnector
+    key: str
+    released_at: float = field(default_factory=time.monotonic)
+
+
+class McpSessionPool:
+    """
+    Keep connected MCP sessions per user token and hand them out to jobs.
+
+    Each session is used by one job at a time. At most ``max_sessions``
+    containers are alive at once (idle or in use); when the cap is reached
+    the least recently used idle session of any user is closed, or the caller
+    waits for a session to be released.
+    """
+
+    def __init__(self,
+                 max_sessions: int = MCP_POOL_MAX_SESSIONS,
+                 idle_ttl: float = MCP_POOL_IDLE_TTL,
+                 health_check_timeout: float = MCP_POOL_HEALTH_CHECK_TIMEOUT,
+                 connector_factory: Callable[[], McpNotionConnector] = McpNotionConnector):
+        self.max_sessions = max(1, max_sessions)
+        self.idle_ttl = idle_ttl
+        self.health_check_timeout = health_check_timeout
+        self.connector_factory = connector_factory
+
+        self._idle: list[_IdleSession] = []
+        self._in_use: dict[McpNotionConnector, str] = {}
+        self._live = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._reaper_task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.spawns = 0
+        self.spawn_failures = 0
+        self.health_check_failures = 0
+        self.expired = 0
+        self.evicted = 0
+        self.spawn_seconds_total = 0.0
+        self.last_spawn_seconds = None
+
+    @staticmethod
+    def _key(user_notion_token: str) -> str:
+        # Never keep raw tokens around as dictionary keys or in logs
+        return hashlib.sha256(user_notion_token.encode()).hexdigest()[:16]
+
+    def _get_condition(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+            self._reaper_task = asyncio.create_task(self._reap_periodically())
+        return self._condition
+
+    async def acquire(self, user_notion_token: str) -> McpNotionConnector:
+        """
+        Return a connected session for this token, reusing a warm one if any.
+
+        Raises:
+            EnvironmentError: If no token is provided
+            Exception: If a new MCP server cannot be started
+        """
+        if not user_notion_token:
+            raise EnvironmentError(
+                "No Notion token provided. Either pass user_notion_token parameter")
+
+        key = self._key(user_notion_token)
+        condition = self._get_condition()
+
+        while True:
+            async with condition:
+                entry = self._take_idle(key)
+            if entry is None:
+                break
+            try:
+                healthy = await entry.connector.ping(self.health_check_timeout)
+            except BaseException:
+                # Cancelled while checking: the session left the idle list,
+                # close it so its container and slot are not leaked
+                await self._close(entry.connector)
+                raise
+            if healthy:
+                self.hits += 1
+                self._in_use[entry.connector] = key
+                logger.info("♻️  Reusing warm MCP session (%s)", key)
+                return entry.connector
+            self.health_check_failures += 1
+            await self._close(entry.connector)
+
+        self.misses += 1
+        await self._reserve_slot()
+
+        start = time.perf_counter()
+        try:
+            connector = self.connector_factory()
+        except BaseException:
+            self.spawn_failures += 1
+            await self._release_slot()
+            raise
+        try:
+            await connector.connect_to_server(user_notion_token)
+        except BaseException:
+            self.spawn_failures += 1
+            await self._close(connector)
+            raise
+
+        elapsed = time.perf_counter() - start
+        self.spawns += 1
+        self.spawn_seconds_total += elapsed
+        self.last_spawn_seconds = elapsed
+        logger.info("🐳 Spawned MCP session (%s) in %.2fs", key, elapsed)
+
+        self._in_use[connector] = key
+        return connector
+
+    async def release(self, connector: McpNotionConnector, reusable: bool = True):
+        """
+        Give a session back to the pool.
+
+        Args:
+            connector: Session returned by acquire()
+            reusable: False to close the session instead of keeping it warm
+        """
+        key = self._in_use.pop(connector, None)
+        if key is None:
+            # Not handed out by this pool, nothing to account for
+            await connector.cleanup()
+            return
+        if not reusable or not connector.is_alive():
+            await self._close(connector)
+            return
+
+        async with self._get_condition():
+            self._idle.append(_IdleSession(connector, key))
+            self._condition.notify()
+
+    async def prewarm(self, user_notion_token: str):
+        """Start a session for this token in advance, unless one is idle."""
+        key = self._key(user_notion_token)
+        if any(entry.key == key for entry in self._idle):
+            return
+        try:
+            connector = await self.acquire(user_notion_token)
+        except Exception as e:
+            logger.warning("⚠️  MCP pre-warm failed: %s", e)
+            return
+        await self.release(connector)
+
+    async def close_all(self):
+        """Close every idle session, e.g. on shutdown."""
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+        idle, self._idle = self._idle, []
+        for entry in idle:
+            await self._close(entry.connector)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "live_sessions": self._live,
+            "idle_sessions": len(self._idle),
+            "in_use_sessions": len(self._in_use),
+            "max_sessions": self.max_sessions,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "spawns": self.spawns,
+            "spawn_failures": self.spawn_failures,
+            "health_check_failures": self.health_check_failures,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "avg_spawn_seconds": (self.spawn_seconds_total / self.spawns
+                                  if self.spawns else None),
+            "last_spawn_seconds": self.last_spawn_seconds,
+        }
+
+    def _take_idle(self, key: str) -> Optional[_IdleSession]:
+        # Most recently released first, its container is the least likely
+        # to have gone stale
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index].key == key:
+                return self._idle.pop(index)
+        return None
+
+    async def _reserve_slot(self):
+        condition = self._get_condition()
+        while True:
+            victim = None
+            async with condition:
+                if self._live < self.max_sessions:
+                    self._live += 1
+                    return
+                if self._idle:
+                    victim = self._idle.pop(0)
+                    self.evicted += 1
+                else:
+                    await condition.wait()
+            if victim is not None:
+                await self._close(victim.connector)
+
+    async def _close(self, connector: McpNotionConnector):
+        try:
+            await connector.cleanup()
+        except Exception as e:
+            logger.warning("⚠️  Error while closing MCP session: %s", e)
+        await self._release_slot()
+
+    async def _release_slot(self):
+        async with self._get_condition():
+            self._live = max(0, self._live - 1)
+            self._condition.notify()
+
+    async def _reap_periodically(self):
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_ttl / 2))
+            now = time.monotonic()
+            expired = [entry for entry in self._idle
+                       if now - entry.released_at > self.idle_ttl]
+            for entry in expired:
+                self._idle.remove(entry)
+            for entry in expired:
+                self.expired += 1
+                await self._close(entry.connector)
@@ -7,9 +7,16 @@ import os
 import random
 import logging
 from datetime import datetime
-from typing import TypedDict
+from typing import Awaitable, Callable, Optional, TypedDict
 from pathlib import Path
 from . import utils
+from .cache import OcrCache
+from .notion_blocks import append_blocks, check_page_writable, plain_rich_text
+from .timing import StageTimer, run_concurrently
+
+# Cache namespace of the mock transcriptions, kept apart from real OCR results
+MOCK_OCR_PROMPT = "mock-ocr"
+MOCK_OCR_MODEL = "mock"
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -18,16 +25,23 @@ logger = logging.getLogger(__name__)
 class MockImageTextExtractor:
     """Mock image text extractor that generates random text instead of calling GPT-4o-mini."""
 
-    def __init__(self, repo_path: str):
+    def __init__(self, repo_path: str, cache: Optional[OcrCache] = None):
         self.repo_path = repo_path
+        self.cache = cache
         self.text = ""
 
     def extract_text(self) -> str:
         """Generate mock extracted text based on images found in the directory."""
-        images_path = utils.get_file_paths(self.repo_path)
-        image_count = sum(1 for path in images_path if ".gitkeep" not in path)
+        images_path = sorted(path for path in utils.get_file_paths(self.repo_path)
+                             if ".gitkeep" not in path)
+        image_count = len(images_path)
 
         logger.info(f"[TEST MODE] Found {image_count} images in {self.repo_path}")
+
+        if self.cache is not None and images_path:
+            self.text = self._extract_with_cache(images_path)
+            return self.text
+
         logger.info("[TEST MODE] Generating random mock text (no LLM calls)")
 
         # Generate random structured content
@@ -35,6 +49,31 @@ class MockImageTextExtractor:
         self.text = mock_content.strip()
         return self.text
 
+    def _extract_with_cache(self, images_path: list[str]) -> str:
+        """
+        Go through the OCR cache exactly like ImageTextExtractor does, so the
+        cache layer can be exercised offline. A miss generates random content
+        for that image and stores it.
+        """
+        pages = []
+        for image_path in images_path:
+            with open(image_path, "rb") as f:
+                image_bytes = f.read()
+
+            page = self.cache.get_text(image_bytes, MOCK_OCR_PROMPT, MOCK_OCR_MODEL)
+            if page is None:
+                logger.info("[TEST MODE] OCR cache miss, generating random mock text")
+                page = self._generate_random_content(1).strip()
+                self.cache.put_text(image_bytes, MOCK_OCR_PROMPT, MOCK_OCR_MODEL, page)
+            else:
+                logger.info("[TEST MODE] OCR cache hit")
+            pages.append(page)
+        return "\n\n".join(pages)
+
+    async def aextract_text(self) -> str:
+        """Async counterpart of extract_text, mirroring ImageTextExtractor."""
+        return self.extract_text()
+
     def _generate_random_content(self, image_count: int) -> str:
         """Generate random structured content for testing."""
         # Random topics
@@ -120,39 +159,47 @@ class MockImageTextExtractor:
 
 
 class MockDraftEnhancer:
-    """Mock draft enhancer that returns pre-formatted content without LLM calls."""
+    """
+    Mock draft enhancer that returns pre-formatted content without LLM calls.
+
+    Stateless like DraftEnhancer: one instance and its compiled workflow can
+    be shared by concurrent uploads.
+    """
 
     def __init__(self):
-        self.state = None
+        self._workflow = None
 
     class State(TypedDict):
         user_input: str
         agent_response: str
 
-    async def structure_content(self, state: "MockDraftEnhancer.State") -> "MockDraftEnhancer.State":
+    async def structure_content(self, state: "MockDraftEnhancer.State") -> dict:
         """Mock structuring - just returns the input with minimal formatting."""
         logger.info("[TEST MODE] Mock structure_content (no LLM call)")
-        self.state = state
-        state["agent_response"] = state["user_input"]
-        return state
+        return {"agent_response": state["user_input"]}
 
-    async def enhance_clarity(self, state: "MockDraftEnhancer.State") -> "MockDraftEnhancer.State":
+    async def enhance_clarity(self, state: "MockDraftEnhancer.State") -> dict:
         """Mock enhancement - returns content as-is."""
         logger.info("[TEST MODE] Mock enhance_clarity (no LLM call)")
-        state = self.state
         # Keep the content unchanged
-        return state
+        return {}
 
     async def check_facts(self, state: "MockDraftEnhancer.State"):
         """Mock fact checking - always returns 'ok'."""
         logger.info("[TEST MODE] Mock check_facts (no LLM call)")
         return "ok"
 
-    async def out(self, state: "MockDraftEnhancer.State"):
+    async def out(self, state: "MockDraftEnhancer.State") -> dict:
         """Output state."""
-        return state
+        return {}
 
     async def create_notes_workflow(self):
+        """Return the compiled mock workflow, compiling it on first use."""
+        if self._workflow is None:
+            self._workflow = self._compile_workflow()
+        return self._workflow
+
+    def _compile_workflow(self):
         """Create a mock workflow that bypasses LLM calls."""
         from langgraph.graph import StateGraph
 
@@ -183,10 +230,16 @@ class MockNotesCreator:
     def __init__(self,
                  notion_connector,
                  draft_enhancer,
-                 image_text_extractor):
+                 image_text_extractor,
+                 timer: Optional[StageTimer] = None,
+                 connect: Optional[Callable[[str], Awaitable]] = None,
+                 page_check: Optional[Callable[[str], Awaitable[None]]] = None):
         self.notion_connector = notion_connector
         self.draft_enhancer = draft_enhancer
         self.image_text_extractor = image_text_extractor
+        self.timer = timer or StageTimer()
+        self.connect = connect
+        self.page_check = page_check
 
     async def notes_creation(self, user_notion_token: str, user_notion_page_id: str):
         """
@@ -198,33 +251,57 @@ class MockNotesCreator:
         """
         logger.info("[TEST MODE] MockNotesCreator - No LLM calls for Notion block creation")
 
-        # Get mock content
-        query = self.image_text_extractor.extract_text()
-
-        # Process through mock workflow
-        workflow = await self.draft_enhancer.create_notes_workflow()
-        workflow_result = await workflow.ainvoke({"user_input": query})
+        if not user_notion_page_id:
+            raise ValueError("No Notion page ID provided")
 
-        # Connect to Notion MCP server with user's OAuth token
-        await self.notion_connector.connect_to_server(user_notion_token)
+        # Connect to Notion MCP server with user's OAuth token and check the
+        # target page while the mock content is produced, like the real pipeline
+        branches = [self._connect_notion(user_notion_token, user_notion_page_id),
+                    self._mock_content()]
+        if self.page_check is not None:
+            branches.append(self._check_target_page(user_notion_page_id))
+        _, workflow_result, *_ = await run_concurrently(*branches)
 
         # Prepare data with TEST title and timestamp
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         title = f"TEST - {timestamp}"
 
-        if not user_notion_page_id:
-            raise ValueError("No Notion page ID provided")
-
         content = workflow_result["agent_response"]
 
         logger.info(f"[TEST MODE] Creating Notion page with title: {title}")
         logger.info(f"[TEST MODE] Content length: {len(content)} characters")
 
         # Create page directly using MCP tools (no LLM decision)
-        await self._create_notion_page_directly(title, user_notion_page_id, content)
+        with self.timer.stage("notion_write"):
+            await self._create_notion_page_directly(title, user_notion_page_id, content)
 
         logger.info("[TEST MODE] ✅ Page created successfully!")
 
+    async def _connect_notion(self, user_notion_token: str, user_notion_page_id: str):
+        with self.timer.stage("notion_connect"):
+            if self.connect is not None and self.notion_connector is None:
+                self.notion_connector = await self.connect(user_notion_token)
+            await self.notion_connector.ensure_connected(user_notion_token)
+
+        if self.page_check is None:
+            with self.timer.stage("page_check"):
+                await check_page_writable(self.notion_connector.session,
+                                          user_notion_page_id)
+
+    async def _check_target_page(self, user_notion_page_id: str):
+        with self.timer.stage("page_check"):
+            await self.page_check(user_notion_page_id)
+
+    async def _mock_content(self):
+        # Get mock content
+        with self.timer.stage("ocr"):
+            query = await self.image_text_extractor.aextract_text()
+
+        # Process through mock workflow
+        with self.timer.stage("enhance"):
+            workflow = await self.draft_enhancer.create_notes_workflow()
+            return await workflow.ainvoke({"user_input": query})
+
     async def _create_notion_page_directly(self, title: str, parent_page_id: str, content: str):
         """
         Create Notion blocks directly without LLM deciding the structure.
@@ -272,10 +349,21 @@ class MockNotesCreator:
 
         logger.info(f"[TEST MODE] Page created with ID: {page_id}")
 
-        # Step 2: Parse content and create blocks
-        lines = content.split('\n')
-
-        for line in lines:
+        # Step 2: Parse content into blocks and append them in batches
+        children = self._build_blocks(content)
+        stats = {"page_id": page_id, "calls": 1, "blocks": 0, "batch_seconds": []}
+        await append_blocks(self.notion_connector.session, page_id, children, stats)
+
+        logger.info(f"[TEST MODE] Wrote {stats['blocks']} blocks with {stats['calls']} "
+                    f"MCP calls (1 page creation + {len(stats['batch_seconds'])} batches)")
+        for batch_number, seconds in enumerate(stats["batch_seconds"], 1):
+            logger.info(f"[TEST MODE] Batch {batch_number}: {seconds:.3f}s")
+        return stats
+
+    def _build_blocks(self, content: str) -> list[dict]:
+        """Turn content lines into Notion blocks with hardcoded rules."""
+        blocks = []
+        for line in content.split('\n'):
             line = line.strip()
             if not line:
                 continue
@@ -283,57 +371,30 @@ class MockNotesCreator:
             # Determine block type based on content patterns
             if line.startswith('# '):
                 # Heading 1
-                await self._create_block(page_id, "heading_1", line[2:])
+                blocks.append(self._block("heading_1", line[2:]))
             elif line.startswith('## '):
                 # Heading 2
-                await self._create_block(page_id, "heading_2", line[3:])
+                blocks.append(self._block("heading_2", line[3:]))
             elif any(line.startswith(f"{i}. ") for i in range(1, 10)):
                 # Numbered heading or paragraph
-                await self._create_block(page_id, "heading_2", line)
+                blocks.append(self._block("heading_2", line))
             elif line.startswith('- '):
                 # Bulleted list
-                await self._create_block(page_id, "bulleted_list_item", line[2:])
+                blocks.append(self._block("bulleted_list_item", line[2:]))
             else:
                 # Regular paragraph
-                await self._create_block(page_id, "paragraph", line)
-
-    async def _create_block(self, page_id: str, block_type: str, text: str):
-        """Helper to create a single Notion block."""
-        if len(text) > 1500:
-            # Split long text into chunks
-            chunks = [text[i:i+1500] for i in range(0, len(text), 1500)]
-            for chunk in chunks:
-                await self._create_single_block(page_id, block_type, chunk)
-        else:
-            await self._create_single_block(page_id, block_type, text)
-
-    async def _create_single_block(self, page_id: str, block_type: str, text: str):
-        """Create a single Notion block via MCP."""
-        logger.debug(f"[TEST MODE] Creating {block_type}: {text[:50]}...")
-
-        try:
-            await self.notion_connector.session.call_tool(
-                "API-patch-block-children",
-                {
-                    "block_id": page_id,
-                    "children": [
-                        {
-                            "object": "block",
-                            "type": block_type,
-                            block_type: {
-                                "rich_text": [
-                                    {
-                                        "type": "text",
-                                        "text": {"content": text}
-                                    }
-                                ]
-                            }
-                        }
-                    ]
-                }
-            )
-        except Exception as e:
-            logger.warning(f"[TEST MODE] ⚠️  Error creating block: {e}")
+                blocks.append(self._block("paragraph", line))
+        return blocks
+
+    def _block(self, block_type: str, text: str) -> dict:
+        """Build a single block, oversized text becoming several rich text segments."""
+        return {
+            "object": "block",
+            "type": block_type,
+            block_type: {
+                "rich_text": plain_rich_text(text)
+            }
+        }
 
     def _extract_page_id(self, page_result) -> str:
         """Extract page ID from MCP result."""
@@ -0,0 +1,146 @@
+"""
+Choice of the model tier used by each enhancement stage.
+
+A three-line sticky note does not need gpt-4.1. The router sizes the draft
+(tokens, sections) and estimates how clean its OCR text is, then picks a tier
+of models from settings.py (XS, S, M) for the structure, rewrite and fact
+check stages.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .settings import (XS, S, M, ROUTING_SMALL_MAX_TOKENS, ROUTING_MEDIUM_MAX_TOKENS,
+                       ROUTING_MEDIUM_MAX_SECTIONS, ROUTING_MIN_OCR_QUALITY)
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TIER_SMALL = "small"
+TIER_MEDIUM = "medium"
+TIER_LARGE = "large"
+TIERS = (TIER_SMALL, TIER_MEDIUM, TIER_LARGE)
+
+# Model of each stage per tier; "large" is the historical behaviour
+TIER_MODELS = {
+    TIER_SMALL: {"plan": XS, "content": S, "check": XS, "write": S},
+    TIER_MEDIUM: {"plan": S, "content": S, "check": S, "write": M},
+    TIER_LARGE: {"plan": S, "content": M, "check": S, "write": M},
+}
+
+# Markdown syntax, not OCR noise: line prefixes (headings, quotes, list
+# items, checkboxes) and emphasis markers
+_MARKDOWN_PREFIX = re.compile(
+    r"^[ \t]*(?:#{1,6}[ \t]+|>[ \t]*|(?:[-*+•]|\d+[.)])[ \t]+(?:\[[ xX]\][ \t]+)?)",
+    re.MULTILINE)
+_MARKDOWN_EMPHASIS = re.compile(r"\*+|~~|`+|(?<!\S)_+|_+(?!\w)")
+
+_encoding = None
+_encoding_failed = False
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text with tiktoken, or estimate them (4 characters
+    per token) when the encoding cannot be loaded.
+    """
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # Not installed, or the encoding file cannot be downloaded
+            logger.warning(f"⚠️  tiktoken unavailable, estimating token counts: {e}")
+            _encoding_failed = True
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def ocr_quality(text: str) -> float:
+    """
+    Estimate how clean an OCR text is, from 0 (noise) to 1 (clean prose).
+
+    The score is the share of words made of letters (possibly with digits,
+    hyphens or apostrophes) among all whitespace separated words, lowered
+    when the text is full of stray symbols. Markdown markers are removed
+    first, so a clean bulleted list scores like clean prose.
+    """
+    text = _MARKDOWN_EMPHASIS.sub("", _MARKDOWN_PREFIX.sub("", text))
+    words = text.split()
+    if not words:
+        return 1.0
+    clean = sum(1 for word in words
+                if re.fullmatch(r"[\w'’\-]+[.,;:!?)]*", word) and re.search(r"[^\W\d_]", word))
+    symbols = sum(1 for char in text if not (char.isalnum() or char.isspace()))
+    symbol_ratio = symbols / max(1, len(text) - text.count(" "))
+    return round(max(0.0, clean / len(words) - max(0.0, symbol_ratio - 0.2)), 3)
+
+
+@dataclass
+class RouteDecision:
+    """Tier chosen for a draft, with the measurements that led to it."""
+    tier: str
+    tokens: int
+    sections: int
+    quality: float
+    models: dict = field(default_factory=dict)
+
+    def as_dict(self) -> dict:
+        return {"tier": self.tier, "tokens": self.tokens,
+                "sections": self.sections, "quality": self.quality,
+                "models": dict(self.models)}
+
+
+class ModelRouter:
+    """
+    Pick a model tier from the size and OCR quality of a draft.
+
+    Args:
+        small_max_tokens: Largest single-section draft served by the small tier
+        medium_max_tokens: Largest draft served by the medium tier
+        medium_max_sections: Most sections a medium tier draft may have
+        min_quality: Below this OCR quality score the draft moves up a tier
+    """
+
+    def __init__(self, small_max_tokens: int = ROUTING_SMALL_MAX_TOKENS,
+                 medium_max_tokens: int = ROUTING_MEDIUM_MAX_TOKENS,
+                 medium_max_sections: int = ROUTING_MEDIUM_MAX_SECTIONS,
+                 min_quality: float = ROUTING_MIN_OCR_QUALITY):
+        self.small_max_tokens = small_max_tokens
+        self.medium_max_tokens = medium_max_tokens
+        self.medium_max_sections = medium_max_sections
+        self.min_quality = min_quality
+
+    def route(self, text: str, sections: int = 1,
+              quality: Optional[float] = None) -> RouteDecision:
+        """
+        Choose the tier of a draft.
+
+        Args:
+            text: Draft (raw OCR text or structured outline)
+            sections: Number of sections of the draft
+            quality: OCR quality score, computed from ``text`` if omitted
+
+        Returns:
+            RouteDecision: Tier, models per stage and measurements
+        """
+        tokens = count_tokens(text)
+        quality = ocr_quality(text) if quality is None else quality
+
+        if tokens <= self.small_max_tokens and sections <= 1:
+            tier = TIER_SMALL
+        elif tokens <= self.medium_max_tokens and sections <= self.medium_max_sections:
+            tier = TIER_MEDIUM
+        else:
+            tier = TIER_LARGE
+
+        # Noisy OCR text needs a stronger model to be understood
+        if quality < self.min_quality and tier != TIER_LARGE:
+            tier = TIERS[TIERS.index(tier) + 1]
+
+        return RouteDecision(tier=tier, tokens=tokens, sections=sections,
+                             quality=quality, models=dict(TIER_MODELS[tier]))
@@ -1,18 +1,31 @@
+import asyncio
 import json
 import os
 import logging
+import re
+import time
 
-from typing import TypedDict
+from typing import Awaitable, Callable, Optional, TypedDict
 from pathlib import Path
 
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import (HumanMessage, AIMessage, FunctionMessage,
                                      SystemMessage)
 from dotenv import load_dotenv
 
 from .tooling import McpNotionConnector, ImageTextExtractor
-from .settings import S, M
+from .notion_blocks import (PAGE_UNAVAILABLE_MESSAGE, check_page_writable,
+                            compile_markdown, write_page, write_page_stream)
+from .settings import (S, M, NOTION_WRITE_MODE, WRITE_MODE_LLM, ENHANCE_MAX_RETRIES,
+                       ENHANCE_FALLBACK, ENHANCE_FALLBACK_STRUCTURED,
+                       ENHANCE_SECTIONED, ENHANCE_SECTION_CONCURRENCY,
+                       NOTION_STREAM_WRITES, NOTION_STREAM_QUEUE_SIZE,
+                       MODEL_ROUTING_ENABLED)
+from .model_routing import ModelRouter
+from .cache import LlmResponseCache
+from .llm_clients import llm_clients
+from .timing import StageTimer, run_concurrently
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -20,27 +33,167 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 
-class DraftEnhancer:
-    def __init__(self):
-        self.llm_for_notes_plan = ChatOpenAI(model=S,
-                                             temperature=0)
+def parse_verdict(answer: str) -> str:
+    """
+    Read the fact checker's answer as "ok" or "ko".
+
+    Tolerates case, punctuation and trailing words ("OK.", "ko - the date
+    is wrong"). An answer that is neither is accepted as "ok": a rewrite is
+    too expensive to spend on an unclear verdict.
+    """
+    words = re.findall(r"[a-z]+", answer.lower())
+    if words and words[0] == "ko":
+        return "ko"
+    if not words or words[0] != "ok":
+        logger.warning(f"⚠️  Unclear fact check answer, accepted: {answer[:100]!r}")
+    return "ok"
+
+
+HEADING_PATTERN = re.compile(r"^#{1,6}\s")
+
 
-        self.llm_for_notes_content = ChatOpenAI(model=M,
-                                                temperature=0)
+def split_sections(outline: str) -> list[str]:
+    """
+    Split a Markdown outline before each heading.
 
-        self.llm_for_check = ChatOpenAI(model=S,
-                                        temperature=0)
+    Text before the first heading is a section of its own. Headings inside
+    fenced code blocks are ignored.
 
-        self.state = None
+    Returns:
+        list: Sections in order, without leading or trailing blank lines
+    """
+    sections, current = [], []
+    in_code = False
+    for line in outline.splitlines():
+        if line.strip().startswith("```"):
+            in_code = not in_code
+        if not in_code and HEADING_PATTERN.match(line) and any(l.strip() for l in current):
+            sections.append("\n".join(current).strip("\n"))
+            current = []
+        current.append(line)
+    if any(l.strip() for l in current):
+        sections.append("\n".join(current).strip("\n"))
+    return sections
 
-    class State(TypedDict):
+
+class DraftEnhancer:
+    """
+    LangGraph workflow turning an OCR draft into structured notes.
+
+    Nodes only read the state they are given and return updates, so one
+    instance, its LLM clients and its compiled workflow can serve many
+    concurrent uploads.
+
+    Args:
+        max_retries: Rewrites allowed after the first one when the fact
+            check fails
+        fallback: Draft kept once the budget is spent: ENHANCE_FALLBACK_LAST
+            (latest rewrite) or ENHANCE_FALLBACK_STRUCTURED (the outline)
+        sectioned: Enhance and check an outline with several headings section
+            by section, concurrently, retrying only the failing sections
+        section_concurrency: LLM calls in flight at once for one draft in
+            sectioned mode
+        routing: Pick the model of each stage per draft (see
+            model_routing.py) instead of always using the clients below
+        cache: Cache of LLM responses; a job passes ``cache_bypass`` in its
+            input to skip reading it
+    """
+
+    def __init__(self, max_retries: int = ENHANCE_MAX_RETRIES,
+                 fallback: str = ENHANCE_FALLBACK,
+                 sectioned: bool = ENHANCE_SECTIONED,
+                 section_concurrency: int = ENHANCE_SECTION_CONCURRENCY,
+                 routing: bool = MODEL_ROUTING_ENABLED,
+                 cache: Optional[LlmResponseCache] = None):
+        # Shared clients, their connections are kept alive across jobs
+        self.llm_for_notes_plan = llm_clients.chat(S)
+        self.llm_for_notes_content = llm_clients.chat(M)
+        self.llm_for_check = llm_clients.chat(S)
+
+        # Clients of the routed models, shared by every job
+        self.router = ModelRouter() if routing else None
+        self._clients = {S: self.llm_for_notes_plan, M: self.llm_for_notes_content}
+
+        self.cache = cache
+
+        self.max_retries = max_retries
+        self.fallback = fallback
+        self.sectioned = sectioned
+        self.section_concurrency = max(1, section_concurrency)
+        self._workflow = None
+
+    class State(TypedDict, total=False):
         user_input: str
         agent_response: str
+        # Outline produced by structure_content, kept for the fallback
+        structured_draft: str
+        # Enhancement passes, fact check verdict and time spent in the loop
+        iterations: int
+        verdict: str
+        loop_seconds: float
+        fallback_used: bool
+        # Sectioned mode: number of sections and how many needed a rewrite
+        sections: int
+        sections_retried: int
+        # Model routing: tier and model of each stage chosen for this draft
+        tier: str
+        models: dict
+        # Skip reading the LLM response cache (fresh answers are still stored)
+        cache_bypass: bool
+
+    def _llm(self, stage: str, models: Optional[dict]):
+        """Client of a stage: the routed model if any, else the default one."""
+        model = (models or {}).get(stage)
+        if model is None:
+            return {"plan": self.llm_for_notes_plan,
+                    "content": self.llm_for_notes_content,
+                    "check": self.llm_for_check}[stage]
+        if model not in self._clients:
+            self._clients[model] = llm_clients.chat(model)
+        return self._clients[model]
+
+    async def _invoke(self, stage: str, llm, messages: list, bypass: bool = False) -> str:
+        """
+        Call an LLM through the response cache.
+
+        Only temperature 0 calls are cached: their answer is reproducible.
+
+        Args:
+            stage: Pipeline stage, for the per-stage cache counters
+            llm: Chat model client
+            messages: Messages sent to the model
+            bypass: Do not read the cache, but store the fresh answer
 
-    async def structure_content(self, state: State, ) -> State:
+        Returns:
+            str: Content of the model's answer
+        """
+        model = getattr(llm, "model_name", None)
+        params = {"temperature": getattr(llm, "temperature", None)}
+        cacheable = (self.cache is not None and isinstance(model, str)
+                     and params["temperature"] == 0)
+
+        if cacheable and bypass:
+            self.cache.record_bypass(stage)
+        elif cacheable:
+            cached = await asyncio.to_thread(self.cache.get_response, stage, model,
+                                             messages, params)
+            if cached is not None:
+                logger.debug("LLM cache hit for %s (%s)", stage, model)
+                return cached
+
+        response = await llm.ainvoke(messages)
+        if cacheable:
+            await asyncio.to_thread(self.cache.put_response, model, messages, params,
+                                    response.content)
+        return response.content
+
+    async def structure_content(self, state: State) -> dict:
         """Convert raw draft into a structured outline."""
-        self.state = state
         draft = state["user_input"]
+        routing = None
+        if self.router is not None:
+            # The outline model is chosen from the raw OCR text
+            routing = self.router.route(draft)
         messages = [
             SystemMessage(content="Organize this draft into sections with headings. "
                                   "Preserve numbered titles like '1. Introduction'."
@@ -49,29 +202,47 @@ class DraftEnhancer:
                                   "not add extra content."),
             HumanMessage(content=draft)
         ]
-        response = await self.llm_for_notes_plan.ainvoke(messages)
-        logger.debug("response 1 : %s", response.content)
-        state["agent_response"] = response.content
-        return state
-
-    async def enhance_clarity(self, state: State) -> State:
+        start = time.perf_counter()
+        outline = await self._invoke("structure", self._llm("plan", routing and routing.models),
+                                     messages, state.get("cache_bypass", False))
+        logger.debug("response 1 : %s", outline)
+        update = {"agent_response": outline,
+                  "structured_draft": outline,
+                  "iterations": 0,
+                  "loop_seconds": 0.0,
+                  "fallback_used": False}
+
+        if routing is not None:
+            # The rewrite and check models depend on the outline's size
+            decision = self.router.route(outline,
+                                         sections=len(split_sections(outline)),
+                                         quality=routing.quality)
+            models = {**decision.models, "plan": routing.models["plan"]}
+            logger.info(f"🧭 Routed draft to the {decision.tier} tier ({decision.tokens} "
+                        f"tokens, {decision.sections} sections, OCR quality "
+                        f"{decision.quality}): {models}, outline in "
+                        f"{time.perf_counter() - start:.2f}s")
+            update.update(tier=decision.tier, models=models)
+        return update
+
+    async def rewrite(self, draft: str, models: Optional[dict] = None,
+                      bypass: bool = False) -> str:
         """Explain jargon, add examples, and improve readability."""
-        state = self.state
-        structured_draft = state["agent_response"]
         messages = [
             SystemMessage(content="Improve this draft : ensure it is clear and easy to understand."
                                   "Keep sections as provided."
                                   "Preserve any schemas."
                                   "Ensure the facts are correct."),
-            HumanMessage(content=structured_draft)
+            HumanMessage(content=draft)
         ]
-        response = await self.llm_for_notes_content.ainvoke(messages)
-        logger.debug("response 2 : %s", response.content)
-        state["agent_response"] = response.content
-        return state
-
-    async def check_facts(self, state: State):
-        content = state["agent_response"]
+        content = await self._invoke("enhance", self._llm("content", models),
+                                     messages, bypass)
+        logger.debug("response 2 : %s", content)
+        return content
+
+    async def check(self, content: str, models: Optional[dict] = None,
+                    bypass: bool = False) -> str:
+        """Fact check a draft: "ok" or "ko"."""
         messages = [
             SystemMessage(content="Check the facts in this draft : ensure "
                                   "there is no false information. If there "
@@ -80,106 +251,438 @@ class DraftEnhancer:
                                   "answer only the word 'ok' in lowercase."),
             HumanMessage(content=content)
         ]
-        response = await self.llm_for_check.ainvoke(messages)
-        logger.debug("response 3 : %s", response.content)
-        if response.content == "ok":
-            return "ok"
-        else:
-            logger.debug("response 3 : %s", response.content)
-            return "ko"
+        answer = await self._invoke("check", self._llm("check", models), messages, bypass)
+        logger.debug("response 3 : %s", answer)
+        return parse_verdict(answer)
+
+    async def enhance_clarity(self, state: State) -> dict:
+        """Rewrite the whole draft."""
+        start = time.perf_counter()
+        rewritten = await self.rewrite(state["agent_response"], state.get("models"),
+                                       state.get("cache_bypass", False))
+        return {"agent_response": rewritten,
+                "iterations": state.get("iterations", 0) + 1,
+                "loop_seconds": (state.get("loop_seconds", 0.0)
+                                 + time.perf_counter() - start)}
+
+    async def check_facts(self, state: State) -> dict:
+        start = time.perf_counter()
+        verdict = await self.check(state["agent_response"], state.get("models"),
+                                   state.get("cache_bypass", False))
+        return {"verdict": verdict,
+                "loop_seconds": (state.get("loop_seconds", 0.0)
+                                 + time.perf_counter() - start)}
+
+    def route_after_structure(self, state: State) -> str:
+        """Enhance by section when the outline has several headings."""
+        if self.sectioned and len(split_sections(state["structured_draft"])) > 1:
+            return "sections"
+        return "whole"
+
+    async def enhance_sections(self, state: State) -> dict:
+        """
+        Rewrite and check each section concurrently, then reassemble them.
 
-    async def out(self, state: State):
-        return state
+        Each section has its own retry budget and fallback, so a failed
+        check only costs the rewrite of that section. Finished sections are
+        emitted in order on the custom stream as {"section": text}, for
+        callers of ``astream(stream_mode="custom")``.
+        """
+        start = time.perf_counter()
+        sections = split_sections(state["structured_draft"])
+        semaphore = asyncio.Semaphore(self.section_concurrency)
+        emit = get_stream_writer()
+        finished = {}
+        next_index = 0
+
+        async def limited(call, text):
+            async with semaphore:
+                return await call(text, state.get("models"),
+                                  state.get("cache_bypass", False))
+
+        async def enhance_section(section):
+            draft, passes = section, 0
+            while True:
+                draft = await limited(self.rewrite, draft)
+                passes += 1
+                if await limited(self.check, draft) == "ok":
+                    return draft, passes, False
+                if passes > self.max_retries:
+                    if self.fallback == ENHANCE_FALLBACK_STRUCTURED:
+                        draft = section
+                    return draft, passes, True
+
+        async def enhance_and_emit(index, section):
+            nonlocal next_index
+            result = await enhance_section(section)
+            finished[index] = result[0]
+            # Emit every section whose predecessors are all done
+            while next_index in finished:
+                emit({"section": finished.pop(next_index)})
+                next_index += 1
+            return result
+
+        # A failing section cancels the others instead of letting them spend
+        # their retry budget on a job that already failed
+        results = await run_concurrently(*[enhance_and_emit(index, section)
+                                           for index, section in enumerate(sections)])
+        retried = sum(1 for _, passes, _ in results if passes > 1)
+        fallbacks = sum(1 for _, _, fallback_used in results if fallback_used)
+        logger.info(f"🧩 Enhanced {len(sections)} sections, {retried} retried, "
+                    f"{fallbacks} kept after the retry budget")
+
+        return {"agent_response": "\n\n".join(draft for draft, _, _ in results),
+                "iterations": max(passes for _, passes, _ in results),
+                "verdict": "ok" if not fallbacks else "ko",
+                "loop_seconds": time.perf_counter() - start,
+                "fallback_used": fallbacks > 0,
+                "sections": len(sections),
+                "sections_retried": retried}
+
+    def route_after_check(self, state: State) -> str:
+        """Leave the loop on "ok", retry while the budget allows, else fall back."""
+        if state["verdict"] == "ok":
+            return "ok"
+        if state["iterations"] > self.max_retries:
+            return "exhausted"
+        logger.info(f"🔁 Fact check failed, rewrite {state['iterations']}/{self.max_retries}")
+        return "ko"
+
+    async def give_up(self, state: State) -> dict:
+        """Apply the fallback policy once the retry budget is spent."""
+        logger.warning(f"⚠️  Fact check still failing after {state['iterations']} "
+                       f"rewrites, keeping the {self.fallback} draft")
+        update = {"fallback_used": True}
+        if self.fallback == ENHANCE_FALLBACK_STRUCTURED:
+            update["agent_response"] = state["structured_draft"]
+        return update
+
+    async def out(self, state: State) -> dict:
+        return {}
 
     async def create_notes_workflow(self):
+        """Return the compiled workflow, compiling it on first use."""
+        if self._workflow is None:
+            self._workflow = self._compile_workflow()
+        return self._workflow
+
+    def _compile_workflow(self):
         workflow = StateGraph(self.State)
 
         # Add nodes
         workflow.add_node("structure", self.structure_content)
         workflow.add_node("enhance", self.enhance_clarity)
+        workflow.add_node("check", self.check_facts)
+        workflow.add_node("give_up", self.give_up)
+        workflow.add_node("sections", self.enhance_sections)
         workflow.add_node("out", self.out)
 
-        workflow.add_edge("structure", "enhance")
         workflow.add_conditional_edges(
-            "enhance", self.check_facts,
+            "structure", self.route_after_structure,
+            {
+                "whole": "enhance",
+                "sections": "sections"
+            },
+        )
+        workflow.add_edge("sections", "out")
+        workflow.add_edge("enhance", "check")
+        workflow.add_conditional_edges(
+            "check", self.route_after_check,
             {
                 "ko": "enhance",
-                "ok": "out"
+                "ok": "out",
+                "exhausted": "give_up"
             },
         )
+        workflow.add_edge("give_up", "out")
 
         # Set entry/exit points
         workflow.set_entry_point("structure")
         # workflow.set_finish_point("out")
 
-        return workflow.compile()
+        # Two steps per pass, plus structure, give_up and out
+        steps = 2 * (self.max_retries + 1) + 3
+        return workflow.compile().with_config(recursion_limit=max(25, steps + 1))
 
 
 class NotesCreator:
     def __init__(self,
-                 notion_connector: McpNotionConnector,
+                 notion_connector: Optional[McpNotionConnector],
                  draft_enhancer: DraftEnhancer,
-                 image_text_extractor: ImageTextExtractor):
+                 image_text_extractor: ImageTextExtractor,
+                 write_mode: str = NOTION_WRITE_MODE,
+                 timer: Optional[StageTimer] = None,
+                 connect: Optional[Callable[[str], Awaitable[McpNotionConnector]]] = None,
+                 page_check: Optional[Callable[[str], Awaitable[None]]] = None,
+                 stream_writes: bool = NOTION_STREAM_WRITES,
+                 routing: bool = MODEL_ROUTING_ENABLED,
+                 cache_bypass: bool = False):
+        """
+        Args:
+            notion_connector: Notion MCP connector, or None if ``connect``
+                provides it
+            draft_enhancer: Enhancement workflow
+            image_text_extractor: OCR of the uploaded pictures
+            write_mode: How the draft is written to Notion
+            timer: Records the start and end of each pipeline stage
+            connect: Coroutine function returning a connector for a token
+                (e.g. a session pool's acquire); runs in the notion_connect
+                stage, concurrently with OCR and enhancement
+            page_check: Coroutine function raising ValueError if the target
+                page cannot receive content (e.g. a direct Notion API call);
+                runs as soon as the pipeline starts. Without it the page is
+                checked through the MCP session once connected
+            stream_writes: In compiler mode, write each enhanced section to
+                Notion as soon as it is ready instead of the whole draft at
+                the end
+            routing: In LLM write mode, pick the model driving the MCP tools
+                from the size of the enhanced draft
+            cache_bypass: Ask for fresh LLM answers instead of cached ones
+        """
 
-        self.llm_for_notion_mcp = ChatOpenAI(model=M,
-                                             temperature=0)
+        self.llm_for_notion_mcp = llm_clients.chat(M)
 
         self.notion_connector = notion_connector
         self.draft_enhancer = draft_enhancer
         self.image_text_extractor = image_text_extractor
+        self.write_mode = write_mode
+        self.timer = timer or StageTimer()
+        self.connect = connect
+        self.page_check = page_check
+        self.stream_writes = stream_writes
+        self.router = ModelRouter() if routing else None
+        self.cache_bypass = cache_bypass
+        self.functions = []
         self.llm_with_functions = None
 
     async def notes_creation(self, user_notion_token, user_notion_page_id):
         """
         Create notes in Notion from extracted and enhanced text.
 
+        The draft is compiled into Notion blocks locally unless the LLM
+        write mode is selected, in which case the model drives the MCP tools.
+
         Args:
             user_notion_token: User's Notion OAuth access token
             user_notion_page_id: User's target Notion page ID
         """
-        messages = await self.prepare_content(user_notion_token, user_notion_page_id)
-        await self.write_in_notion(messages)
+        if self.write_mode == WRITE_MODE_LLM:
+            messages = await self.prepare_content(user_notion_token, user_notion_page_id)
+            with self.timer.stage("notion_write"):
+                await self.write_in_notion(messages)
+        elif self.stream_writes:
+            await self.stream_notes(user_notion_token, user_notion_page_id)
+        else:
+            title, enhanced_draft = await self.prepare_draft(user_notion_token,
+                                                             user_notion_page_id)
+            with self.timer.stage("notion_write"):
+                await self.write_blocks_in_notion(title, user_notion_page_id,
+                                                  enhanced_draft)
 
-    async def prepare_content(self, user_notion_token, user_notion_page_id):
+    async def stream_notes(self, user_notion_token, user_notion_page_id):
         """
-        Prepare content for Notion upload: extract, enhance, and format.
+        Write the enhanced sections to Notion while later ones are generated.
+
+        Enhancement feeds a bounded queue that the Notion writer drains, so
+        at most NOTION_STREAM_QUEUE_SIZE finished sections wait for Notion.
+        The time the first blocks land is recorded as the first_block mark.
 
         Args:
             user_notion_token: User's Notion OAuth access token
             user_notion_page_id: User's target Notion page ID
+
+        Returns:
+            dict: Write statistics (see write_page_stream)
         """
-        await self.connect_notion_to_llm(user_notion_token)
+        if not user_notion_page_id:
+            raise ValueError("No Notion page ID provided.")
 
-        query = self.get_primary_notes()
+        queue = asyncio.Queue(maxsize=NOTION_STREAM_QUEUE_SIZE)
+        connected = asyncio.ensure_future(
+            self.setup_notion(user_notion_token, user_notion_page_id))
+
+        async def produce():
+            await self.extract_and_enhance(sections=queue)
+            # End of stream (a failure cancels the writer instead)
+            await queue.put(None)
+
+        async def sections():
+            while (section := await queue.get()) is not None:
+                yield compile_markdown(section)
+
+        async def write():
+            await connected
+            title = self.image_text_extractor.repo_path.split("/")[-1]
+            with self.timer.stage("notion_write"):
+                stats = await write_page_stream(
+                    self.notion_connector.session, user_notion_page_id, title,
+                    sections(), on_first_block=lambda: self.timer.mark("first_block"))
+            logger.info(f"✅ Page {stats['page_id']} streamed in {stats['sections']} "
+                        f"sections with {stats['calls']} API calls")
+            return stats
+
+        branches = [connected, produce(), write()]
+        if self.page_check is not None:
+            branches.append(self.check_target_page(user_notion_page_id))
+        _, _, stats, *_ = await run_concurrently(*branches)
+        return stats
+
+    async def prepare_draft(self, user_notion_token, user_notion_page_id):
+        """
+        Connect to Notion while the notes are extracted and enhanced.
 
-        workflow = await self.draft_enhancer.create_notes_workflow()
-        workflow_result = await workflow.ainvoke({"user_input": query})
+        Args:
+            user_notion_token: User's Notion OAuth access token
+            user_notion_page_id: User's target Notion page ID
+
+        Returns:
+            tuple: Page title and enhanced draft
+        """
+        if not user_notion_page_id:
+            raise ValueError("No Notion page ID provided.")
+
+        # Connecting to Notion does not depend on the notes: set it up while
+        # the pictures are read and the draft is enhanced. An unavailable
+        # target page cancels the LLM work still running.
+        branches = [self.setup_notion(user_notion_token, user_notion_page_id),
+                    self.extract_and_enhance()]
+        if self.page_check is not None:
+            branches.append(self.check_target_page(user_notion_page_id))
+        _, workflow_result, *_ = await run_concurrently(*branches)
 
         # Extract the enhanced draft from workflow result
         enhanced_draft = workflow_result.get("agent_response", str(workflow_result))
 
-        # Prepare initial message
         title = self.image_text_extractor.repo_path.split("/")[-1]
+        return title, enhanced_draft
+
+    async def setup_notion(self, user_notion_token, user_notion_page_id):
+        """
+        Open (or check) the Notion MCP session, timed as notion_connect, then
+        check the target page through it unless page_check does.
+        """
+        with self.timer.stage("notion_connect"):
+            if self.connect is not None and self.notion_connector is None:
+                self.notion_connector = await self.connect(user_notion_token)
+            if self.write_mode == WRITE_MODE_LLM:
+                await self.connect_notion_to_llm(user_notion_token)
+            else:
+                await self.notion_connector.ensure_connected(user_notion_token)
+
+        if self.page_check is None:
+            with self.timer.stage("page_check"):
+                await check_page_writable(self.notion_connector.session,
+                                          user_notion_page_id)
+
+    async def check_target_page(self, user_notion_page_id):
+        """Fail fast if the target page cannot receive the notes."""
+        with self.timer.stage("page_check"):
+            await self.page_check(user_notion_page_id)
+
+    async def extract_and_enhance(self, sections: Optional[asyncio.Queue] = None):
+        """
+        Read the notes and run the enhancement workflow.
+
+        Args:
+            sections: If given, each finished section of the draft is put in
+                this queue as soon as it is ready (the whole draft when the
+                workflow does not work by section)
+        """
+        with self.timer.stage("ocr"):
+            query = await self.get_primary_notes()
+
+        with self.timer.stage("enhance") as stage:
+            enhance_start = time.perf_counter()
+            workflow = await self.draft_enhancer.create_notes_workflow()
+            inputs = {"user_input": query}
+            if self.cache_bypass:
+                inputs["cache_bypass"] = True
+            if sections is None:
+                result = await workflow.ainvoke(inputs)
+            else:
+                result, streamed = {}, False
+                async for mode, chunk in workflow.astream(inputs,
+                                                          stream_mode=["custom", "values"]):
+                    if mode == "values":
+                        result = chunk
+                    elif isinstance(chunk, dict) and "section" in chunk:
+                        await sections.put(chunk["section"])
+                        streamed = True
+                if not streamed:
+                    await sections.put(result.get("agent_response", ""))
+            # Reported with the job's stage timings
+            if "iterations" in result:
+                stage.update(iterations=result["iterations"],
+                             loop_seconds=round(result["loop_seconds"], 3),
+                             fallback_used=result["fallback_used"])
+            if "sections" in result:
+                stage.update(sections=result["sections"],
+                             sections_retried=result["sections_retried"])
+            if "tier" in result:
+                stage.update(tier=result["tier"], models=result["models"])
+                logger.info(f"🧭 {result['tier'].capitalize()} tier enhancement took "
+                            f"{time.perf_counter() - enhance_start:.2f}s")
+            return result
+
+    async def prepare_content(self, user_notion_token, user_notion_page_id):
+        """
+        Prepare content for Notion upload: extract, enhance, and format.
+
+        Args:
+            user_notion_token: User's Notion OAuth access token
+            user_notion_page_id: User's target Notion page ID
+        """
+        title, enhanced_draft = await self.prepare_draft(user_notion_token,
+                                                         user_notion_page_id)
 
         # Use absolute path relative to this file's location
         current_dir = Path(__file__).parent
         filename = current_dir / "base_prompt.txt"
 
-        if not user_notion_page_id:
-            raise ValueError("No Notion page ID provided.")
-
         base_prompt = Path(filename).read_text()
         filled_prompt = base_prompt.format(
             title=title,
             notion_page_id=user_notion_page_id,
             draft=enhanced_draft
             )
+        if self.router is not None:
+            routing = self.router.route(enhanced_draft,
+                                        sections=len(split_sections(enhanced_draft)))
+            write_model = routing.models["write"]
+            logger.info(f"🧭 Notion writing routed to {write_model} "
+                        f"({routing.tier} tier, {routing.tokens} tokens)")
+            if write_model != self.llm_for_notion_mcp.model_name:
+                self.llm_with_functions = (llm_clients.chat(write_model)
+                                           .bind(functions=self.functions))
+
         logger.info(f"\n📝 Prompt sent to LLM for Notion upload:")
         logger.info(f"Title: {title}")
         logger.info(f"Parent Page ID: {user_notion_page_id}")
         logger.info(f"Draft preview (first 200 chars): {enhanced_draft[:200]}...")
         return [HumanMessage(content=filled_prompt)]
 
+    async def write_blocks_in_notion(self, title, parent_page_id, draft):
+        """
+        Compile the draft into Notion blocks and write them with a fixed,
+        small number of API calls.
+
+        Args:
+            title: Title of the page to create
+            parent_page_id: Notion page receiving the new page
+            draft: Enhanced Markdown draft
+
+        Returns:
+            dict: Write statistics (page id, calls, blocks, seconds per call)
+        """
+        blocks = compile_markdown(draft)
+        logger.info(f"🧱 Compiled draft into {len(blocks)} Notion blocks")
+
+        stats = await write_page(self.notion_connector.session,
+                                 parent_page_id, title, blocks)
+        logger.info(f"✅ Page {stats['page_id']} written with {stats['calls']} "
+                    f"API calls ({stats['batch_seconds']} s per call)")
+        return stats
+
     async def write_in_notion(self, messages):
         final_text = []
         # Prevent infinite loops
@@ -238,7 +741,7 @@ class NotesCreator:
                     if ("object_not_found" in result_text.lower() or
                         "invalid_request_url" in result_text.lower() or
                         "archived" in result_text.lower()):
-                        raise ValueError("La page Notion configurée n'existe plus ou n'est plus accessible. Veuillez configurer une nouvelle page.")
+                        raise ValueError(PAGE_UNAVAILABLE_MESSAGE)
 
                     if consecutive_errors >= max_consecutive_errors:
                         logger.error(f"❌ Stopping after {max_consecutive_errors} consecutive errors")
@@ -268,11 +771,10 @@ class NotesCreator:
         Args:
             user_notion_token: User's Notion OAuth access token (optional)
         """
-        await self.notion_connector.connect_to_server(user_notion_token)
-        # Fetch available tools from MCP session
-        response = await self.notion_connector.session.list_tools()
+        await self.notion_connector.ensure_connected(user_notion_token)
+        # Tools were listed by the connector when the session was opened
         functions = []
-        for tool in response.tools:
+        for tool in self.notion_connector.tools:
             functions.append({
                 "name": tool.name,
                 "description": tool.description,
@@ -280,9 +782,10 @@ class NotesCreator:
             })
 
         # Bind functions to LLM
+        self.functions = functions
         self.llm_with_functions = (self.llm_for_notion_mcp
                                    .bind(functions=functions))
 
-    def get_primary_notes(self):
-        query = self.image_text_extractor.extract_text()
+    async def get_primary_notes(self):
+        query = await self.image_text_extractor.aextract_text()
         return query
@@ -0,0 +1,716 @@
+"""
+Deterministic compilation of Markdown drafts into Notion blocks.
+
+The enhanced draft is turned into Notion block JSON locally, then written
+with one page creation call and as few append calls as the Notion limits
+allow, instead of letting an LLM rebuild every block as function calls.
+"""
+
+import json
+import logging
+import re
+import time
+from typing import AsyncIterator, Callable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Notion API limits
+RICH_TEXT_MAX_LENGTH = 2000
+RICH_TEXT_MAX_ITEMS = 100
+CHILDREN_MAX_BLOCKS = 100
+# Blocks in one request, nested children included
+REQUEST_MAX_BLOCKS = 1000
+REQUEST_MAX_BYTES = 450 * 1024
+MAX_NESTING_DEPTH = 2
+
+PAGE_UNAVAILABLE_MESSAGE = ("La page Notion configurée n'existe plus ou n'est "
+                            "plus accessible. Veuillez configurer une nouvelle page.")
+
+CODE_LANGUAGES = {
+    "abap", "bash", "c", "c#", "c++", "clojure", "coffeescript", "css",
+    "dart", "diff", "docker", "elixir", "erlang", "go", "graphql", "haskell",
+    "html", "java", "javascript", "json", "kotlin", "latex", "lua",
+    "makefile", "markdown", "matlab", "mermaid", "objective-c", "ocaml",
+    "perl", "php", "plain text", "powershell", "python", "r", "ruby", "rust",
+    "scala", "shell", "sql", "swift", "typescript", "xml", "yaml",
+}
+CODE_LANGUAGE_ALIASES = {
+    "": "plain text", "text": "plain text", "txt": "plain text",
+    "py": "python", "js": "javascript", "ts": "typescript", "sh": "shell",
+    "zsh": "shell", "console": "shell", "yml": "yaml", "md": "markdown",
+    "cpp": "c++", "cs": "c#", "csharp": "c#", "dockerfile": "docker",
+    "tex": "latex", "ps1": "powershell",
+}
+
+CALLOUT_ALERTS = {
+    "NOTE": "ℹ️", "TIP": "💡", "IMPORTANT": "❗", "WARNING": "⚠️",
+    "CAUTION": "🚨",
+}
+CALLOUT_EMOJIS = ("💡", "⚠️", "❗", "ℹ️", "📌", "🚨")
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+_DIVIDER = re.compile(r"^(-{3,}|\*{3,}|_{3,})$")
+_TODO = re.compile(r"^(\s*)[-*+]\s+\[([ xX])\]\s+(.*)$")
+_BULLET = re.compile(r"^(\s*)[-*+•]\s+(.*)$")
+_NUMBERED = re.compile(r"^(\s*)\d+[.)]\s+(.*)$")
+_QUOTE = re.compile(r"^\s*>\s?(.*)$")
+_ALERT = re.compile(r"^\[!(\w+)\]\s*(.*)$")
+_FENCE = re.compile(r"^\s*```\s*([\w+#-]*)\s*$")
+_TABLE_ROW = re.compile(r"^\s*\|.*\|\s*$")
+_TABLE_SEPARATOR = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+_SUMMARY = re.compile(r"<summary>(.*?)</summary>", re.IGNORECASE)
+_SENTENCE_END = re.compile(r"(?<=[.!?…:;])\s+")
+_INLINE = re.compile(
+    r"(?P<code>`(?P<code_text>[^`]+)`)"
+    r"|(?P<link>\[(?P<link_text>[^\]]+)\]\((?P<link_url>[^)\s]+)\))"
+    r"|(?P<bold>\*\*(?P<bold_text>.+?)\*\*)"
+    r"|(?P<strike>~~(?P<strike_text>.+?)~~)"
+    r"|(?P<italic>(?<![\w*])\*(?P<italic_text>[^*\s](?:[^*]*[^*\s])?)\*(?![\w*]))"
+)
+
+LIST_TYPES = ("bulleted_list_item", "numbered_list_item", "to_do")
+
+
+def split_text(text: str, limit: int = RICH_TEXT_MAX_LENGTH) -> list[str]:
+    """
+    Split text into chunks of at most ``limit`` characters.
+
+    Chunks end on sentence boundaries when possible, then on whitespace, and
+    only as a last resort in the middle of a word.
+    """
+    if len(text) <= limit:
+        return [text]
+
+    chunks = []
+    current = ""
+    for sentence in _SENTENCE_END.split(text):
+        candidate = f"{current} {sentence}" if current else sentence
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+            current = ""
+        while len(sentence) > limit:
+            cut = sentence.rfind(" ", 0, limit + 1)
+            if cut <= 0:
+                cut = limit
+            chunks.append(sentence[:cut].rstrip())
+            sentence = sentence[cut:].lstrip()
+        current = sentence
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _text_object(content: str, annotations: Optional[dict] = None,
+                 url: Optional[str] = None) -> dict:
+    text = {"content": content}
+    if url:
+        text["link"] = {"url": url}
+    item = {"type": "text", "text": text}
+    if annotations:
+        item["annotations"] = annotations
+    return item
+
+
+def plain_rich_text(text: str) -> list[dict]:
+    """Rich text without inline formatting, split at the Notion limit."""
+    return [_text_object(chunk) for chunk in split_text(text) if chunk]
+
+
+def rich_text(text: str) -> list[dict]:
+    """
+    Convert inline Markdown (bold, italic, strikethrough, code, links) into
+    Notion rich text objects, each at most 2000 characters long.
+    """
+    segments = []
+    position = 0
+    for match in _INLINE.finditer(text):
+        if match.start() > position:
+            segments.append((text[position:match.start()], None, None))
+        if match.group("code"):
+            segments.append((match.group("code_text"), {"code": True}, None))
+        elif match.group("link"):
+            url = match.group("link_url")
+            if not url.startswith(("http://", "https://")):
+                url = None
+            segments.append((match.group("link_text"), None, url))
+        elif match.group("bold"):
+            segments.append((match.group("bold_text"), {"bold": True}, None))
+        elif match.group("strike"):
+            segments.append((match.group("strike_text"),
+                             {"strikethrough": True}, None))
+        else:
+            segments.append((match.group("italic_text"),
+                             {"italic": True}, None))
+        position = match.end()
+    if position < len(text):
+        segments.append((text[position:], None, None))
+
+    return [_text_object(chunk, annotations, url)
+            for content, annotations, url in segments
+            for chunk in split_text(content) if chunk]
+
+
+def _text_blocks(block_type: str, text_items: list[dict], **extra) -> list[dict]:
+    """Build blocks of one type, starting a new block every 100 rich texts."""
+    blocks = []
+    for start in range(0, max(len(text_items), 1), RICH_TEXT_MAX_ITEMS):
+        body = {"rich_text": text_items[start:start + RICH_TEXT_MAX_ITEMS]}
+        body.update(extra)
+        blocks.append({"object": "block", "type": block_type, block_type: body})
+    return blocks
+
+
+def text_block(block_type: str, text: str, **extra) -> list[dict]:
+    return _text_blocks(block_type, rich_text(text), **extra)
+
+
+def _code_blocks(code: str, language: str) -> list[dict]:
+    language = language.lower()
+    language = CODE_LANGUAGE_ALIASES.get(language, language)
+    if language not in CODE_LANGUAGES:
+        language = "plain text"
+    return _text_blocks("code", plain_rich_text(code), language=language)
+
+
+def _table_blocks(rows: list[str]) -> list[dict]:
+    cells = [[cell.strip() for cell in row.strip().strip("|").split("|")]
+             for row in rows if not _TABLE_SEPARATOR.match(row)]
+    if not cells:
+        return []
+    width = max(len(row) for row in cells)
+    children = [{
+        "object": "block",
+        "type": "table_row",
+        "table_row": {"cells": [rich_text(cell) for cell in
+                                row + [""] * (width - len(row))]}
+    } for row in cells]
+    has_header = len(rows) > 1 and bool(_TABLE_SEPARATOR.match(rows[1]))
+    return [{
+        "object": "block",
+        "type": "table",
+        "table": {
+            "table_width": width,
+            "has_column_header": has_header,
+            "has_row_header": False,
+            "children": children,
+        },
+    }]
+
+
+def _quote_blocks(lines: list[str]) -> list[dict]:
+    alert = _ALERT.match(lines[0])
+    if alert and alert.group(1).upper() in CALLOUT_ALERTS:
+        emoji = CALLOUT_ALERTS[alert.group(1).upper()]
+        body = [alert.group(2)] + lines[1:] if alert.group(2) else lines[1:]
+        return _callout_blocks("\n".join(body), emoji)
+    return text_block("quote", "\n".join(lines))
+
+
+def _callout_blocks(text: str, emoji: str) -> list[dict]:
+    return text_block("callout", text,
+                      icon={"type": "emoji", "emoji": emoji})
+
+
+def _children_of(block: dict) -> list[dict]:
+    return block[block["type"]].setdefault("children", [])
+
+
+def _table_paragraphs(table: dict) -> list[dict]:
+    """One paragraph per row of a table, cells separated by " | "."""
+    paragraphs = []
+    for row in table["table"].get("children", []):
+        text_items = []
+        for index, cell in enumerate(row["table_row"]["cells"]):
+            if index:
+                text_items.append(_text_object(" | "))
+            text_items.extend(cell)
+        paragraphs.extend(_text_blocks("paragraph", text_items))
+    return paragraphs
+
+
+def _limit_depth(blocks: list[dict], depth: int = 0) -> list[dict]:
+    """
+    Hoist children nested deeper than a single Notion request accepts next
+    to their parent so that no content is lost.
+
+    Rows cannot leave their table, so a table too deep to hold its rows is
+    written as paragraphs instead.
+    """
+    result = []
+    for block in blocks:
+        if block["type"] == "table" and depth >= MAX_NESTING_DEPTH:
+            result.extend(_table_paragraphs(block))
+            continue
+        result.append(block)
+        children = block[block["type"]].get("children")
+        if not children:
+            continue
+        if depth >= MAX_NESTING_DEPTH:
+            del block[block["type"]]["children"]
+            result.extend(_limit_depth(children, depth))
+        else:
+            block[block["type"]]["children"] = _limit_depth(children, depth + 1)
+    return result
+
+
+def compile_markdown(draft: str) -> list[dict]:
+    """
+    Compile a Markdown draft into a list of Notion block objects.
+
+    Supports headings, paragraphs, bulleted, numbered and to-do lists (with
+    one level of nesting), quotes, callouts (``> [!TIP]`` alerts or lines
+    starting with a callout emoji), fenced code, ``<details>`` toggles,
+    tables and dividers. Inline bold, italic, strikethrough, code and links
+    are kept as rich text annotations.
+
+    Args:
+        draft: Markdown text produced by the enhancement workflow
+
+    Returns:
+        list: Notion block objects ready for the API
+    """
+    return _limit_depth(_compile_lines(draft.splitlines()))
+
+
+def _compile_lines(lines: list[str]) -> list[dict]:
+    blocks: list[dict] = []
+    paragraph: list[str] = []
+
+    def flush_paragraph():
+        if paragraph:
+            blocks.extend(text_block("paragraph", "\n".join(paragraph)))
+            paragraph.clear()
+
+    index = 0
+    while index < len(lines):
+        line = lines[index].rstrip()
+        stripped = line.strip()
+        index += 1
+
+        if not stripped:
+            flush_paragraph()
+            continue
+
+        fence = _FENCE.match(line)
+        if fence:
+            flush_paragraph()
+            code_lines = []
+            while index < len(lines) and not _FENCE.match(lines[index]):
+                code_lines.append(lines[index])
+                index += 1
+            index += 1  # Skip the closing fence
+            blocks.extend(_code_blocks("\n".join(code_lines), fence.group(1)))
+            continue
+
+        if stripped.lower().startswith("<details"):
+            flush_paragraph()
+            summary = _SUMMARY.search(stripped)
+            inner = []
+            depth = 1
+            while index < len(lines):
+                current = lines[index].strip().lower()
+                index += 1
+                if current.startswith("<details"):
+                    depth += 1
+                elif current.startswith("</details"):
+                    depth -= 1
+                    if depth == 0:
+                        break
+                if summary is None and _SUMMARY.search(lines[index - 1]):
+                    summary = _SUMMARY.search(lines[index - 1])
+                    continue
+                inner.append(lines[index - 1])
+            title = summary.group(1).strip() if summary else "Détails"
+            toggle = text_block("toggle", title)[0]
+            children = _compile_lines(inner)
+            if children:
+                toggle["toggle"]["children"] = children
+            blocks.append(toggle)
+            continue
+
+        heading = _HEADING.match(stripped)
+        if heading:
+            flush_paragraph()
+            level = min(len(heading.group(1)), 3)
+            blocks.extend(text_block(f"heading_{level}", heading.group(2)))
+            continue
+
+        if _DIVIDER.match(stripped):
+            flush_paragraph()
+            blocks.append({"object": "block", "type": "divider", "divider": {}})
+            continue
+
+        if _TABLE_ROW.match(line):
+            flush_paragraph()
+            rows = [line]
+            while index < len(lines) and _TABLE_ROW.match(lines[index]):
+                rows.append(lines[index])
+                index += 1
+            blocks.extend(_table_blocks(rows))
+            continue
+
+        quote = _QUOTE.match(line)
+        if quote:
+            flush_paragraph()
+            quote_lines = [quote.group(1)]
+            while index < len(lines) and _QUOTE.match(lines[index]):
+                quote_lines.append(_QUOTE.match(lines[index]).group(1))
+                index += 1
+            blocks.extend(_quote_blocks(quote_lines))
+            continue
+
+        list_blocks = _list_item(line)
+        if list_blocks:
+            flush_paragraph()
+            indented = line[:len(line) - len(line.lstrip())]
+            parent = blocks[-1] if blocks else None
+            if (indented and parent is not None
+                    and parent["type"] in LIST_TYPES):
+                _children_of(parent).extend(list_blocks)
+            else:
+                blocks.extend(list_blocks)
+            continue
+
+        if stripped.startswith(CALLOUT_EMOJIS):
+            flush_paragraph()
+            emoji = next(e for e in CALLOUT_EMOJIS if stripped.startswith(e))
+            blocks.extend(_callout_blocks(stripped[len(emoji):].strip(), emoji))
+            continue
+
+        paragraph.append(stripped)
+
+    flush_paragraph()
+    return blocks
+
+
+def _list_item(line: str) -> list[dict]:
+    todo = _TODO.match(line)
+    if todo:
+        return text_block("to_do", todo.group(3),
+                          checked=todo.group(2).lower() == "x")
+    bullet = _BULLET.match(line)
+    if bullet:
+        return text_block("bulleted_list_item", bullet.group(2))
+    numbered = _NUMBERED.match(line)
+    if numbered:
+        return text_block("numbered_list_item", numbered.group(2))
+    return []
+
+
+def count_blocks(block: dict) -> int:
+    """Number of blocks in a block's tree, the block itself included."""
+    children = block[block["type"]].get("children") or []
+    return 1 + sum(count_blocks(child) for child in children)
+
+
+def _fits_one_request(block: dict) -> bool:
+    children = block[block["type"]].get("children") or []
+    return (len(children) <= CHILDREN_MAX_BLOCKS
+            and all(_fits_one_request(child) for child in children))
+
+
+def _split_oversized(blocks: list[dict]) -> tuple[list[dict], dict[int, list[dict]]]:
+    """
+    Make every block small enough for one Notion request.
+
+    A block with more than 100 children, or a subtree over the request
+    budget, keeps the children that fit (a table needs its first rows) and
+    the others are appended to it once it exists.
+
+    Returns:
+        tuple: Blocks to send, and the children left out of each of them,
+        keyed by ``id()`` of the block sent
+    """
+    sendable, deferred = [], {}
+    for block in blocks:
+        body = block[block["type"]]
+        children = body.get("children") or []
+        if _fits_one_request(block) and count_blocks(block) <= REQUEST_MAX_BLOCKS:
+            sendable.append(block)
+            continue
+        kept, size = [], 1
+        for child in children:
+            child_size = count_blocks(child)
+            if (len(kept) >= CHILDREN_MAX_BLOCKS or not _fits_one_request(child)
+                    or size + child_size > REQUEST_MAX_BLOCKS):
+                break
+            kept.append(child)
+            size += child_size
+        sent = {**block, block["type"]: {**body, "children": kept}}
+        if not kept:
+            del sent[block["type"]]["children"]
+        sendable.append(sent)
+        deferred[id(sent)] = children[len(kept):]
+    return sendable, deferred
+
+
+def batch_blocks(blocks: list[dict], max_blocks: int = CHILDREN_MAX_BLOCKS,
+                 max_bytes: int = REQUEST_MAX_BYTES,
+                 max_total_blocks: int = REQUEST_MAX_BLOCKS) -> list[list[dict]]:
+    """
+    Group blocks into batches that fit in one Notion children request.
+
+    Batches hold at most ``max_blocks`` top-level blocks and
+    ``max_total_blocks`` blocks counting nested children.
+    """
+    batches: list[list[dict]] = []
+    current: list[dict] = []
+    current_bytes = 0
+    current_total = 0
+    for block in blocks:
+        size = len(json.dumps(block, ensure_ascii=False).encode("utf-8"))
+        total = count_blocks(block)
+        if current and (len(current) >= max_blocks
+                        or current_bytes + size > max_bytes
+                        or current_total + total > max_total_blocks):
+            batches.append(current)
+            current, current_bytes, current_total = [], 0, 0
+        current.append(block)
+        current_bytes += size
+        current_total += total
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _creation_batch(blocks: list[dict]) -> list[dict]:
+    """
+    Leading blocks that can be sent with the page creation request.
+
+    Stops before the first block whose children must be appended later:
+    page creation does not return the ids of the blocks it creates.
+    """
+    sendable, deferred = _split_oversized(blocks)
+    batches = batch_blocks(sendable)
+    if not batches:
+        return []
+    first = []
+    for block in batches[0]:
+        if id(block) in deferred:
+            break
+        first.append(block)
+    return first
+
+
+def check_tool_result(result) -> str:
+    """
+    Return the text of an MCP tool result, raising if Notion reported an error.
+
+    Raises:
+        ValueError: If the target page was deleted, archived or is not shared
+        Exception: For any other Notion error
+    """
+    result_text = "".join([c.text for c in result.content])
+
+    is_error = bool(getattr(result, "isError", False))
+    try:
+        is_error = is_error or json.loads(result_text).get("object") == "error"
+    except (ValueError, AttributeError):
+        pass
+    if not is_error:
+        return result_text
+
+    lowered = result_text.lower()
+    if ("object_not_found" in lowered or "invalid_request_url" in lowered
+            or "archived" in lowered):
+        logger.error(f"❌ Notion page unavailable: {result_text[:500]}")
+        raise ValueError(PAGE_UNAVAILABLE_MESSAGE)
+
+    logger.error(f"❌ Notion API error: {result_text[:500]}")
+    raise Exception(f"Échec de l'écriture dans Notion : {result_text[:200]}")
+
+
+def is_page_unavailable(page: dict) -> bool:
+    """True if a retrieved Notion page cannot receive new content."""
+    return bool(page.get("archived") or page.get("in_trash"))
+
+
+async def check_page_writable(session, page_id: str):
+    """
+    Check with one cheap call that the target page can receive content.
+
+    Raises:
+        ValueError: If the page was deleted, archived or is not shared
+    """
+    result = await session.call_tool("API-retrieve-a-page", {"page_id": page_id})
+    result_text = check_tool_result(result)
+    try:
+        page = json.loads(result_text)
+    except ValueError:
+        return
+    if isinstance(page, dict) and is_page_unavailable(page):
+        logger.error(f"❌ Notion page {page_id} is archived")
+        raise ValueError(PAGE_UNAVAILABLE_MESSAGE)
+
+
+async def append_blocks(session, block_id: str, blocks: list[dict],
+                        stats: Optional[dict] = None) -> dict:
+    """
+    Append blocks under ``block_id`` in as few calls as Notion allows.
+
+    Args:
+        session: Connected MCP client session of the Notion server
+        block_id: Page or block receiving the children
+        blocks: Blocks to append, in order
+        stats: Optional statistics dict to update (see write_page)
+
+    Returns:
+        dict: Statistics with the number of calls and seconds per batch
+    """
+    stats = stats if stats is not None else {"calls": 0, "blocks": 0,
+                                             "batch_seconds": []}
+    sendable, deferred = _split_oversized(blocks)
+    for batch in batch_blocks(sendable):
+        start = time.perf_counter()
+        result = await session.call_tool(
+            "API-patch-block-children",
+            {"block_id": block_id, "children": batch})
+        result_text = check_tool_result(result)
+        stats["calls"] += 1
+        stats["blocks"] += len(batch)
+        stats["batch_seconds"].append(round(time.perf_counter() - start, 3))
+
+        if not any(id(block) in deferred for block in batch):
+            continue
+        # Children left out of the request go under the blocks just created
+        try:
+            created = json.loads(result_text).get("results") or []
+        except ValueError:
+            created = []
+        if len(created) != len(batch):
+            raise Exception("Échec de l'ajout des blocs Notion. "
+                            "Aucun ID de bloc retourné.")
+        for block, created_block in zip(batch, created):
+            if id(block) in deferred:
+                await append_blocks(session, created_block["id"], deferred[id(block)], stats)
+    return stats
+
+
+async def create_page(session, parent_page_id: str, title: str,
+                      children: Optional[list[dict]] = None) -> str:
+    """Create a page under ``parent_page_id`` and return its id."""
+    arguments = {
+        "parent": {"page_id": parent_page_id},
+        "properties": {
+            "title": {
+                "title": [{"text": {"content": title}}]
+            }
+        }
+    }
+    if children:
+        arguments["children"] = children
+    result = await session.call_tool("API-post-page", arguments)
+    result_text = check_tool_result(result)
+    try:
+        page_id = json.loads(result_text).get("id")
+    except ValueError:
+        page_id = None
+    if not page_id:
+        raise Exception("Échec de la création de la page Notion. "
+                        "Aucun ID de page retourné.")
+    return page_id
+
+
+async def archive_page(session, page_id: str) -> bool:
+    """
+    Move a page to the Notion trash.
+
+    Returns:
+        bool: True if Notion archived the page
+    """
+    try:
+        result = await session.call_tool("API-patch-page",
+                                         {"page_id": page_id, "archived": True})
+        check_tool_result(result)
+    except Exception as e:
+        logger.error(f"❌ Could not archive Notion page {page_id}: {e}")
+        return False
+    logger.info(f"🗑️  Archived partially written Notion page {page_id}")
+    return True
+
+
+async def write_page(session, parent_page_id: str, title: str,
+                     blocks: list[dict]) -> dict:
+    """
+    Create a page with its content using a fixed, small number of calls.
+
+    The first batch of blocks is sent with the page creation request, the
+    rest is appended in batches of up to 100 blocks.
+
+    Returns:
+        dict: page_id, number of API calls, blocks written and the duration
+        of each call in seconds
+    """
+    first = _creation_batch(blocks)
+    start = time.perf_counter()
+    page_id = await create_page(session, parent_page_id, title, first or None)
+    stats = {
+        "page_id": page_id,
+        "calls": 1,
+        "blocks": len(first),
+        "batch_seconds": [round(time.perf_counter() - start, 3)],
+    }
+    if len(first) < len(blocks):
+        await append_blocks(session, page_id, blocks[len(first):], stats)
+    return stats
+
+
+async def write_page_stream(session, parent_page_id: str, title: str,
+                            sections: AsyncIterator[list[dict]],
+                            on_first_block: Optional[Callable[[], None]] = None) -> dict:
+    """
+    Create a page and append the blocks of each section as it arrives.
+
+    The page is created with the first section, so the user sees content as
+    soon as the first section is ready while later ones are still produced.
+    If the stream fails or is cancelled afterwards, the partial page is
+    archived so that a retry does not leave a duplicate behind.
+
+    Args:
+        session: Connected MCP client session of the Notion server
+        parent_page_id: Notion page receiving the new page
+        title: Title of the page to create
+        sections: Blocks of each section, in page order
+        on_first_block: Called once the first blocks are in Notion
+
+    Returns:
+        dict: Same statistics as write_page, plus the number of sections
+    """
+    stats = None
+    sections_written = 0
+    try:
+        async for blocks in sections:
+            if stats is None:
+                first = _creation_batch(blocks)
+                start = time.perf_counter()
+                page_id = await create_page(session, parent_page_id, title,
+                                            first or None)
+                stats = {
+                    "page_id": page_id,
+                    "calls": 1,
+                    "blocks": len(first),
+                    "batch_seconds": [round(time.perf_counter() - start, 3)],
+                }
+                if len(first) < len(blocks):
+                    await append_blocks(session, page_id, blocks[len(first):], stats)
+            else:
+                await append_blocks(session, stats["page_id"], blocks, stats)
+            sections_written += 1
+
+            if on_first_block is not None and stats["blocks"]:
+                on_first_block()
+                on_first_block = None
+    except BaseException:
+        if stats is not None:
+            await archive_page(session, stats["page_id"])
+        raise
+
+    if stats is None:
+        # Nothing was produced: still create the (empty) page
+        stats = await write_page(session, parent_page_id, title, [])
+    stats["sections"] = sections_written
+    return stats
@@ -1,5 +1,81 @@
+import os
+
 # Model versions
 
 XS = "gpt-4.1-nano"
 S = "gpt-4.1-mini"
 M = "gpt-4.1"
+
+# OCR
+
+OCR_MODEL = "gpt-4o-mini"
+# Maximum number of images of a single job sent to the vision model at once
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", "4"))
+# Persistent OCR cache, disabled when no path is configured
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH")
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+OCR_CACHE_MAX_AGE = float(os.getenv("OCR_CACHE_MAX_AGE", str(30 * 24 * 3600)))
+
+# LLM response cache of the enhancement stages (temperature 0 calls only),
+# disabled when no path is configured
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH")
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LLM_CACHE_MAX_AGE = float(os.getenv("LLM_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+# Shared LLM HTTP clients (see llm_clients.py)
+# Keep-alive connections kept open to the OpenAI/Azure endpoint, and how long
+# an idle one is kept
+LLM_HTTP_MAX_CONNECTIONS = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+LLM_HTTP_MAX_KEEPALIVE = int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "10"))
+LLM_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "120"))
+# API version of the Azure OpenAI deployments
+AZURE_OPENAI_API_VERSION = os.getenv("OPENAI_API_VERSION", "2024-10-21")
+
+# Image preprocessing
+# Photos are downscaled to the resolution the vision model works at anyway
+IMAGE_MAX_LONG_SIDE = int(os.getenv("IMAGE_MAX_LONG_SIDE", "2048"))
+IMAGE_MAX_SHORT_SIDE = int(os.getenv("IMAGE_MAX_SHORT_SIDE", "768"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+# Model routing
+# Each job's stages use the XS/S/M tier matching its size and OCR quality;
+# disabled, every job uses S for structure/check and M for the rewrite
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+# Single-section drafts up to this many tokens use the small tier
+ROUTING_SMALL_MAX_TOKENS = int(os.getenv("ROUTING_SMALL_MAX_TOKENS", "300"))
+# Drafts up to this many tokens and sections use the medium tier
+ROUTING_MEDIUM_MAX_TOKENS = int(os.getenv("ROUTING_MEDIUM_MAX_TOKENS", "2000"))
+ROUTING_MEDIUM_MAX_SECTIONS = int(os.getenv("ROUTING_MEDIUM_MAX_SECTIONS", "6"))
+# OCR quality score (0-1) under which a draft moves up one tier
+ROUTING_MIN_OCR_QUALITY = float(os.getenv("ROUTING_MIN_OCR_QUALITY", "0.6"))
+
+# Draft enhancement
+# Rewrites allowed after the first one when the fact check answers "ko"
+ENHANCE_MAX_RETRIES = int(os.getenv("ENHANCE_MAX_RETRIES", "2"))
+# Draft kept when the budget is spent: "last" (latest rewrite) or
+# "structured" (the outline, before any rewrite)
+ENHANCE_FALLBACK_LAST = "last"
+ENHANCE_FALLBACK_STRUCTURED = "structured"
+ENHANCE_FALLBACK = os.getenv("ENHANCE_FALLBACK", ENHANCE_FALLBACK_LAST)
+# Outlines with several headings are enhanced and checked section by section
+ENHANCE_SECTIONED = os.getenv("ENHANCE_SECTIONED", "true").lower() == "true"
+# LLM calls in flight at once for the sections of one draft
+ENHANCE_SECTION_CONCURRENCY = int(os.getenv("ENHANCE_SECTION_CONCURRENCY", "4"))
+
+# Notion writing
+# "compiler" builds the blocks locally, "llm" lets the model call the MCP tools
+WRITE_MODE_COMPILER = "compiler"
+WRITE_MODE_LLM = "llm"
+NOTION_WRITE_MODE = os.getenv("NOTION_WRITE_MODE", WRITE_MODE_COMPILER)
+# Compiler mode: write each enhanced section as soon as it is ready
+NOTION_STREAM_WRITES = os.getenv("NOTION_STREAM_WRITES", "true").lower() == "true"
+# Finished sections waiting for the Notion writer before enhancement output
+# stops being consumed
+NOTION_STREAM_QUEUE_SIZE = int(os.getenv("NOTION_STREAM_QUEUE_SIZE", "4"))
+
+# Notion MCP session pool
+# Maximum number of live mcp/notion containers (idle or in use)
+MCP_POOL_MAX_SESSIONS = int(os.getenv("MCP_POOL_MAX_SESSIONS", "4"))
+# Seconds an unused session is kept warm before its container is stopped
+MCP_POOL_IDLE_TTL = float(os.getenv("MCP_POOL_IDLE_TTL", "300"))
+MCP_POOL_HEALTH_CHECK_TIMEOUT = float(os.getenv("MCP_POOL_HEALTH_CHECK_TIMEOUT", "5"))
@@ -0,0 +1,86 @@
+"""
+Per-stage wall clock timings of a notes creation run, and concurrent
+execution of independent stages.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, List, Optional
+
+
+class StageTimer:
+    """
+    Record when each pipeline stage started and how long it took.
+
+    Offsets are relative to the creation of the timer, so stages running
+    concurrently can be compared on the same time line.
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._stages: dict[str, dict] = {}
+
+    def _now(self) -> float:
+        return round(time.perf_counter() - self._origin, 3)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as stage ``name``."""
+        entry = {"start": self._now(), "end": None, "seconds": None}
+        self._stages[name] = entry
+        try:
+            yield entry
+        finally:
+            entry["end"] = self._now()
+            entry["seconds"] = round(entry["end"] - entry["start"], 3)
+
+    def mark(self, name: str):
+        """Record an instant event (e.g. first_block) on the time line."""
+        now = self._now()
+        self._stages[name] = {"start": now, "end": now, "seconds": 0.0}
+
+    @property
+    def current(self) -> Optional[str]:
+        """Name of the latest stage still running, if any."""
+        running = [name for name, entry in self._stages.items()
+                   if entry["end"] is None]
+        return running[-1] if running else None
+
+    def overlap(self, first: str, second: str) -> float:
+        """Seconds during which two finished stages were both running."""
+        a, b = self._stages[first], self._stages[second]
+        return round(max(0.0, min(a["end"], b["end"]) - max(a["start"], b["start"])), 3)
+
+    def as_dict(self) -> dict:
+        return {name: dict(entry) for name, entry in self._stages.items()}
+
+
+async def run_concurrently(*aws: Awaitable) -> List[Any]:
+    """
+    Run independent stages concurrently and wait for all of them.
+
+    Unlike ``asyncio.gather``, the first failure cancels the stages still
+    running instead of letting them finish in the background.
+
+    Returns:
+        list: Results in the order of the arguments
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    except BaseException:
+        # Cancelled from outside: take the stages down with us
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    if pending:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+    for task in tasks:
+        if task.done() and not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+    return [task.result() for task in tasks]
@@ -1,61 +1,151 @@
+import asyncio
 import base64
 import os
 import json
 import logging
-from openai import OpenAI
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from contextlib import AsyncExitStack
 from typing import Optional
 
 from . import utils
+from .cache import OcrCache
+from .llm_clients import llm_clients
+from .image_preprocessing import PreparedImage, prepare_image
+from .settings import OCR_MODEL, OCR_MAX_CONCURRENCY
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
 
+OCR_PROMPT = ("Extract all text from the provided image."
+              " The text is handwritten and may contain "
+              "abbreviations or imperfect handwriting."
+              "Accurately transcribe what is written."
+              "Expand common abbreviations if you are confident "
+              "about their meaning."
+              "Return only the extracted text, no commentary.")
+
+
 class ImageTextExtractor:
-    def __init__(self, repo_path: str):
-        self.client = OpenAI()
+    def __init__(self, repo_path: str,
+                 max_concurrency: int = OCR_MAX_CONCURRENCY,
+                 cache: Optional[OcrCache] = None):
+        self.client = llm_clients.openai()
+        self.async_client = llm_clients.async_openai()
         self.repo_path = repo_path
+        self.max_concurrency = max(1, max_concurrency)
+        self.cache = cache
         self.text = ""
+        # Per-image size and token statistics of the preprocessing stage
+        self.preprocessing_report: list[dict] = []
 
-    def extract_text(self) -> str:
+    def get_image_paths(self) -> list[str]:
+        """Return the images of the job, sorted so pages keep their order."""
         images_path = utils.get_file_paths(self.repo_path)
-        for image_path in images_path:
-            if ".gitkeep" not in image_path:
-                with open(image_path, "rb") as f:
-                    image_base64 = base64.b64encode(f.read()).decode("utf-8")
-
-                prompt_text = ("Extract all text from the provided image."
-                               " The text is handwritten and may contain "
-                               "abbreviations or imperfect handwriting."
-                               "Accurately transcribe what is written."
-                               "Expand common abbreviations if you are confident "
-                               "about their meaning."
-                               "Return only the extracted text, no commentary.")
+        return sorted(path for path in images_path if ".gitkeep" not in path)
+
+    @staticmethod
+    def _build_messages(image: PreparedImage) -> list[dict]:
+        image_base64 = base64.b64encode(image.data).decode("utf-8")
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": OCR_PROMPT
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:{image.mime_type};base64,{image_base64}"
+                        },
+                    },
+                ],
+            }
+        ]
+
+    @staticmethod
+    def _join_pages(pages: list[str]) -> str:
+        return "\n\n".join(page for page in pages if page)
+
+    @staticmethod
+    def _read_image(image_path: str) -> bytes:
+        with open(image_path, "rb") as f:
+            return f.read()
+
+    def _prepare(self, image_path: str, image_bytes: bytes) -> PreparedImage:
+        image = prepare_image(image_bytes)
+        self.preprocessing_report.append({
+            "image": os.path.basename(image_path),
+            "mime_type": image.mime_type,
+            "original_bytes": image.original_size,
+            "bytes": len(image.data),
+            "bytes_saved": image.bytes_saved,
+            "token_estimate": image.token_estimate,
+        })
+        logger.info("Prepared %s: %s -> %s bytes (%s saved), ~%s image tokens",
+                    os.path.basename(image_path), image.original_size,
+                    len(image.data), image.bytes_saved, image.token_estimate)
+        return image
+
+    def _get_cached(self, image_bytes: bytes) -> Optional[str]:
+        if self.cache is None:
+            return None
+        return self.cache.get_text(image_bytes, OCR_PROMPT, OCR_MODEL)
 
+    def _put_cached(self, image_bytes: bytes, text: str):
+        if self.cache is not None and text:
+            self.cache.put_text(image_bytes, OCR_PROMPT, OCR_MODEL, text)
+
+    def extract_text(self) -> str:
+        for image_path in self.get_image_paths():
+            image_bytes = self._read_image(image_path)
+            page = self._get_cached(image_bytes)
+            if page is None:
+                image = self._prepare(image_path, image_bytes)
                 response = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": prompt_text
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:image/png;base64,{image_base64}"
-                                    },
-                                },
-                            ],
-                        }
-                    ],
+                    model=OCR_MODEL,
+                    messages=self._build_messages(image),
+                )
+                page = response.choices[0].message.content or ""
+                self._put_cached(image_bytes, page)
+            self.text = self._join_pages([self.text, page])
+        return self.text
+
+    async def aextract_text(self) -> str:
+        """
+        Extract text from all images of the job concurrently.
+
+        At most ``max_concurrency`` vision requests are in flight at once.
+        Results are joined in page order regardless of completion order.
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def extract_one(image_path: str) -> str:
+            image_bytes = await asyncio.to_thread(self._read_image,
+                                                  image_path)
+            page = await asyncio.to_thread(self._get_cached, image_bytes)
+            if page is not None:
+                logger.debug("OCR cache hit for %s", image_path)
+                return page
+
+            async with semaphore:
+                image = await asyncio.to_thread(self._prepare, image_path,
+                                                image_bytes)
+                response = await self.async_client.chat.completions.create(
+                    model=OCR_MODEL,
+                    messages=self._build_messages(image),
                 )
-                self.text = self.text + response.choices[0].message.content
+            logger.debug("OCR done for %s", image_path)
+            page = response.choices[0].message.content or ""
+            await asyncio.to_thread(self._put_cached, image_bytes, page)
+            return page
+
+        pages = await asyncio.gather(
+            *(extract_one(path) for path in self.get_image_paths()))
+        self.text = self._join_pages([self.text, *pages])
         return self.text
 
 
@@ -64,11 +154,19 @@ class McpNotionConnector:
         # Initialize session and client objects
         self.session: Optional[ClientSession] = None
         self.exit_stack = AsyncExitStack()
+        self.tools = []
+        # The MCP transport must be opened and closed by the same task, so a
+        # dedicated task owns it for the whole life of the connection
+        self._host_task: Optional[asyncio.Task] = None
+        self._closing: Optional[asyncio.Event] = None
 
     async def connect_to_server(self, user_notion_token: str):
         """
         Connect to Notion MCP server with user-specific token.
 
+        The connection is owned by a background task, so it can be used and
+        closed from any task of the same event loop (e.g. a session pool).
+
         Args:
             user_notion_token: User's Notion OAuth access token.
         """
@@ -78,6 +176,57 @@ class McpNotionConnector:
             raise EnvironmentError(
                 "No Notion token provided. Either pass user_notion_token parameter")
 
+        ready = asyncio.get_running_loop().create_future()
+        self._closing = asyncio.Event()
+        self._host_task = asyncio.create_task(
+            self._host(user_notion_token, ready))
+        try:
+            await ready
+        except asyncio.CancelledError:
+            self._host_task.cancel()
+            await asyncio.gather(self._host_task, return_exceptions=True)
+            raise
+
+    async def ensure_connected(self, user_notion_token: str):
+        """Connect unless a live connection is already open (e.g. pooled)."""
+        if not self.is_alive():
+            await self.connect_to_server(user_notion_token)
+
+    def is_alive(self) -> bool:
+        return (self.session is not None and self._host_task is not None
+                and not self._host_task.done())
+
+    async def ping(self, timeout: float) -> bool:
+        """Check that the MCP server still answers."""
+        if not self.is_alive():
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception as e:
+            logger.warning("MCP health check failed: %s", e)
+            return False
+
+    async def _host(self, user_notion_token: str, ready: asyncio.Future):
+        try:
+            await self._open(user_notion_token)
+        except BaseException as e:
+            await self.exit_stack.aclose()
+            self.session = None
+            if not ready.done():
+                ready.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        ready.set_result(None)
+        try:
+            await self._closing.wait()
+        finally:
+            self.session = None
+            await self.exit_stack.aclose()
+
+    async def _open(self, user_notion_token: str):
         headers = json.dumps({
             "Authorization": f"Bearer {user_notion_token}",
             "Notion-Version": "2022-06-28"
@@ -101,9 +250,14 @@ class McpNotionConnector:
         await self.session.initialize()
 
         tools = await self.session.list_tools()
+        self.tools = tools.tools
         logger.debug("Available tools: %s", [tool.name for tool in tools.tools])
 
     async def cleanup(self):
         """Clean up resources"""
-        await self.exit_stack.aclose()
-
+        if self._host_task is None:
+            await self.exit_stack.aclose()
+            return
+        self._closing.set()
+        await asyncio.gather(self._host_task, return_exceptions=True)
+        self._host_task = None
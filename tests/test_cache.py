@@ -0,0 +1,154 @@
+import sqlite3
+import time
+
+import pytest
+
+from unittest.mock import MagicMock
+from langchain_core.messages import HumanMessage, SystemMessage
+from Notes2Notion.cache import LlmResponseCache, OcrCache
+from Notes2Notion.mock_components import MockImageTextExtractor
+from Notes2Notion.notes_builder import DraftEnhancer
+
+
+def test_ocr_cache_hit_and_miss(tmp_path):
+    # Arrange
+    cache = OcrCache(str(tmp_path / "ocr.sqlite3"))
+
+    # Act
+    missing = cache.get_text(b"image", "prompt", "model")
+    cache.put_text(b"image", "prompt", "model", "hello")
+
+    # Assert
+    assert missing is None
+    assert cache.get_text(b"image", "prompt", "model") == "hello"
+    assert cache.get_text(b"image", "other prompt", "model") is None
+    assert cache.get_text(b"image", "prompt", "other model") is None
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 3
+
+
+def test_cache_operations_close_their_connections(tmp_path, monkeypatch):
+    # Arrange
+    cache = OcrCache(str(tmp_path / "ocr.sqlite3"))
+    opened = []
+    connect = cache._connect
+
+    def tracked_connect():
+        conn = connect()
+        opened.append(conn)
+        return conn
+    monkeypatch.setattr(cache, "_connect", tracked_connect)
+
+    # Act
+    cache.put_text(b"image", "prompt", "model", "hello")
+    cache.get_text(b"image", "prompt", "model")
+
+    # Assert
+    assert opened
+    for conn in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+
+
+def test_ocr_cache_evicts_least_recently_used(tmp_path):
+    # Arrange
+    cache = OcrCache(str(tmp_path / "ocr.sqlite3"), max_bytes=10)
+    cache.put_text(b"a", "p", "m", "aaaa")
+    time.sleep(0.01)
+    cache.put_text(b"b", "p", "m", "bbbb")
+    time.sleep(0.01)
+    # Reading "a" makes "b" the least recently used entry
+    cache.get_text(b"a", "p", "m")
+
+    # Act
+    cache.put_text(b"c", "p", "m", "cccc")
+
+    # Assert
+    assert cache.get_text(b"b", "p", "m") is None
+    assert cache.get_text(b"a", "p", "m") == "aaaa"
+    assert cache.get_text(b"c", "p", "m") == "cccc"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ocr_cache_expires_old_entries(tmp_path):
+    # Arrange
+    cache = OcrCache(str(tmp_path / "ocr.sqlite3"), max_age=0.01)
+    cache.put_text(b"image", "prompt", "model", "hello")
+
+    # Act
+    time.sleep(0.02)
+
+    # Assert
+    assert cache.get_text(b"image", "prompt", "model") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_mock_extractor_reuses_cached_text(tmp_path):
+    # Arrange
+    images = tmp_path / "images"
+    images.mkdir()
+    (images / "note.png").write_bytes(b"same photo")
+    cache = OcrCache(str(tmp_path / "ocr.sqlite3"))
+
+    # Act
+    first = MockImageTextExtractor(str(images), cache=cache).extract_text()
+    second = MockImageTextExtractor(str(images), cache=cache).extract_text()
+
+    # Assert
+    assert first == second
+    assert cache.stats()["hits"] == 1
+
+
+def test_llm_cache_key_covers_model_messages_and_params(tmp_path):
+    # Arrange
+    cache = LlmResponseCache(str(tmp_path / "llm.sqlite3"))
+    messages = [SystemMessage(content="Improve"), HumanMessage(content="draft")]
+    cache.put_response("gpt-4.1", messages, {"temperature": 0}, "better draft")
+
+    # Act
+    hit = cache.get_response("enhance", "gpt-4.1", messages, {"temperature": 0})
+    other_model = cache.get_response("enhance", "gpt-4.1-mini", messages,
+                                     {"temperature": 0})
+    other_text = cache.get_response("enhance", "gpt-4.1",
+                                    [SystemMessage(content="Improve"),
+                                     HumanMessage(content="other")],
+                                    {"temperature": 0})
+
+    # Assert
+    assert hit == "better draft"
+    assert other_model is None and other_text is None
+    assert cache.stats()["stages"]["enhance"]["hits"] == 1
+    assert cache.stats()["stages"]["enhance"]["misses"] == 2
+
+
+@pytest.mark.asyncio
+async def test_reprocessed_draft_is_served_from_llm_cache(tmp_path, monkeypatch):
+    # Arrange
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    cache = LlmResponseCache(str(tmp_path / "llm.sqlite3"))
+    enhancer = DraftEnhancer(routing=False, sectioned=False, cache=cache)
+    calls = []
+
+    def client(model, answer):
+        async def ainvoke(messages):
+            calls.append(model)
+            return MagicMock(content=answer)
+        return MagicMock(ainvoke=ainvoke, model_name=model, temperature=0)
+    enhancer.llm_for_notes_plan = client("plan-model", "outline")
+    enhancer.llm_for_notes_content = client("content-model", "clear notes")
+    enhancer.llm_for_check = client("check-model", "ok")
+    workflow = await enhancer.create_notes_workflow()
+
+    # Act
+    first = await workflow.ainvoke({"user_input": "draft"})
+    second = await workflow.ainvoke({"user_input": "draft"})
+    fresh = await workflow.ainvoke({"user_input": "draft", "cache_bypass": True})
+
+    # Assert
+    assert first["agent_response"] == second["agent_response"] == "clear notes"
+    assert fresh["agent_response"] == "clear notes"
+    assert len(calls) == 6
+    assert cache.stats()["stages"]["check"] == {"hits": 1, "misses": 1,
+                                                "bypassed": 1, "hit_rate": 0.5}
+
@@ -0,0 +1,224 @@
+import asyncio
+import json
+
+import pytest
+
+from unittest.mock import AsyncMock, MagicMock
+from Notes2Notion import model_routing
+from Notes2Notion.notes_builder import (DraftEnhancer, NotesCreator, parse_verdict,
+                                        split_sections)
+from Notes2Notion.settings import ENHANCE_FALLBACK_STRUCTURED, S, XS
+
+
+class EchoLlm:
+    """Answers with a transformation of the last message, after a delay."""
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    async def ainvoke(self, messages):
+        await asyncio.sleep(0.01)
+        return MagicMock(content=f"{self.prefix}({messages[-1].content})")
+
+
+@pytest.mark.asyncio
+async def test_shared_enhancer_keeps_concurrent_drafts_apart(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    enhancer = DraftEnhancer(routing=False)
+    enhancer.llm_for_notes_plan = EchoLlm("plan")
+    enhancer.llm_for_notes_content = EchoLlm("clear")
+    enhancer.llm_for_check = MagicMock(ainvoke=lambda messages: asyncio.sleep(
+        0, result=MagicMock(content="ok")))
+
+    # Act
+    workflow = await enhancer.create_notes_workflow()
+    results = await asyncio.gather(*[workflow.ainvoke({"user_input": f"draft {i}"})
+                                     for i in range(5)])
+
+    # Assert
+    assert workflow is await enhancer.create_notes_workflow()
+    assert [r["agent_response"] for r in results] == [
+        f"clear(plan(draft {i}))" for i in range(5)]
+
+
+def _enhancer_with_verdict(answer, **kwargs):
+    enhancer = DraftEnhancer(routing=False, **kwargs)
+    enhancer.llm_for_notes_plan = EchoLlm("plan")
+    enhancer.llm_for_notes_content = EchoLlm("clear")
+    enhancer.llm_for_check = MagicMock(ainvoke=lambda messages: asyncio.sleep(
+        0, result=MagicMock(content=answer)))
+    return enhancer
+
+
+@pytest.mark.asyncio
+async def test_failing_fact_check_stops_after_retry_budget(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    enhancer = _enhancer_with_verdict("ko", max_retries=2,
+                                      fallback=ENHANCE_FALLBACK_STRUCTURED)
+
+    # Act
+    workflow = await enhancer.create_notes_workflow()
+    result = await workflow.ainvoke({"user_input": "draft"})
+
+    # Assert
+    assert result["iterations"] == 3
+    assert result["fallback_used"]
+    assert result["agent_response"] == "plan(draft)"
+    assert result["loop_seconds"] > 0
+
+
+@pytest.mark.parametrize("answer, verdict", [
+    ("ok", "ok"), ("OK.", "ok"), (" Ok, no issue", "ok"),
+    ("ko", "ko"), ("KO - wrong date", "ko"), ("maybe", "ok"),
+])
+def test_parse_verdict_tolerates_formatting(answer, verdict):
+    # Act & Assert
+    assert parse_verdict(answer) == verdict
+
+
+def test_split_sections_cuts_before_headings():
+    # Arrange
+    outline = "Intro\n# A\ntext a\n```\n# not a heading\n```\n## B\ntext b"
+
+    # Act
+    sections = split_sections(outline)
+
+    # Assert
+    assert sections == ["Intro", "# A\ntext a\n```\n# not a heading\n```",
+                        "## B\ntext b"]
+    assert "\n".join(sections) == outline
+
+
+@pytest.mark.asyncio
+async def test_only_failing_sections_are_rewritten_again(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    enhancer = DraftEnhancer(sectioned=True, routing=False)
+    enhancer.llm_for_notes_plan = MagicMock(ainvoke=lambda messages: asyncio.sleep(
+        0, result=MagicMock(content="# A\ntext a\n# B\ntext b")))
+    enhancer.llm_for_notes_content = EchoLlm("clear")
+    checked = []
+
+    async def check(messages):
+        content = messages[-1].content
+        checked.append(content)
+        # Section B fails its first check only
+        verdict = "ko" if content == "clear(# B\ntext b)" else "ok"
+        return MagicMock(content=verdict)
+    enhancer.llm_for_check = MagicMock(ainvoke=check)
+
+    # Act
+    workflow = await enhancer.create_notes_workflow()
+    result = await workflow.ainvoke({"user_input": "draft"})
+
+    # Assert
+    assert result["agent_response"] == ("clear(# A\ntext a)\n\n"
+                                        "clear(clear(# B\ntext b))")
+    assert result["sections"] == 2
+    assert result["sections_retried"] == 1
+    assert len(checked) == 3
+
+
+@pytest.mark.asyncio
+async def test_first_section_reaches_notion_before_enhancement_ends(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    enhancer = DraftEnhancer(sectioned=True, routing=False)
+    enhancer.llm_for_notes_plan = MagicMock(ainvoke=lambda messages: asyncio.sleep(
+        0, result=MagicMock(content="# A\ntext a\n# B\ntext b")))
+
+    async def rewrite(messages):
+        # Section B takes much longer than section A
+        await asyncio.sleep(0.3 if "# B" in messages[-1].content else 0)
+        return MagicMock(content=messages[-1].content)
+    enhancer.llm_for_notes_content = MagicMock(ainvoke=rewrite)
+    enhancer.llm_for_check = MagicMock(ainvoke=lambda messages: asyncio.sleep(
+        0, result=MagicMock(content="ok")))
+
+    def tool_result(payload):
+        return MagicMock(content=[MagicMock(text=json.dumps(payload))], isError=False)
+    session = MagicMock()
+    session.call_tool = AsyncMock(side_effect=[
+        tool_result({"object": "page", "id": "new-page"}),
+        tool_result({"object": "list", "results": []}),
+    ])
+    creator = NotesCreator(MagicMock(ensure_connected=AsyncMock(), session=session),
+                           enhancer,
+                           MagicMock(aextract_text=AsyncMock(return_value="draft"),
+                                     repo_path="uploads/Title"),
+                           page_check=AsyncMock(),
+                           stream_writes=True)
+
+    # Act
+    await creator.notes_creation("token", "parent")
+
+    # Assert
+    stages = creator.timer.as_dict()
+    assert stages["first_block"]["start"] < stages["enhance"]["end"]
+    first_call, second_call = session.call_tool.await_args_list
+    assert first_call.args[0] == "API-post-page"
+    assert second_call.args[1]["block_id"] == "new-page"
+
+
+@pytest.mark.asyncio
+async def test_routed_enhancer_uses_small_models_for_short_notes(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(model_routing, "_encoding_failed", True)
+    enhancer = DraftEnhancer(sectioned=False, routing=True)
+    calls = []
+
+    def client(model):
+        async def ainvoke(messages):
+            calls.append(model)
+            return MagicMock(content="ok" if model == XS and len(calls) > 2 else "note")
+        return MagicMock(ainvoke=ainvoke)
+    enhancer._clients = {XS: client(XS), S: client(S)}
+
+    # Act
+    workflow = await enhancer.create_notes_workflow()
+    result = await workflow.ainvoke({"user_input": "Acheter du lait demain"})
+
+    # Assert
+    assert result["tier"] == "small"
+    assert calls == [XS, S, XS]
+
+
+@pytest.mark.asyncio
+async def test_failing_section_cancels_the_other_sections(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    enhancer = DraftEnhancer(sectioned=True, routing=False, section_concurrency=2)
+    enhancer.llm_for_notes_plan = MagicMock(ainvoke=lambda messages: asyncio.sleep(
+        0, result=MagicMock(content="# A\ntext a\n# B\ntext b")))
+    b_started, cancelled = asyncio.Event(), asyncio.Event()
+
+    async def rewrite(messages):
+        if "# A" in messages[-1].content:
+            await b_started.wait()
+            raise RuntimeError("rate limited")
+        b_started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    enhancer.llm_for_notes_content = MagicMock(ainvoke=rewrite)
+
+    # Act
+    workflow = await enhancer.create_notes_workflow()
+    with pytest.raises(RuntimeError, match="rate limited"):
+        await asyncio.wait_for(workflow.ainvoke({"user_input": "draft"}), timeout=2)
+
+    # Assert
+    assert cancelled.is_set()
+
+
+def test_section_concurrency_is_at_least_one(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+
+    # Act & Assert
+    assert DraftEnhancer(routing=False, section_concurrency=0).section_concurrency == 1
@@ -0,0 +1,61 @@
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+
+from Notes2Notion.image_preprocessing import (estimate_image_tokens,
+                                              prepare_image, sniff_mime_type)
+
+
+def _encode(image, fmt: str, **kwargs) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format=fmt, **kwargs)
+    return buffer.getvalue()
+
+
+def test_estimate_image_tokens():
+    assert estimate_image_tokens(1024, 1024) == 85 + 170 * 4
+    assert estimate_image_tokens(4032, 3024) == 85 + 170 * 4
+    assert estimate_image_tokens(1000, 3000) == 85 + 170 * 8
+    assert estimate_image_tokens(300, 200) == 85 + 170
+
+
+def test_sniff_mime_type():
+    assert sniff_mime_type(b"\xff\xd8\xff\xe0rest") == "image/jpeg"
+    assert sniff_mime_type(b"\x89PNG\r\n\x1a\nrest") == "image/png"
+    assert sniff_mime_type(b"GIF89arest") == "image/gif"
+
+
+def test_prepare_image_downscales_large_photo():
+    # Arrange
+    raw = _encode(Image.new("RGB", (4000, 3000), "white"), "PNG")
+
+    # Act
+    prepared = prepare_image(raw)
+
+    # Assert
+    assert prepared.mime_type == "image/jpeg"
+    assert (prepared.width, prepared.height) == (1024, 768)
+    assert prepared.bytes_saved > 0
+    assert prepared.token_estimate == 85 + 170 * 4
+
+
+def test_prepare_image_applies_exif_orientation():
+    # Arrange
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Rotated 90 degrees clockwise
+    raw = _encode(Image.new("RGB", (400, 200), "white"), "JPEG", exif=exif)
+
+    # Act
+    prepared = prepare_image(raw)
+
+    # Assert
+    assert (prepared.width, prepared.height) == (200, 400)
+
+
+def test_prepare_image_keeps_unreadable_bytes():
+    prepared = prepare_image(b"not an image")
+
+    assert prepared.data == b"not an image"
+    assert prepared.bytes_saved == 0
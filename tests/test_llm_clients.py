@@ -0,0 +1,85 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from Notes2Notion.llm_clients import (PROVIDER_AZURE, LlmClientRegistry,
+                                      current_endpoint)
+from Notes2Notion.settings import M, S
+
+
+class ModelsHandler(BaseHTTPRequestHandler):
+    """Answers every GET with an empty model list, keeping connections open."""
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"object": "list", "data": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_endpoint(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ModelsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    yield
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.asyncio
+async def test_successive_jobs_reuse_the_warm_connection(local_endpoint):
+    # Arrange
+    registry = LlmClientRegistry()
+
+    # Act
+    assert await registry.awarm_up()
+    for _ in range(3):
+        await registry.async_openai().models.list()
+
+    # Assert
+    (pool,) = registry.stats()["pools"].values()
+    assert pool["requests"] == 4
+    assert pool["connections_opened"] == 1
+    assert pool["reuse_rate"] == 0.75
+    await registry.aclose()
+
+
+def test_chat_clients_are_shared_per_model(local_endpoint):
+    # Arrange
+    registry = LlmClientRegistry()
+
+    # Act
+    plan, check, content = registry.chat(S), registry.chat(S), registry.chat(M)
+
+    # Assert
+    assert plan is check
+    assert plan is not content
+    assert plan.http_async_client is content.http_async_client
+    assert registry.stats()["chat_clients"] == 2
+
+
+def test_azure_is_used_without_openai_key(monkeypatch):
+    # Arrange
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "test")
+    monkeypatch.setenv("AZURE_OPENAI_ENDPOINT", "https://example.openai.azure.com")
+
+    # Act
+    provider, url = current_endpoint()
+    chat = LlmClientRegistry().chat(S)
+
+    # Assert
+    assert provider == PROVIDER_AZURE
+    assert url == "https://example.openai.azure.com"
+    assert chat.deployment_name == S
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+from Notes2Notion.mcp_pool import McpSessionPool
+
+
+class FakeConnector:
+    def __init__(self):
+        self.connected_with = None
+        self.closed = False
+        self.healthy = True
+
+    async def connect_to_server(self, user_notion_token):
+        self.connected_with = user_notion_token
+
+    def is_alive(self):
+        return self.connected_with is not None and not self.closed
+
+    async def ping(self, timeout):
+        return self.healthy
+
+    async def cleanup(self):
+        self.closed = True
+
+
+@pytest.mark.asyncio
+async def test_released_session_is_reused():
+    # Arrange
+    pool = McpSessionPool(connector_factory=FakeConnector)
+
+    # Act
+    first = await pool.acquire("token-a")
+    await pool.release(first)
+    second = await pool.acquire("token-a")
+
+    # Assert
+    assert second is first
+    assert pool.stats()["hits"] == 1
+    assert pool.stats()["spawns"] == 1
+    await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_unhealthy_session_is_replaced():
+    # Arrange
+    pool = McpSessionPool(connector_factory=FakeConnector)
+    first = await pool.acquire("token-a")
+    await pool.release(first)
+    first.healthy = False
+
+    # Act
+    second = await pool.acquire("token-a")
+
+    # Assert
+    assert second is not first
+    assert first.closed
+    assert pool.stats()["health_check_failures"] == 1
+    assert pool.stats()["live_sessions"] == 1
+    await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_cap_evicts_idle_session_of_another_user():
+    # Arrange
+    pool = McpSessionPool(max_sessions=1, connector_factory=FakeConnector)
+    first = await pool.acquire("token-a")
+    await pool.release(first)
+
+    # Act
+    second = await pool.acquire("token-b")
+
+    # Assert
+    assert first.closed
+    assert second.connected_with == "token-b"
+    assert pool.stats()["evicted"] == 1
+    assert pool.stats()["live_sessions"] == 1
+    await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_health_check_frees_the_session_slot():
+    # Arrange
+    pool = McpSessionPool(connector_factory=FakeConnector, max_sessions=1)
+    first = await pool.acquire("token-a")
+    await pool.release(first)
+    pinging = asyncio.Event()
+
+    async def slow_ping(timeout):
+        pinging.set()
+        await asyncio.sleep(10)
+    first.ping = slow_ping
+
+    # Act
+    task = asyncio.create_task(pool.acquire("token-a"))
+    await pinging.wait()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    second = await asyncio.wait_for(pool.acquire("token-a"), timeout=1)
+
+    # Assert
+    assert first.closed
+    assert second is not first
+    assert pool.stats()["live_sessions"] == 1
+    await pool.close_all()
+
+
+@pytest.mark.asyncio
+async def test_failing_connector_factory_frees_the_session_slot():
+    # Arrange
+    def broken_factory():
+        raise RuntimeError("docker unavailable")
+    pool = McpSessionPool(connector_factory=broken_factory, max_sessions=1)
+
+    # Act
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await pool.acquire("token-a")
+
+    # Assert
+    assert pool.stats()["live_sessions"] == 0
+    assert pool.stats()["spawn_failures"] == 2
+    await pool.close_all()
@@ -0,0 +1,66 @@
+import pytest
+
+from Notes2Notion import model_routing
+from Notes2Notion.model_routing import (ModelRouter, TIER_LARGE, TIER_MEDIUM, TIER_SMALL,
+                                        ocr_quality)
+from Notes2Notion.settings import M, XS
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # Count 4 characters per token instead of downloading a tiktoken encoding
+    monkeypatch.setattr(model_routing, "_encoding", None)
+    monkeypatch.setattr(model_routing, "_encoding_failed", True)
+
+
+def test_short_note_uses_small_tier():
+    # Arrange
+    router = ModelRouter(small_max_tokens=50)
+
+    # Act
+    decision = router.route("Acheter du lait et du pain demain matin")
+
+    # Assert
+    assert decision.tier == TIER_SMALL
+    assert decision.models["plan"] == XS
+
+
+def test_size_and_sections_select_larger_tiers():
+    # Arrange
+    router = ModelRouter(small_max_tokens=10, medium_max_tokens=100,
+                         medium_max_sections=3)
+    text = "Une phrase claire sur le cours. " * 8
+
+    # Act
+    medium = router.route(text, sections=2)
+    many_sections = router.route(text, sections=4)
+    long_text = router.route(text * 10)
+
+    # Assert
+    assert medium.tier == TIER_MEDIUM
+    assert many_sections.tier == TIER_LARGE
+    assert long_text.tier == TIER_LARGE
+    assert long_text.models["content"] == M
+
+
+def test_noisy_ocr_moves_up_one_tier():
+    # Arrange
+    router = ModelRouter(small_max_tokens=50, min_quality=0.6)
+    noisy = "#{ ~~ l@it }} %% p4in ** ^^ dem@in"
+
+    # Act
+    decision = router.route(noisy)
+
+    # Assert
+    assert ocr_quality(noisy) < 0.6
+    assert decision.tier == TIER_MEDIUM
+
+
+@pytest.mark.parametrize("note", [
+    "- lait\n- pain\n- oeufs",
+    "## Courses\n* **lait**\n1. pain\n- [x] _oeufs_",
+])
+def test_markdown_markers_are_not_ocr_noise(note):
+    # Act & Assert
+    assert ocr_quality(note) == 1.0
+    assert ModelRouter(small_max_tokens=50).route(note).tier == TIER_SMALL
@@ -0,0 +1,276 @@
+import asyncio
+import json
+
+import pytest
+
+from unittest.mock import AsyncMock, MagicMock
+from Notes2Notion.notion_blocks import (PAGE_UNAVAILABLE_MESSAGE, batch_blocks,
+                                        check_page_writable, compile_markdown,
+                                        count_blocks,
+                                        split_text, write_page, write_page_stream)
+
+
+def _tool_result(payload, is_error=False):
+    return MagicMock(content=[MagicMock(text=json.dumps(payload))],
+                     isError=is_error)
+
+
+def test_compile_markdown_block_types():
+    # Arrange
+    draft = "\n".join([
+        "# Title",
+        "## 1. Introduction",
+        "Some **bold** text.",
+        "- item",
+        "  - nested item",
+        "1. step",
+        "- [x] done",
+        "> a quote",
+        "> [!TIP] a tip",
+        "",
+        "> [!WARNING] careful",
+        "```py",
+        "print('hi')",
+        "```",
+        "<details>",
+        "<summary>More</summary>",
+        "Hidden text",
+        "</details>",
+    ])
+
+    # Act
+    blocks = compile_markdown(draft)
+
+    # Assert
+    assert [block["type"] for block in blocks] == [
+        "heading_1", "heading_2", "paragraph", "bulleted_list_item",
+        "numbered_list_item", "to_do", "quote", "callout", "code", "toggle"]
+    assert blocks[1]["heading_2"]["rich_text"][0]["text"]["content"] == "1. Introduction"
+    bold = blocks[2]["paragraph"]["rich_text"][1]
+    assert bold["text"]["content"] == "bold"
+    assert bold["annotations"] == {"bold": True}
+    assert blocks[3]["bulleted_list_item"]["children"][0]["type"] == "bulleted_list_item"
+    assert blocks[5]["to_do"]["checked"] is True
+    assert blocks[7]["callout"]["icon"] == {"type": "emoji", "emoji": "⚠️"}
+    assert blocks[8]["code"]["language"] == "python"
+    assert blocks[9]["toggle"]["children"][0]["type"] == "paragraph"
+
+
+def test_split_text_on_sentence_boundaries():
+    # Arrange
+    text = "This is one sentence. " * 200
+
+    # Act
+    chunks = split_text(text.strip())
+
+    # Assert
+    assert all(len(chunk) <= 2000 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert " ".join(chunks) == text.strip()
+
+
+def test_long_paragraph_stays_one_block():
+    blocks = compile_markdown("Sentence. " * 500)
+
+    assert len(blocks) == 1
+    assert len(blocks[0]["paragraph"]["rich_text"]) == 3
+
+
+def test_batch_blocks_respects_children_limit():
+    blocks = compile_markdown("\n".join(f"- item {i}" for i in range(250)))
+
+    assert [len(batch) for batch in batch_blocks(blocks)] == [100, 100, 50]
+
+
+@pytest.mark.asyncio
+async def test_write_page_uses_one_call_per_batch():
+    # Arrange
+    session = MagicMock()
+    session.call_tool = AsyncMock(side_effect=[
+        _tool_result({"object": "page", "id": "new-page", "archived": False}),
+        _tool_result({"object": "list", "results": []}),
+        _tool_result({"object": "list", "results": []}),
+    ])
+    blocks = compile_markdown("\n".join(f"Paragraph {i}\n" for i in range(250)))
+
+    # Act
+    stats = await write_page(session, "parent", "Title", blocks)
+
+    # Assert
+    assert stats["page_id"] == "new-page"
+    assert stats["calls"] == 3
+    assert stats["blocks"] == 250
+    first_call = session.call_tool.await_args_list[0]
+    assert first_call.args[0] == "API-post-page"
+    assert len(first_call.args[1]["children"]) == 100
+    assert session.call_tool.await_args_list[1].args[1]["block_id"] == "new-page"
+
+
+@pytest.mark.asyncio
+async def test_write_page_reports_deleted_parent():
+    # Arrange
+    session = MagicMock()
+    session.call_tool = AsyncMock(return_value=_tool_result(
+        {"object": "error", "status": 404, "code": "object_not_found"}))
+
+    # Act & Assert
+    with pytest.raises(ValueError, match="n'existe plus"):
+        await write_page(session, "parent", "Title", compile_markdown("Hi"))
+    assert "n'existe plus" in PAGE_UNAVAILABLE_MESSAGE
+
+
+@pytest.mark.asyncio
+async def test_mock_notes_creator_appends_in_batches():
+    # Arrange
+    from Notes2Notion.mock_components import MockNotesCreator
+
+    session = MagicMock()
+    session.call_tool = AsyncMock(side_effect=[
+        _tool_result({"object": "page", "id": "new-page"}),
+        _tool_result({"object": "list", "results": []}),
+        _tool_result({"object": "list", "results": []}),
+        _tool_result({"object": "list", "results": []}),
+    ])
+    creator = MockNotesCreator(MagicMock(session=session), None, None)
+    content = "\n".join(f"- line {i}" for i in range(299)) + "\n" + "x" * 4500
+
+    # Act
+    stats = await creator._create_notion_page_directly("Title", "parent", content)
+
+    # Assert
+    assert stats["calls"] == 4
+    assert stats["blocks"] == 300
+    last_batch = session.call_tool.await_args_list[-1].args[1]["children"]
+    assert len(last_batch[-1]["paragraph"]["rich_text"]) == 3
+
+
+
+@pytest.mark.asyncio
+async def test_page_check_rejects_archived_page():
+    # Arrange
+    session = MagicMock()
+    session.call_tool = AsyncMock(return_value=_tool_result(
+        {"object": "page", "id": "parent", "archived": True}))
+
+    # Act & Assert
+    with pytest.raises(ValueError, match="n'existe plus"):
+        await check_page_writable(session, "parent")
+    assert session.call_tool.await_args.args == ("API-retrieve-a-page",
+                                                  {"page_id": "parent"})
+
+
+@pytest.mark.asyncio
+async def test_failed_page_check_cancels_enhancement(monkeypatch):
+    # Arrange
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from Notes2Notion.notes_builder import NotesCreator
+
+    enhancement_started = asyncio.Event()
+
+    async def slow_workflow(_):
+        enhancement_started.set()
+        await asyncio.sleep(10)
+
+    async def page_check(page_id):
+        await enhancement_started.wait()
+        raise ValueError(PAGE_UNAVAILABLE_MESSAGE)
+
+    creator = NotesCreator(MagicMock(ensure_connected=AsyncMock()),
+                           MagicMock(create_notes_workflow=AsyncMock(
+                               return_value=MagicMock(ainvoke=slow_workflow))),
+                           MagicMock(aextract_text=AsyncMock(return_value="draft")),
+                           page_check=page_check)
+
+    # Act & Assert
+    with pytest.raises(ValueError, match="n'existe plus"):
+        await asyncio.wait_for(creator.prepare_draft("token", "parent"), timeout=2)
+    assert creator.timer.as_dict()["enhance"]["end"] < 2
+
+
+def test_table_at_depth_limit_keeps_its_rows():
+    # Arrange
+    draft = "\n".join([
+        "<details>",
+        "<summary>Outer</summary>",
+        "<details>",
+        "<summary>Inner</summary>",
+        "| Jour | Tâche |",
+        "| --- | --- |",
+        "| Lundi | Courses |",
+        "</details>",
+        "</details>",
+    ])
+
+    # Act
+    blocks = compile_markdown(draft)
+
+    # Assert
+    inner = blocks[0]["toggle"]["children"][0]
+    rows = inner["toggle"]["children"]
+    assert [block["type"] for block in rows] == ["paragraph", "paragraph"]
+    assert "".join(item["text"]["content"]
+                   for item in rows[1]["paragraph"]["rich_text"]) == "Lundi | Courses"
+    assert not any(block["type"] == "table_row"
+                   for block in blocks + inner["toggle"]["children"])
+
+
+@pytest.mark.asyncio
+async def test_failed_stream_archives_the_partial_page():
+    # Arrange
+    session = MagicMock()
+    session.call_tool = AsyncMock(side_effect=[
+        _tool_result({"object": "page", "id": "new-page"}),
+        _tool_result({"object": "page", "id": "new-page", "archived": True}),
+    ])
+
+    async def sections():
+        yield compile_markdown("# First section")
+        raise RuntimeError("enhancement failed")
+
+    # Act
+    with pytest.raises(RuntimeError, match="enhancement failed"):
+        await write_page_stream(session, "parent", "Title", sections())
+
+    # Assert
+    last_call = session.call_tool.await_args_list[-1]
+    assert last_call.args == ("API-patch-page", {"page_id": "new-page", "archived": True})
+
+
+def test_batches_count_nested_blocks():
+    # Arrange
+    draft = "\n".join(f"- item {i}\n" + "\n".join(f"  - sub {i}.{j}" for j in range(20))
+                      for i in range(100))
+    blocks = compile_markdown(draft)
+
+    # Act
+    batches = batch_blocks(blocks)
+
+    # Assert
+    assert sum(count_blocks(block) for block in blocks) == 2100
+    assert all(sum(count_blocks(block) for block in batch) <= 1000 for batch in batches)
+    assert sum(len(batch) for batch in batches) == 100
+
+
+@pytest.mark.asyncio
+async def test_long_table_rows_are_appended_to_the_created_table():
+    # Arrange
+    draft = "| Jour | Tâche |\n| --- | --- |\n" + "\n".join(
+        f"| {i} | tâche {i} |" for i in range(250))
+    session = MagicMock()
+    session.call_tool = AsyncMock(side_effect=[
+        _tool_result({"object": "page", "id": "new-page"}),
+        _tool_result({"object": "list", "results": [{"id": "new-table"}]}),
+        _tool_result({"object": "list", "results": []}),
+        _tool_result({"object": "list", "results": []}),
+    ])
+
+    # Act
+    await write_page(session, "parent", "Title", compile_markdown(draft))
+
+    # Assert
+    create, table, *rows = session.call_tool.await_args_list
+    assert "children" not in create.args[1]
+    sent_table = table.args[1]["children"][0]
+    assert len(sent_table["table"]["children"]) == 100
+    assert [call.args[1]["block_id"] for call in rows] == ["new-table", "new-table"]
+    assert [len(call.args[1]["children"]) for call in rows] == [100, 51]
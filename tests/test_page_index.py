@@ -0,0 +1,67 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Backend modules are imported the way the backend's Docker image does
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from page_index import PageIndex  # noqa: E402
+
+
+def _page(i, title):
+    return {
+        "object": "page",
+        "id": f"page-{i}",
+        "last_edited_time": f"2026-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}.000Z",
+        "properties": {"title": {"type": "title",
+                                 "title": [{"plain_text": title}]}},
+        "parent": {"type": "workspace", "workspace": True},
+    }
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = PageIndex(str(tmp_path / "index.sqlite3"))
+    pages = [_page(i, f"Meeting notes {i:04d}") for i in range(700)]
+
+    def fetch(body):
+        offset = int(body.get("start_cursor") or 0)
+        batch = pages[offset:offset + body["page_size"]]
+        has_more = offset + len(batch) < len(pages)
+        return {"results": batch, "has_more": has_more,
+                "next_cursor": str(offset + len(batch)) if has_more else None}
+
+    index.crawl("bot", fetch)
+    return index
+
+
+def _walk(index, query):
+    found, cursor = [], None
+    while True:
+        result = index.search("bot", query, start_cursor=cursor, page_size=100)
+        found += [page["id"] for page in result["pages"]]
+        if not result["has_more"]:
+            return found
+        cursor = result["next_cursor"]
+
+
+@pytest.mark.parametrize("query", ["", "meeting", "no"])
+def test_cursors_reach_every_indexed_page(index, query):
+    # Act
+    found = _walk(index, query)
+
+    # Assert
+    assert len(found) == 700
+    assert len(set(found)) == 700
+
+
+def test_typo_matches_only_when_nothing_contains_the_query(index):
+    # Act
+    exact = index.search("bot", "notes 0042")
+    typo = index.search("bot", "meetnig")
+
+    # Assert
+    assert [page["id"] for page in exact["pages"]] == ["page-42"]
+    assert len(typo["pages"]) == 100
+    assert typo["has_more"]
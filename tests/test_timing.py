@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+
+from Notes2Notion.timing import StageTimer, run_concurrently
+
+
+@pytest.mark.asyncio
+async def test_concurrent_stages_overlap():
+    # Arrange
+    timer = StageTimer()
+
+    async def stage(name):
+        with timer.stage(name):
+            await asyncio.sleep(0.05)
+        return name
+
+    # Act
+    results = await run_concurrently(stage("notion_connect"), stage("ocr"))
+
+    # Assert
+    assert results == ["notion_connect", "ocr"]
+    assert timer.overlap("notion_connect", "ocr") > 0
+
+
+@pytest.mark.asyncio
+async def test_failed_stage_cancels_the_others():
+    # Arrange
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def failing():
+        raise ValueError("page unavailable")
+
+    # Act
+    with pytest.raises(ValueError, match="page unavailable"):
+        await run_concurrently(slow(), failing())
+
+    # Assert
+    assert cancelled.is_set()
@@ -0,0 +1,59 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+# Backend modules are imported the way the backend's Docker image does
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'users.sqlite3'}")
+    import models
+    monkeypatch.setattr(models, "_engine", None)
+    models.init_db()
+    yield models
+    models.get_engine().dispose()
+    models._engine = None
+
+
+def _add_user(models, bot_id, refresh_token, expires_in):
+    models.create_or_update_user(
+        bot_id=bot_id, workspace_id="workspace", access_token=f"access-{bot_id}",
+        refresh_token=refresh_token,
+        token_expires_at=datetime.utcnow() + timedelta(seconds=expires_in))
+
+
+def test_failing_refresh_does_not_block_other_users(database, monkeypatch):
+    # Arrange
+    import oauth
+    from token_refresher import TokenRefresher
+
+    def request_token_refresh(refresh_token):
+        if refresh_token == "revoked":
+            raise oauth.TokenRefreshError("invalid_grant")
+        if refresh_token == "flaky":
+            raise oauth.TokenRefreshError("server_error")
+        return {"access_token": f"new-{refresh_token}", "expires_in": 3600}
+    monkeypatch.setattr(oauth, "request_token_refresh", request_token_refresh)
+    _add_user(database, "revoked-user", "revoked", 10)
+    _add_user(database, "flaky-user", "flaky", 20)
+    _add_user(database, "healthy-user", "healthy", 30)
+    refresher = TokenRefresher(batch_size=2)
+
+    # Act
+    first = refresher.sweep()
+    second = refresher.sweep()
+    third = refresher.sweep()
+
+    # Assert
+    assert (first, second, third) == (0, 1, 0)
+    assert database.get_user_by_bot_id("healthy-user").access_token == "new-healthy"
+    revoked = database.get_user_by_bot_id("revoked-user")
+    assert revoked.refresh_token is None
+    flaky = database.get_user_by_bot_id("flaky-user")
+    assert flaky.refresh_token == "flaky"
+    assert flaky.token_refresh_failures == 1
+    assert flaky.next_refresh_attempt_at > datetime.utcnow()
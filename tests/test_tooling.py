@@ -1,7 +1,10 @@
+import asyncio
+import base64
+
 import pytest
 
 from unittest.mock import AsyncMock, MagicMock, patch
-from Notes2Notion.tooling import McpNotionConnector
+from Notes2Notion.tooling import ImageTextExtractor, McpNotionConnector
 
 
 @pytest.mark.asyncio
@@ -65,3 +68,37 @@ async def test_cleanup_calls_aclose():
 
     # Assert
     connector.exit_stack.aclose.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_aextract_text_keeps_page_order(monkeypatch, tmp_path):
+    # Arrange
+    monkeypatch.setenv("OPENAI_API_KEY", "fake-key")
+    for name in ("page_2.png", "page_1.png", "page_3.png"):
+        (tmp_path / name).write_bytes(name.encode())
+
+    extractor = ImageTextExtractor(str(tmp_path), max_concurrency=2)
+
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fake_create(model, messages):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        url = messages[0]["content"][1]["image_url"]["url"]
+        page = base64.b64decode(url.split(",", 1)[1]).decode()
+        # Later pages finish first
+        await asyncio.sleep(0.03 if page == "page_1.png" else 0.01)
+        in_flight -= 1
+        return MagicMock(choices=[MagicMock(message=MagicMock(content=page))])
+
+    extractor.async_client = MagicMock()
+    extractor.async_client.chat.completions.create = fake_create
+
+    # Act
+    text = await extractor.aextract_text()
+
+    # Assert
+    assert text == "page_1.png\n\npage_2.png\n\npage_3.png"
+    assert max_in_flight == 2